@@ -2,84 +2,80 @@
 from mesa import Agent
 import random
 import numpy as np
-from functions_and_parameters import (
-    STATE_SCORES, state_to_score,
-    THRESHOLD_ALPHA, THRESHOLD_BETA,
-    HABIT_ALPHA, HABIT_BETA, HABIT_DECAY,
-    IDENTITY_ALPHA, IDENTITY_BETA,
-    OFFLINE_WEIGHT, ONLINE_WEIGHT,
-    CAMPAIGN_START, CAMPAIGN_END, CAMPAIGN_BASE_STRENGTH, CAMPAIGN_HALF_LIFE,
-    BACKLASH_GAP, BACKLASH_SCALE,
-    logistic, exp_decay
-)
+from functions_and_parameters import logistic
 
 
 class EaterAgent(Agent):
     def __init__(self, unique_id, model, scenario):
         super().__init__(unique_id, model)
         self.scenario = scenario
+        # explicit per-run Generator, or the globally seeded np.random module
+        self.rng = rng = model.rng
+        # parameter set shared with the model (functions_and_parameters.ModelParams)
+        self.params = p = model.params
+
+        if model.crn is not None:
+            # common random numbers: pre-drawn per agent (crn.CommonDraws)
+            (r, self.habit_strength, self.threshold, self.identity_strength,
+             self.campaign_sensitivity, self.econ_sensitivity) = model.crn.agent_draws(unique_id)
+        else:
+            r = random.random() if rng is np.random else rng.random()
+
+            # Priors
+            self.habit_strength = rng.beta(p.habit_alpha, p.habit_beta)
+            self.threshold = rng.beta(p.threshold_alpha, p.threshold_beta)
+            self.identity_strength = rng.beta(p.identity_alpha, p.identity_beta)
+
+            # Heterogeneous sensitivities
+            self.campaign_sensitivity = max(0.0, rng.lognormal(mean=-0.2, sigma=0.5))  # ~0-2
+            self.econ_sensitivity = float(np.clip(rng.normal(1.0, 0.25), 0.2, 2.0))
 
         # Initial state: 10% state 1 (flexitarian), 2% state 2 (vegetarian), others at state 0 (omnivorse)
-        r = random.random()
         if r < 0.02:
             self.state = 2
         elif r < 0.12:
             self.state = 1
         else:
             self.state = 0
- 
-        # Priors
-        self.habit_strength = np.random.beta(HABIT_ALPHA, HABIT_BETA)
-        self.threshold = np.random.beta(THRESHOLD_ALPHA, THRESHOLD_BETA)
-        self.identity_strength = np.random.beta(IDENTITY_ALPHA, IDENTITY_BETA)
-
-        # Heterogeneous sensitivities
-        self.campaign_sensitivity = max(0.0, np.random.lognormal(mean=-0.2, sigma=0.5))  # ~0-2
-        self.econ_sensitivity = float(np.clip(np.random.normal(1.0, 0.25), 0.2, 2.0))
-
-        self.offline_neighbors = []
-        self.online_neighbors = []
+
         self.next_state = self.state
 
-    def set_neighbors(self, offline, online):
-        self.offline_neighbors = offline or []
-        self.online_neighbors  = online or []
+    def _uniform(self, slot):
+        # per-tick draw: from the run's rng, or a fixed CRN slot (0 backlash, 1 step-down, 2 move)
+        u = self.model.tick_uniforms
+        return self.rng.random() if u is None else float(u[slot, self.unique_id])
 
     def _neighbor_mean_state(self):
-        off_mean = np.mean([nbr.state for nbr in self.offline_neighbors]) if self.offline_neighbors else self.state
-        on_mean  = np.mean([nbr.state for nbr in self.online_neighbors])  if self.online_neighbors  else self.state
-        return OFFLINE_WEIGHT * off_mean + ONLINE_WEIGHT * on_mean
+        # weighted offline/online neighbour mean, maintained for all agents by model.neighbor_signal
+        return float(self.model.neighbor_signal.values[self.unique_id])
 
-    def _campaign_adjustment(self, t):
-        if self.scenario in ("campaign", "combo") and (CAMPAIGN_START <= t <= CAMPAIGN_END):
-            return self.campaign_sensitivity * CAMPAIGN_BASE_STRENGTH * exp_decay(t, CAMPAIGN_START, CAMPAIGN_HALF_LIFE)
-        return 0.0
+    # campaign intensity and tax signal of this tick are set once by the model (policy.PolicySchedule);
+    # both are 0.0 when the scenario has no campaign / tax
+    def _campaign_adjustment(self):
+        return self.campaign_sensitivity * self.model.campaign_intensity
 
     def _economic_adjustment(self):
-        if self.scenario in ("economic", "combo"):
-            return self.econ_sensitivity * self.model.current_tax_signal
-        return 0.0
+        return self.econ_sensitivity * self.model.current_tax_signal
 
     def _maybe_backlash(self, social_signal):
         gap = social_signal - float(self.state)
-        if gap >= BACKLASH_GAP:
+        if gap >= self.params.backlash_gap:
             # probabilistic backlash driven by identity
-            p = BACKLASH_SCALE * self.identity_strength * logistic(gap - BACKLASH_GAP)
-            if np.random.random() < p:
+            p = self.params.backlash_scale * self.identity_strength * logistic(gap - self.params.backlash_gap)
+            if self._uniform(0) < p:
                 self.threshold = float(np.clip(self.threshold + 0.05 * gap, 0, 1))
-                if self.state > 0 and np.random.random() < 0.5 * self.identity_strength:
+                if self.state > 0 and self._uniform(1) < 0.5 * self.identity_strength:
                     self.next_state = self.state - 1
                     self.model.peer_events += 1
 
     def step(self):
-        t = self.model.schedule.time
         social_signal = self._neighbor_mean_state()
 
         # potential backlash first
         self._maybe_backlash(social_signal)
 
         # pressure to move up one state
-        nudges = self._campaign_adjustment(t) + self._economic_adjustment()
+        nudges = self._campaign_adjustment() + self._economic_adjustment()
         pressure = (social_signal - float(self.state)) + nudges
 
         effective_threshold = self.threshold * (1.0 + self.habit_strength)
@@ -87,7 +83,7 @@ class EaterAgent(Agent):
         p_up = logistic(2.5 * (pressure - effective_threshold))
         p_down = logistic(2.0 * ((-pressure) - 0.5 * self.habit_strength))
 
-        rnd = np.random.random()
+        rnd = self._uniform(2)
         self.next_state = self.state
         if rnd < p_up and self.state < 3:
             self.next_state = self.state + 1
@@ -97,7 +93,11 @@ class EaterAgent(Agent):
             self.model.peer_events += 1
 
         # Habit decays slightly every step
-        self.habit_strength *= HABIT_DECAY
+        self.habit_strength *= self.params.habit_decay
 
     def advance(self):
+        if self.next_state != self.state:
+            self.model._moved.append((self.unique_id, self.next_state))
+            self.model.state_counts[self.state] -= 1
+            self.model.state_counts[self.next_state] += 1
         self.state = int(self.next_state)
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+# Summary column <- model reporter column (same layout as runner.summarize_runs)
+SUMMARY_COLUMNS = {
+    "Avg": "AverageSustainability",
+    "Share0": "ShareState0",
+    "Share1": "ShareState1",
+    "Share2": "ShareState2",
+    "Share3": "ShareState3",
+    "Gini": "GiniScore",
+    "Velocity": "AdoptionVelocity",
+    "PeerEvents": "PeerInfluenceEvents",
+    "TaxSignal": "TaxSignal",
+}
+
+
+class StreamingSummary:
+    """
+    Per-step summary across runs, updated online as each run finishes.
+
+    Keeps a running mean and sum of squared deviations (Welford) per step for
+    every reporter, so memory is O(steps x columns) no matter how many runs are
+    added. Optional quantiles of the average score come from a fixed-bin
+    histogram per step over [lo, hi] (resolution (hi - lo) / bins).
+    summary() can be called at any time, e.g. from an on_run callback.
+    """
+
+    def __init__(self, steps: int, quantiles=None, bins: int = 1000, lo: float = 0.0, hi: float = 1.0):
+        self.steps = steps
+        self.n = 0
+        self.mean = {col: np.zeros(steps) for col in SUMMARY_COLUMNS.values()}
+        self.m2 = {col: np.zeros(steps) for col in SUMMARY_COLUMNS.values()}
+        self.quantiles = tuple(quantiles or ())
+        self.lo, self.hi, self.bins = lo, hi, bins
+        self.hist = np.zeros((steps, bins), dtype=np.int64) if self.quantiles else None
+
+    def update(self, mdf: pd.DataFrame) -> None:
+        """Add one run's model-vars frame (one row per step, ordered by Step)."""
+        self.n += 1
+        for col in self.mean:
+            x = mdf[col].to_numpy(dtype=float)
+            delta = x - self.mean[col]
+            self.mean[col] += delta / self.n
+            self.m2[col] += delta * (x - self.mean[col])
+        if self.hist is not None:
+            x = mdf["AverageSustainability"].to_numpy(dtype=float)
+            b = np.clip(((x - self.lo) / (self.hi - self.lo) * self.bins).astype(int), 0, self.bins - 1)
+            self.hist[np.arange(self.steps), b] += 1
+
+    def std(self, col: str) -> np.ndarray:
+        """Sample standard deviation per step (NaN with fewer than two runs, like pandas)."""
+        if self.n < 2:
+            return np.full(self.steps, np.nan)
+        return np.sqrt(self.m2[col] / (self.n - 1))
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Per-step q-quantile of the average score, interpolated within histogram bins."""
+        cum = np.cumsum(self.hist, axis=1)
+        target = q * self.n
+        idx = np.minimum((cum < target).sum(axis=1), self.bins - 1)
+        rows = np.arange(self.steps)
+        below = np.where(idx > 0, cum[rows, idx - 1], 0)
+        inside = self.hist[rows, idx]
+        frac = np.divide(target - below, inside, out=np.zeros(self.steps), where=inside > 0)
+        width = (self.hi - self.lo) / self.bins
+        return self.lo + (idx + np.clip(frac, 0, 1)) * width
+
+    def summary(self) -> pd.DataFrame:
+        agg = pd.DataFrame({"Step": np.arange(self.steps)})
+        for name, col in SUMMARY_COLUMNS.items():
+            agg[name] = self.mean[col]
+            if name == "Avg":
+                agg["Std"] = self.std(col)
+        for q in self.quantiles:
+            agg[f"AvgQ{int(round(q * 100)):02d}"] = self.quantile(q)
+        agg["CI95"] = 1.96 * agg["Std"] / np.sqrt(max(self.n, 1))
+        return agg
+
+
+# ----------------------------
+# Per-run endpoints (adaptive stopping)
+# ----------------------------
+
+ENDPOINTS = ("FinalAvg", "FinalShare3", "TimeToTarget")
+# CI95 half-widths at which adaptive runs stop (score units, share, steps)
+DEFAULT_TOLERANCE = {"FinalAvg": 0.01, "FinalShare3": 0.02, "TimeToTarget": 2.0}
+
+
+def run_endpoints(mdf: pd.DataFrame, target: float = 0.80) -> dict:
+    """
+    Final average, final State 3 share and time to target of one run.
+    A run that never reaches target counts as len(mdf) steps (censored).
+    """
+    avg = mdf["AverageSustainability"].to_numpy(dtype=float)
+    hit = np.flatnonzero(avg >= target)
+    return {
+        "FinalAvg": avg[-1],
+        "FinalShare3": float(mdf["ShareState3"].iloc[-1]),
+        "TimeToTarget": float(mdf["Step"].iloc[hit[0]]) if hit.size else float(len(avg)),
+    }
+
+
+class EndpointStats:
+    """Running mean / variance (Welford) of run_endpoints over the runs added so far."""
+
+    def __init__(self, target: float = 0.80):
+        self.target = target
+        self.n = 0
+        self.hits = 0
+        self.mean = dict.fromkeys(ENDPOINTS, 0.0)
+        self.m2 = dict.fromkeys(ENDPOINTS, 0.0)
+
+    def update(self, mdf: pd.DataFrame) -> None:
+        self.n += 1
+        ends = run_endpoints(mdf, self.target)
+        self.hits += bool((mdf["AverageSustainability"] >= self.target).any())
+        for name, x in ends.items():
+            delta = x - self.mean[name]
+            self.mean[name] += delta / self.n
+            self.m2[name] += delta * (x - self.mean[name])
+
+    def half_width(self, name: str) -> float:
+        """CI95 half-width of the mean endpoint (inf with fewer than two runs)."""
+        if self.n < 2:
+            return float("inf")
+        return 1.96 * np.sqrt(self.m2[name] / (self.n - 1)) / np.sqrt(self.n)
+
+    def converged(self, tol: dict) -> bool:
+        """True once every endpoint in tol has a CI95 half-width <= its tolerance."""
+        return all(self.half_width(name) <= t for name, t in tol.items())
+
+    def report(self) -> dict:
+        out = {"Runs": self.n, "ReachedTarget": self.hits}
+        for name in ENDPOINTS:
+            out[name] = self.mean[name]
+            out[f"{name}CI95"] = self.half_width(name)
+        return out
@@ -0,0 +1,271 @@
+"""
+Performance benchmarks: network build, model init, step, data collection,
+Monte Carlo runs and the sweep functions, at several population sizes, and
+the startup cost of cli.py and of process-pool workers.
+
+    python benchmarks.py                       # all sizes (300 .. 300k)
+    python benchmarks.py --sizes 300 3000 --quick
+
+Each result (seconds, agent-steps/s, peak traced memory) is appended to
+data/benchmarks/history.jsonl with the git commit, so runs on different
+commits can be compared; the summary flags anything slower than the last
+recorded run of the same benchmark on another commit.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from functions_and_parameters import generate_multiplex, DEFAULT_PARAMS
+from model import SustainableEatingModel
+from neighbors import use_compiled
+import runner
+import sweeps
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+HISTORY = os.path.join(_HERE, "..", "data", "benchmarks", "history.jsonl")
+
+SIZES = (300, 3000, 30000, 300000)
+SCENARIOS = ("social", "campaign", "economic", "combo")
+# the pure-Python paths are O(N^2) / per-agent objects: only benchmark them where they are usable
+MAX_PAIRWISE = 3000
+MAX_AGENTS_ENGINE = 30000
+
+MODEL_ARGS = dict(network_type="small_world", average_degree=4, rewiring_prob=0.1)
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_HERE, capture_output=True, text=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=_HERE,
+                               capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "") if out.returncode == 0 else "unknown"
+    except OSError:
+        return "unknown"
+
+
+def measure(fn, repeat=3):
+    """Best wall time of `repeat` calls, then peak traced memory (MB) of one more call."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak / 1e6
+
+
+def _network(engine, n):
+    # main.py's setup (agents on the pairwise multiplex) at its own size; the block generator beyond
+    return "pairwise" if engine == "agents" and n <= 300 else "block"
+
+
+def _model(n, scenario="combo", engine="vectorized", steps=60, **kwargs):
+    return SustainableEatingModel(n, scenario=scenario, steps=steps, engine=engine, network=_network(engine, n),
+                                  reference_size=300, **MODEL_ARGS, **kwargs)
+
+
+def warmup():
+    """Load/compile the optional kernels and import-time caches outside the timed region."""
+    for scenario in SCENARIOS:
+        m = _model(300, scenario, rng=np.random.default_rng(0))
+        m.step()
+
+
+# ----------------------------
+# Benchmarks: each yields (name, params, seconds, agent_steps, peak_mb)
+# ----------------------------
+
+def bench_network(n, repeat):
+    methods = ("pairwise", "block") if n <= MAX_PAIRWISE else ("block",)
+    for method in methods:
+        def build():
+            generate_multiplex(n, method=method, as_edges=True, reference_size=300,
+                               rng=np.random.default_rng(1), params=DEFAULT_PARAMS)
+        secs, peak = measure(build, repeat)
+        yield "generate_multiplex", {"method": method}, secs, None, peak
+
+
+def _engines(n):
+    return ("agents", "vectorized") if n <= MAX_AGENTS_ENGINE else ("vectorized",)
+
+
+def bench_model(n, repeat, steps=10):
+    for engine in _engines(n):
+        secs, peak = measure(lambda: _model(n, engine=engine, rng=np.random.default_rng(1)), repeat)
+        yield "model_init", {"engine": engine}, secs, None, peak
+        for scenario in SCENARIOS:
+            def run_steps():
+                m = _model(n, scenario, engine, rng=np.random.default_rng(1))
+                t0 = time.perf_counter()
+                for _ in range(steps):
+                    m.step()
+                return time.perf_counter() - t0
+            # time only the steps, not the construction
+            secs = min(run_steps() for _ in range(repeat))
+            tracemalloc.start()
+            run_steps()
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            yield "model_step", {"engine": engine, "scenario": scenario}, secs / steps, n, peak
+        m = _model(n, engine=engine, rng=np.random.default_rng(1))
+        m.step()
+        secs, peak = measure(lambda: m.datacollector.collect(m), repeat)
+        yield "datacollector_collect", {"engine": engine}, secs, None, peak
+
+
+def bench_monte_carlo(n, repeat, n_runs=10, steps=60):
+    base = dict(num_agents=n, steps=steps, reference_size=300, **MODEL_ARGS)
+    modes = [
+        ("vectorized", dict(engine="vectorized", network="block"), {}),
+        ("batched", dict(engine="vectorized", network="block"), {"batched": True}),
+        # process pool: runs sent back as pickled frames vs written into shared memory
+        ("pool_pickle", dict(engine="vectorized", network="block"), {"workers": 2, "transport": "pickle"}),
+        ("pool_shm", dict(engine="vectorized", network="block"), {"workers": 2, "transport": "shm"}),
+    ]
+    if n <= MAX_AGENTS_ENGINE:
+        modes.insert(0, ("agents", dict(engine="agents", network=_network("agents", n)), {}))
+    for mode, model_kwargs, run_kwargs in modes:
+        fn = lambda: runner.run_monte_carlo("combo", steps, n_runs=n_runs, base_params=dict(base, **model_kwargs),
+                                            **run_kwargs)
+        secs, peak = measure(fn, repeat)
+        yield "run_monte_carlo", {"mode": mode, "n_runs": n_runs}, secs, n * steps * n_runs, peak
+
+
+def bench_sweeps(n, repeat, n_runs=2, steps=20):
+    base = dict(num_agents=n, steps=steps, reference_size=300, engine="vectorized", network="block", **MODEL_ARGS)
+    for name, fn, values in (("sweep_backlash", sweeps.sweep_backlash, [0.2, 0.3]),
+                             ("sweep_halflife", sweeps.sweep_halflife, [10, 14]),
+                             ("sweep_taxmax", sweeps.sweep_taxmax, [0.26, 0.30])):
+        with tempfile.TemporaryDirectory() as tmp:
+            run = lambda: fn(runner.run_monte_carlo, values, steps, n_runs=n_runs, data_dir=tmp, base_params=base, workers=1)
+            secs, peak = measure(run, repeat)
+        yield name, {"points": len(values), "n_runs": n_runs}, secs, n * steps * n_runs * len(values), peak
+
+
+def _wall(cmd, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=_HERE, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+# a fresh interpreter that starts one spawn-method pool worker and waits for its first result
+_POOL_PROBE = """
+import time, multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import runner
+t0 = time.perf_counter()
+with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as pool:
+    pool.submit(runner.run_rng, 0, 0).result()
+print(time.perf_counter() - t0)
+"""
+
+
+def bench_startup(n, repeat):
+    """Process startup (size-independent: only run for the first size); no memory figure."""
+    py = sys.executable
+    yield "startup", {"what": "cli_help"}, _wall([py, "cli.py", "--help"], repeat), None, 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = [py, "cli.py", "--data-dir", tmp, "run-scenario", "social", "--runs", "1", "--steps", "1",
+               "--agents", "100"]
+        yield "startup", {"what": "run_scenario"}, _wall(cmd, repeat), None, 0.0
+    secs = min(float(subprocess.run([py, "-c", _POOL_PROBE], cwd=_HERE, check=True, capture_output=True,
+                                    text=True).stdout) for _ in range(repeat))
+    yield "startup", {"what": "pool_worker"}, secs, None, 0.0
+
+
+BENCHMARKS = {
+    "network": bench_network,
+    "model": bench_model,
+    "monte_carlo": bench_monte_carlo,
+    "sweeps": bench_sweeps,
+    "startup": bench_startup,
+}
+
+
+# ----------------------------
+# History
+# ----------------------------
+
+def _bench_key(rec):
+    return rec["bench"], rec["size"], json.dumps(rec["params"], sort_keys=True)
+
+
+def load_history(path=HISTORY):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(records, history, slower=1.2):
+    """Print each result next to the latest earlier result on another commit; flag slowdowns."""
+    previous = {}
+    for rec in history:
+        if rec["commit"] != records[0]["commit"]:
+            previous[_bench_key(rec)] = rec
+    print(f"{'benchmark':<24}{'size':>8}  {'params':<42}{'seconds':>10}{'agent-steps/s':>15}{'peak MB':>9}  vs prev")
+    for rec in records:
+        prev = previous.get(_bench_key(rec))
+        ratio = rec["seconds"] / prev["seconds"] if prev else None
+        flag = "" if ratio is None else f"{ratio:5.2f}x ({prev['commit']})" + ("  SLOWER" if ratio > slower else "")
+        rate = f"{rec['agent_steps_per_s']:.3g}" if rec["agent_steps_per_s"] else "-"
+        params = ",".join(f"{k}={v}" for k, v in rec["params"].items())
+        print(f"{rec['bench']:<24}{rec['size']:>8}  {params:<42}{rec['seconds']:>10.4f}{rate:>15}"
+              f"{rec['peak_mb']:>9.1f}  {flag}")
+
+
+def run_benchmarks(sizes=SIZES, groups=tuple(BENCHMARKS), repeat=3, history=HISTORY):
+    commit = git_commit()
+    stamp = datetime.now().isoformat(timespec="seconds")
+    env = {"python": platform.python_version(), "numpy": np.__version__, "numba": use_compiled("auto"),
+           "machine": platform.machine(), "cpus": os.cpu_count()}
+    records = []
+    warmup()
+    for n in sizes:
+        for group in groups:
+            # Monte Carlo / sweeps at 300k agents take minutes per repeat; cap them at 30k
+            if group in ("monte_carlo", "sweeps") and n > MAX_AGENTS_ENGINE:
+                continue
+            if group == "startup" and n != sizes[0]:
+                continue
+            for name, params, secs, agent_steps, peak in BENCHMARKS[group](n, repeat):
+                rec = {"bench": name, "size": n, "params": params, "seconds": secs,
+                       "agent_steps_per_s": agent_steps / secs if agent_steps else None,
+                       "peak_mb": peak, "commit": commit, "timestamp": stamp, **env}
+                records.append(rec)
+                print(f"  {name} n={n} {params}: {secs:.4f}s")
+
+    past = load_history(history)
+    os.makedirs(os.path.dirname(history), exist_ok=True)
+    with open(history, "a") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+    compare(records, past)
+    print(f"Appended {len(records)} results to {history}")
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="one repeat per benchmark")
+    parser.add_argument("--history", default=HISTORY)
+    args = parser.parse_args()
+    run_benchmarks(args.sizes, args.only, 1 if args.quick else args.repeat, args.history)
@@ -0,0 +1,177 @@
+"""
+Command-line entry point: one experiment at a time instead of main.py's full pipeline.
+
+    python cli.py run-scenario combo --runs 20 --engine vectorized --network block --workers 4
+    python cli.py sweep halflife --values 6 10 14 --runs 20
+    python cli.py summarize ../data/sustainable_eating_*_summary_<timestamp>.csv
+    python cli.py plot ../data/sustainable_eating_*_summary_<timestamp>.csv
+
+Only argparse is imported up front; each subcommand imports what it needs, so
+`--help` is instant, process-pool workers (which re-import this module under
+the spawn start method) load only the simulation modules, and matplotlib is
+only loaded by render.py when a figure is actually drawn. Startup of a
+single-scenario run and of pool workers is tracked by benchmarks.py --only startup.
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(_HERE, "..", "data")
+SCENARIOS = ("social", "campaign", "economic", "combo")
+
+
+def _number(s: str):
+    """Sweep values as given: ints stay ints (they end up in cache keys and file names)."""
+    try:
+        return int(s)
+    except ValueError:
+        return float(s)
+
+
+def _timestamp() -> str:
+    return datetime.now().strftime("%d%m%Y-%H%M%S")
+
+
+def _base_params(args) -> dict:
+    base = {
+        "num_agents": args.agents,
+        "network_type": "small_world",
+        "average_degree": 4,
+        "rewiring_prob": 0.1,
+        "steps": args.steps,
+        "collect_agents": False,
+        "engine": args.engine,
+        "network": args.network,
+        "network_cache": os.path.join(args.data_dir, "cache", "networks") if args.network_cache else None,
+    }
+    if args.telemetry:
+        from telemetry import Telemetry
+        base["telemetry"] = Telemetry(args.telemetry)
+    return base
+
+
+def _read_summaries(paths) -> dict:
+    """scenario -> summary frame; the scenario is 'name=path' or taken from main.py's file names."""
+    import pandas as pd
+    summaries = {}
+    for arg in paths:
+        name, sep, path = arg.partition("=")
+        if not sep:
+            path = arg
+            m = re.match(r"sustainable_eating_(\w+?)_summary_", os.path.basename(path))
+            name = m.group(1) if m else os.path.splitext(os.path.basename(path))[0]
+        summaries[name] = pd.read_csv(path)
+    return summaries
+
+
+# ----------------------------
+# Subcommands
+# ----------------------------
+
+def cmd_run_scenario(args) -> None:
+    timestamp = _timestamp()
+    os.makedirs(args.data_dir, exist_ok=True)
+    if args.shards:
+        from sharded import run_sharded
+        all_runs, summary = run_sharded(args.scenario, args.steps, n_runs=args.runs, seed0=args.seed,
+                                        base_params=_base_params(args), n_shards=args.shards, crn=args.crn)
+    else:
+        import runner
+        all_runs, summary = runner.run_monte_carlo(args.scenario, args.steps, n_runs=args.runs, seed0=args.seed,
+                                                   base_params=_base_params(args), batched=args.batched,
+                                                   workers=args.workers, crn=args.crn)
+    all_runs_out = os.path.join(args.data_dir, f"sustainable_eating_{args.scenario}_allruns_{timestamp}.csv")
+    summary_out = os.path.join(args.data_dir, f"sustainable_eating_{args.scenario}_summary_{timestamp}.csv")
+    all_runs.to_csv(all_runs_out, index=False)
+    summary.to_csv(summary_out, index=False)
+    print(f"Saved: {all_runs_out}")
+    print(f"Saved: {summary_out}")
+    if args.plot:
+        from plots import plot_all
+        plot_all({args.scenario: summary}, os.path.join(args.data_dir, "plots"), timestamp)
+
+
+def cmd_sweep(args) -> None:
+    from sweeps import sweep_parameter
+    sweep_parameter(args.name, args.values, args.steps, n_runs=args.runs, target=args.target,
+                    data_dir=args.data_dir, plot_dir=os.path.join(args.data_dir, "plots"), timestamp=_timestamp(),
+                    seed0=args.seed, base_params=_base_params(args), workers=args.workers or 1,
+                    cache_dir=None if args.no_cache else os.path.join(args.data_dir, "cache", "runs"),
+                    crn=args.crn, fork=args.fork)
+
+
+def cmd_summarize(args) -> None:
+    from functions_and_parameters import write_endpoint_summary
+    summaries = _read_summaries(args.summaries)
+    # summaries written by main.py / run-scenario have no run count: take it from --runs
+    write_endpoint_summary(summaries, args.data_dir, _timestamp(), n_runs_main=args.runs, target=args.target)
+
+
+def cmd_plot(args) -> None:
+    from plots import plot_all
+    paths = plot_all(_read_summaries(args.summaries), args.plot_dir or os.path.join(args.data_dir, "plots"),
+                     args.timestamp or _timestamp(), workers=args.workers)
+    for key, path in paths.items():
+        print(f"{key}: {path}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sim = argparse.ArgumentParser(add_help=False)
+    sim.add_argument("--runs", type=int, default=100)
+    sim.add_argument("--steps", type=int, default=60)
+    sim.add_argument("--agents", type=int, default=300)
+    sim.add_argument("--engine", choices=("agents", "vectorized"), default="agents")
+    sim.add_argument("--network", choices=("pairwise", "block"), default="pairwise")
+    sim.add_argument("--seed", type=int, default=123)
+    sim.add_argument("--workers", type=int, default=None, help="process-pool workers (default: serial)")
+    sim.add_argument("--crn", action="store_true", help="common random numbers")
+    sim.add_argument("--target", type=float, default=0.80)
+    sim.add_argument("--network-cache", action="store_true",
+                     help="reuse multiplex networks across runs from <data-dir>/cache/networks")
+    sim.add_argument("--telemetry", metavar="PATH", help="write per-phase telemetry JSON lines to PATH")
+
+    p = sub.add_parser("run-scenario", parents=[sim], help="Monte Carlo runs of one scenario -> CSVs")
+    p.add_argument("scenario", choices=SCENARIOS)
+    p.add_argument("--batched", action="store_true", help="advance the runs in lockstep (vectorized engine)")
+    p.add_argument("--shards", type=int, default=0,
+                   help="split each run's population over this many processes (vectorized engine, see sharded.py)")
+    p.add_argument("--plot", action="store_true", help="also render the scenario's figures")
+    p.set_defaults(func=cmd_run_scenario)
+
+    p = sub.add_parser("sweep", parents=[sim], help="one-parameter sweep of 'combo' -> CSVs + plots")
+    p.add_argument("name", choices=("backlash", "halflife", "taxmax"))
+    p.add_argument("--values", type=_number, nargs="+", required=True)
+    p.add_argument("--fork", action="store_true", help="fork the sweep points from a shared checkpoint")
+    p.add_argument("--no-cache", action="store_true", help="do not use the on-disk run cache")
+    p.set_defaults(func=cmd_sweep, runs=20)
+
+    p = sub.add_parser("summarize", help="endpoint summary of scenario summary CSVs")
+    p.add_argument("summaries", nargs="+", help="summary CSVs (optionally name=path)")
+    p.add_argument("--runs", type=int, default=100, help="runs behind each summary (for the CI)")
+    p.add_argument("--target", type=float, default=0.80)
+    p.set_defaults(func=cmd_summarize)
+
+    p = sub.add_parser("plot", help="render the scenario figures from summary CSVs")
+    p.add_argument("summaries", nargs="+", help="summary CSVs (optionally name=path)")
+    p.add_argument("--plot-dir", default=None, help="default: <data-dir>/plots")
+    p.add_argument("--timestamp", default=None, help="file name suffix (default: now)")
+    p.add_argument("--workers", type=int, default=None, help="render processes (default: one per CPU)")
+    p.set_defaults(func=cmd_plot)
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+# Guarded so process-pool workers (spawn start method) can re-import this module
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,190 @@
+import os
+import numpy as np
+import pandas as pd
+
+from functions_and_parameters import DEFAULT_PARAMS
+
+# Independent streams of one run: SeedSequence(seed0, spawn_key=(run, stream))
+NETWORK, AGENTS, TICKS = 0, 1, 2
+
+
+# SplitMix64: state k = key + k * GOLDEN, output mix(state k); any position can be computed directly
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _stream(seed0: int, run: int, *stream) -> np.random.Generator:
+    return np.random.default_rng(np.random.SeedSequence(seed0, spawn_key=(run, *stream)))
+
+
+def _splitmix_uniforms(z: np.ndarray) -> np.ndarray:
+    """SplitMix64 outputs of the states in z (uint64, overwritten) as uniforms in [0, 1) with 53-bit resolution."""
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(0xBF58476D1CE4E5B9)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    z >>= np.uint64(11)
+    return z * (1.0 / 2.0 ** 53)
+
+
+class CommonDraws:
+    """
+    All randomness of one run, drawn up front so that every scenario and sweep
+    point consumes exactly the same numbers (common random numbers).
+
+    Per agent: the initial-state uniform, habit/threshold/identity priors and
+    campaign/economic sensitivities. Per tick: three uniforms per agent, in
+    fixed slots (0: backlash fires, 1: backlash step-down, 2: move up/down),
+    used whether or not the agent needs them, so a draw never shifts to another
+    agent or tick when the scenario changes. Tick t's uniforms are a
+    counter-based stream: SplitMix64 keyed by SeedSequence(seed0,
+    spawn_key=(run, TICKS, t)), where agent i's slot s is position 3 * i + s.
+    They are computed when the tick runs (uniforms), so memory does not grow
+    with steps, and a subset of agents (a shard) computes only its own
+    positions, the same numbers the full population gets. The network comes
+    from its own stream (network_rng).
+    """
+
+    def __init__(self, num_agents: int, steps: int, seed0: int, run: int, params=DEFAULT_PARAMS):
+        self.num_agents = self.population = num_agents
+        self.steps = steps
+        self.agents = None   # subset of the population (subset), None = all
+        self._offsets = None  # SplitMix64 offsets of the agents' tick slots (_tick)
+        self.seed0, self.run = seed0, run
+        g = _stream(seed0, run, AGENTS)
+        p = params
+        self.state_u = g.random(num_agents)
+        self.habit = g.beta(p.habit_alpha, p.habit_beta, num_agents)
+        self.threshold = g.beta(p.threshold_alpha, p.threshold_beta, num_agents)
+        self.identity = g.beta(p.identity_alpha, p.identity_beta, num_agents)
+        self.campaign = np.maximum(0.0, g.lognormal(-0.2, 0.5, num_agents))
+        self.econ = np.clip(g.normal(1.0, 0.25, num_agents), 0.2, 2.0)
+
+    @classmethod
+    def stack(cls, draws):
+        """Stack several runs' draws for the batched engine: (runs, agents) traits, (3, runs, agents) uniforms."""
+        stacked = cls.__new__(cls)
+        stacked.num_agents, stacked.population, stacked.agents = draws[0].num_agents, draws[0].population, None
+        stacked._offsets = None
+        stacked.seed0, stacked.run = draws[0].seed0, [d.run for d in draws]
+        for name in ("state_u", "habit", "threshold", "identity", "campaign", "econ"):
+            setattr(stacked, name, np.stack([getattr(d, name) for d in draws]))
+        return stacked
+
+    def subset(self, agents) -> "CommonDraws":
+        """The draws of some agents (in the given order), e.g. one shard of a sharded run."""
+        sub = CommonDraws.__new__(CommonDraws)
+        sub.num_agents, sub.population = len(agents), self.population
+        sub.agents = np.asarray(agents) if self.agents is None else self.agents[agents]
+        sub._offsets = None
+        sub.seed0, sub.run = self.seed0, self.run
+        for name in ("state_u", "habit", "threshold", "identity", "campaign", "econ"):
+            setattr(sub, name, getattr(self, name)[agents])
+        return sub
+
+    def network_rng(self) -> np.random.Generator:
+        return _stream(self.seed0, self.run, NETWORK)
+
+    def agent_draws(self, uid: int):
+        """(state uniform, habit, threshold, identity, campaign, econ) of one agent."""
+        return (float(self.state_u[uid]), float(self.habit[uid]), float(self.threshold[uid]),
+                float(self.identity[uid]), float(self.campaign[uid]), float(self.econ[uid]))
+
+    def _tick(self, run: int, t: int) -> np.ndarray:
+        if self._offsets is None:
+            ids = np.arange(self.population) if self.agents is None else self.agents
+            # stream positions 3 * id + slot, as offsets from the key (position k is state k + 1)
+            pos = 3 * ids.astype(np.uint64) + np.arange(1, 4, dtype=np.uint64)[:, None]
+            self._offsets = pos * GOLDEN
+        key = np.random.SeedSequence(self.seed0, spawn_key=(run, TICKS, t)).generate_state(1, np.uint64)[0]
+        return _splitmix_uniforms(self._offsets + key)
+
+    def uniforms(self, t: int) -> np.ndarray:
+        """The (3, agents) uniforms of tick t ((3, runs, agents) when stacked)."""
+        if isinstance(self.run, list):
+            return np.stack([self._tick(run, t) for run in self.run], axis=1)
+        return self._tick(self.run, t)
+
+
+# ----------------------------
+# Paired-difference summaries
+# ----------------------------
+
+def _per_run(all_runs: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Steps x runs table of one reporter."""
+    return all_runs.pivot(index="Step", columns="Run", values=column).sort_index(axis=1)
+
+
+def _time_to_target(avg: pd.DataFrame, target: float) -> pd.Series:
+    """First step each run's average reaches target (NaN if never)."""
+    hit = avg.ge(target)
+    return pd.Series(np.where(hit.any(), hit.idxmax(), np.nan), index=avg.columns)
+
+
+def _diff_stats(a: np.ndarray, b: np.ndarray) -> dict:
+    ok = ~(np.isnan(a) | np.isnan(b))
+    d = a[ok] - b[ok]
+    n = int(ok.sum())
+    std = d.std(ddof=1) if n > 1 else np.nan
+    unpaired = np.sqrt(np.nanvar(a, ddof=1) / n + np.nanvar(b, ddof=1) / n) if n > 1 else np.nan
+    return {"Diff": d.mean() if n else np.nan, "CI95": 1.96 * std / np.sqrt(n) if n > 1 else np.nan,
+            "UnpairedCI95": 1.96 * unpaired, "N": n}
+
+
+def paired_differences(runs: dict, baseline: str) -> pd.DataFrame:
+    """
+    Per-step scenario - baseline differences of the average score and State 3
+    share, paired by run, with CI95 of the mean difference.
+    runs: dict[scenario] -> all-runs frame from CRN runs with the same seed0.
+    """
+    rows = []
+    base = {c: _per_run(runs[baseline], c) for c in ("AverageSustainability", "ShareState3")}
+    for scenario, all_runs in runs.items():
+        if scenario == baseline:
+            continue
+        df = pd.DataFrame({"Step": base["AverageSustainability"].index, "Scenario": scenario})
+        for name, col in (("Avg", "AverageSustainability"), ("Share3", "ShareState3")):
+            d = _per_run(all_runs, col) - base[col]
+            df[f"Diff{name}"] = d.mean(axis=1).to_numpy()
+            df[f"Diff{name}CI95"] = (1.96 * d.std(axis=1) / np.sqrt(d.shape[1])).to_numpy()
+        rows.append(df)
+    return pd.concat(rows, ignore_index=True)
+
+
+def paired_endpoints(runs: dict, baseline: str, target: float = 0.80) -> pd.DataFrame:
+    """
+    Endpoint effects vs baseline (final average, final State 3 share, time to
+    target), paired by run. UnpairedCI95 is what the same number of independent
+    runs would give, for comparison.
+    """
+    base_avg = _per_run(runs[baseline], "AverageSustainability")
+    base_s3 = _per_run(runs[baseline], "ShareState3")
+    base_ends = {
+        "FinalAvg": base_avg.iloc[-1].to_numpy(),
+        "FinalShare3": base_s3.iloc[-1].to_numpy(),
+        f"TimeToTarget(Avg>={target:.2f})": _time_to_target(base_avg, target).to_numpy(),
+    }
+    rows = []
+    for scenario, all_runs in runs.items():
+        if scenario == baseline:
+            continue
+        avg = _per_run(all_runs, "AverageSustainability")
+        ends = {
+            "FinalAvg": avg.iloc[-1].to_numpy(),
+            "FinalShare3": _per_run(all_runs, "ShareState3").iloc[-1].to_numpy(),
+            f"TimeToTarget(Avg>={target:.2f})": _time_to_target(avg, target).to_numpy(),
+        }
+        for metric, values in ends.items():
+            rows.append({"Scenario": scenario, "Baseline": baseline, "Metric": metric,
+                         **_diff_stats(values, base_ends[metric])})
+    return pd.DataFrame(rows)
+
+
+def write_paired_summary(runs: dict, baseline: str, data_dir: str, timestamp: str, target: float = 0.80):
+    """Save paired per-step differences and endpoint effects vs baseline as CSVs."""
+    steps_out = os.path.join(data_dir, f"paired_differences_{baseline}_{timestamp}.csv")
+    ends_out = os.path.join(data_dir, f"paired_endpoints_{baseline}_{timestamp}.csv")
+    paired_differences(runs, baseline).to_csv(steps_out, index=False)
+    paired_endpoints(runs, baseline, target).to_csv(ends_out, index=False)
+    print(f"Saved paired summary: {ends_out}")
+    return ends_out
@@ -1,5 +1,8 @@
+import hashlib
+import json
 import math
 import random
+from dataclasses import asdict, dataclass, replace as _dc_replace
 import networkx as nx
 import numpy as np
 import pandas as pd
@@ -38,8 +41,9 @@ TAX_MAX   = 0.30
 TAX_PIVOT = 0.55
 TAX_K     = 10.0
 def tax_signal(adoption_share: float) -> float:
+    # works on a scalar share or an array of shares (one per batched run)
     x = TAX_K * (adoption_share - TAX_PIVOT)
-    return TAX_MAX / (1.0 + math.exp(-x))
+    return TAX_MAX / (1.0 + np.exp(-x))
 
 # Backlash controls
 BACKLASH_GAP = 1.2  # trigger if neighbour mean state exceeds mine by >= this
@@ -68,10 +72,83 @@ N_TRIBES = 3
 OFFLINE_WEIGHT = 0.7
 ONLINE_WEIGHT  = 0.3
 
-def generate_multiplex(num_agents: int, seed=None):
-    # use globally seeded numpy RNG for reproducibility
-    rng = np.random
-    tribes = rng.randint(0, N_TRIBES, size=num_agents)
+# ----------------------------
+# Parameter set
+# ----------------------------
+
+@dataclass(frozen=True)
+class ModelParams:
+    """
+    All constants above as one frozen, hashable object (lower-case names).
+    Passed explicitly to SustainableEatingModel so runs with different
+    settings can run side by side and be cached/deduplicated by value.
+    """
+    state_scores: tuple = tuple(STATE_SCORES)
+    threshold_alpha: float = THRESHOLD_ALPHA
+    threshold_beta: float = THRESHOLD_BETA
+    habit_alpha: float = HABIT_ALPHA
+    habit_beta: float = HABIT_BETA
+    habit_decay: float = HABIT_DECAY
+    identity_alpha: float = IDENTITY_ALPHA
+    identity_beta: float = IDENTITY_BETA
+    campaign_start: int = CAMPAIGN_START
+    campaign_end: int = CAMPAIGN_END
+    campaign_base_strength: float = CAMPAIGN_BASE_STRENGTH
+    campaign_half_life: float = CAMPAIGN_HALF_LIFE
+    tax_max: float = TAX_MAX
+    tax_pivot: float = TAX_PIVOT
+    tax_k: float = TAX_K
+    backlash_gap: float = BACKLASH_GAP
+    backlash_scale: float = BACKLASH_SCALE
+    homophily_p_same: float = HOMOPHILY_P_SAME
+    homophily_p_diff: float = HOMOPHILY_P_DIFF
+    n_tribes: int = N_TRIBES
+    offline_weight: float = OFFLINE_WEIGHT
+    online_weight: float = ONLINE_WEIGHT
+
+    def replace(self, **changes) -> "ModelParams":
+        """Copy with some values changed; constant names work too (BACKLASH_SCALE=0.2)."""
+        return _dc_replace(self, **{k.lower(): v for k, v in changes.items()})
+
+    def tax_signal(self, adoption_share):
+        x = self.tax_k * (adoption_share - self.tax_pivot)
+        return self.tax_max / (1.0 + np.exp(-x))
+
+    def digest(self) -> str:
+        """Stable content hash (numbers compared by value, so 14 == 14.0) for on-disk caches."""
+        canon = {k: ([float(x) for x in v] if isinstance(v, tuple) else float(v))
+                 for k, v in asdict(self).items()}
+        return hashlib.sha1(json.dumps(canon, sort_keys=True).encode()).hexdigest()
+
+
+DEFAULT_PARAMS = ModelParams()
+
+def randint(rng, low, high, size=None):
+    """rng.randint for np.random / RandomState, rng.integers for a Generator."""
+    draw = rng.integers if isinstance(rng, np.random.Generator) else rng.randint
+    return draw(low, high, size=size)
+
+
+def generate_multiplex(num_agents: int, seed=None, method="pairwise", as_edges=False, reference_size=None,
+                       rng=None, params=DEFAULT_PARAMS):
+    # method="block" uses the fast SBM/BA generators below; as_edges returns
+    # (E, 2) edge arrays instead of networkx graphs. rng: explicit numpy
+    # Generator (default: the globally seeded np.random)
+    rng = np.random if rng is None else rng
+    if method == "block":
+        off, on, tribes = generate_multiplex_edges(num_agents, rng=rng, reference_size=reference_size,
+                                                   params=params)
+        if as_edges:
+            return off, on, tribes
+        return edges_to_graph(off, num_agents, tribes), edges_to_graph(on, num_agents), tribes
+    if method != "pairwise":
+        raise ValueError(f"Unknown multiplex method: {method}")
+    if as_edges:
+        G_off, G_on, tribes = generate_multiplex(num_agents, seed, rng=rng, params=params)
+        return (np.array(G_off.edges(), dtype=np.int64).reshape(-1, 2),
+                np.array(G_on.edges(), dtype=np.int64).reshape(-1, 2), tribes)
+
+    tribes = randint(rng, 0, params.n_tribes, size=num_agents)
 
     # Offline: homophilous random graph
     G_off = nx.Graph()
@@ -81,8 +158,8 @@ def generate_multiplex(num_agents: int, seed=None):
     for i in range(num_agents):
         for j in range(i+1, num_agents):
             same = (tribes[i] == tribes[j])
-            p = HOMOPHILY_P_SAME if same else HOMOPHILY_P_DIFF
-            if rng.rand() < p:
+            p = params.homophily_p_same if same else params.homophily_p_diff
+            if rng.random() < p:
                 G_off.add_edge(i, j)
 
     # connect components if needed (unchanged)
@@ -93,9 +170,153 @@ def generate_multiplex(num_agents: int, seed=None):
             G_off.add_edge(a, b)
 
     # Online: Barabási–Albert with a deterministic seed
-    ba_seed = int(np.random.randint(0, np.iinfo(np.int32).max))  
+    ba_seed = int(randint(rng, 0, np.iinfo(np.int32).max))
     G_on = nx.barabasi_albert_graph(num_agents, m=2, seed=ba_seed)
     return G_off, G_on, tribes
+
+
+# Fast generators: same layer semantics, but edges are sampled block-wise and
+# returned as (E, 2) integer arrays instead of being added pair by pair.
+
+def _index_dtype(num_agents: int):
+    return np.int32 if num_agents < np.iinfo(np.int32).max else np.int64
+
+
+def _skip_sample(rng, n_pairs: int, p: float) -> np.ndarray:
+    """Positions of the successes among n_pairs Bernoulli(p) trials (geometric skips)."""
+    if n_pairs <= 0 or p <= 0:
+        return np.empty(0, dtype=np.int64)
+    if p >= 1:
+        return np.arange(n_pairs, dtype=np.int64)
+    expected = n_pairs * p
+    size = int(expected + 5 * math.sqrt(expected) + 16)
+    chunks, last = [], -1
+    while True:
+        idx = last + np.cumsum(rng.geometric(p, size=size).astype(np.int64))
+        if idx[-1] >= n_pairs:
+            chunks.append(idx[idx < n_pairs])
+            break
+        chunks.append(idx)
+        last = int(idx[-1])
+        size = max(16, size // 4)
+    return np.concatenate(chunks)
+
+
+def _triangle_pairs(k: np.ndarray, n: int):
+    """Map linear indices k of the upper triangle (i < j) of an n x n block to (i, j)."""
+    kf = k.astype(float)
+    i = np.floor(n - 0.5 - np.sqrt((n - 0.5) ** 2 - 2.0 * kf)).astype(np.int64)
+    def start(r):
+        return r * (2 * n - r - 1) // 2
+
+    # correct float rounding at row boundaries
+    i = np.where(start(i) > k, i - 1, i)
+    i = np.where(start(i + 1) <= k, i + 1, i)
+    j = k - start(i) + i + 1
+    return i, j
+
+
+def sbm_edges(tribes: np.ndarray, p_same: float, p_diff: float, rng=np.random) -> np.ndarray:
+    """
+    Homophilous offline layer as a stochastic block model.
+    Each tribe pair is one block of candidate pairs; its edges are drawn with
+    geometric skip sampling, so cost scales with the number of edges, not N².
+    """
+    members = [np.flatnonzero(tribes == t) for t in range(int(tribes.max()) + 1 if tribes.size else 0)]
+    parts = []
+    for a, ma in enumerate(members):
+        for b in range(a, len(members)):
+            mb = members[b]
+            if a == b:
+                k = _skip_sample(rng, ma.size * (ma.size - 1) // 2, p_same)
+                i, j = _triangle_pairs(k, ma.size)
+                parts.append(np.column_stack([ma[i], ma[j]]))
+            else:
+                k = _skip_sample(rng, ma.size * mb.size, p_diff)
+                parts.append(np.column_stack([ma[k // mb.size], mb[k % mb.size]]))
+    dtype = _index_dtype(tribes.size)
+    if not parts:
+        return np.empty((0, 2), dtype=dtype)
+    return np.concatenate(parts).astype(dtype)
+
+
+def _connect_components(edges: np.ndarray, num_agents: int) -> np.ndarray:
+    """Chain one node of each connected component, like generate_multiplex does."""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    adj = coo_matrix((np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])),
+                     shape=(num_agents, num_agents))
+    n_comp, labels = connected_components(adj, directed=False)
+    if n_comp <= 1:
+        return edges
+    _, reps = np.unique(labels, return_index=True)
+    bridges = np.column_stack([reps[:-1], reps[1:]]).astype(edges.dtype)
+    return np.concatenate([edges, bridges])
+
+
+def ba_edges(num_agents: int, m: int = 2, rng=np.random) -> np.ndarray:
+    """
+    Barabási–Albert edges (star seed of m+1 nodes, then m links per new node).
+    Every link copies a uniformly chosen endpoint of an earlier link, which is
+    exactly degree-proportional attachment; the draws are made all at once and
+    chains of copied endpoints are then followed back to a known node.
+    Repeated targets of the same new node are collapsed into one edge.
+    """
+    dtype = _index_dtype(num_agents)
+    if num_agents <= m:
+        return np.empty((0, 2), dtype=dtype)
+    n_edges = m + (num_agents - m - 1) * m
+    edge = np.arange(n_edges, dtype=np.int64)
+    source = np.where(edge < m, edge + 1, m + 1 + (edge - m) // m)
+
+    target = np.full(n_edges, -1, dtype=np.int64)
+    target[:m] = 0  # star hub
+    new = edge[m:]
+    first = m + (source[m:] - m - 1) * m            # first link of the same new node
+    slot = (rng.random(new.size) * (2 * first)).astype(np.int64)
+    copy_of = slot // 2                              # earlier link whose endpoint is copied
+    from_source = slot % 2 == 0
+    target[m:] = np.where(from_source, source[copy_of], np.where(copy_of < m, 0, -1))
+
+    # links that copied a target inherit it; follow the chains until all resolve
+    pending = np.flatnonzero(target < 0)
+    ptr = copy_of[pending - m]
+    while pending.size:
+        resolved = target[ptr]
+        done = resolved >= 0
+        target[pending[done]] = resolved[done]
+        pending, ptr = pending[~done], ptr[~done]
+        ptr = copy_of[ptr - m]
+    edges = np.unique(np.column_stack([source, target]), axis=0)
+    return edges.astype(dtype)
+
+
+def generate_multiplex_edges(num_agents: int, rng=np.random, reference_size=None, params=DEFAULT_PARAMS):
+    """
+    Fast multiplex: SBM offline layer + Barabási–Albert online layer as edge arrays.
+    Same HOMOPHILY_P_SAME/P_DIFF and N_TRIBES semantics as generate_multiplex.
+    With reference_size set, the homophily probabilities are rescaled so the
+    expected offline degree stays what it is at reference_size agents
+    (otherwise a 1M-agent offline layer would hold billions of edges).
+    """
+    p_same, p_diff = params.homophily_p_same, params.homophily_p_diff
+    if reference_size is not None and num_agents > 1:
+        scale = (reference_size - 1) / float(num_agents - 1)
+        p_same, p_diff = min(1.0, p_same * scale), min(1.0, p_diff * scale)
+
+    tribes = randint(rng, 0, params.n_tribes, size=num_agents)
+    off = _connect_components(sbm_edges(tribes, p_same, p_diff, rng), num_agents)
+    on = ba_edges(num_agents, m=2, rng=rng)
+    return off, on, tribes
+
+
+def edges_to_graph(edges: np.ndarray, num_agents: int, tribes=None) -> nx.Graph:
+    G = nx.Graph()
+    G.add_nodes_from(range(num_agents))
+    if tribes is not None:
+        nx.set_node_attributes(G, {i: int(t) for i, t in enumerate(tribes)}, "tribe")
+    G.add_edges_from(map(tuple, edges.tolist()))
+    return G
 # ----------------------------
 # Data collection setup
 # ----------------------------
@@ -123,6 +344,25 @@ def gini(arr) -> float:
     return (n + 1 - 2 * np.sum(cum) / cum[-1]) / n
 
 
+def gini_from_counts(counts, levels=STATE_SCORES):
+    """
+    gini() of a population given only how many agents sit at each discrete level.
+    counts has shape (..., len(levels)); works per run on batched counts.
+    """
+    counts = np.asarray(counts, dtype=float)
+    order = np.argsort(levels)
+    v = np.asarray(levels, dtype=float)[order]
+    c = counts[..., order]
+    n = c.sum(axis=-1)
+    before = np.cumsum(c, axis=-1) - c          # agents ranked below each level
+    # sum of the cumulative sums of the sorted values, level block by level block
+    sum_cum = np.sum(v * (c * n[..., None] - before * c - c * (c - 1) / 2.0), axis=-1)
+    total = np.sum(v * c, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g = (n + 1 - 2 * sum_cum / total) / n
+    return np.where((n > 0) & (total > 0), g, 0.0)
+
+
 def get_agent_reporters():
 
     return {
@@ -134,16 +374,18 @@ def get_agent_reporters():
         "Identity": lambda a: a.identity_strength,
     }
 
-def write_endpoint_summary(summaries: dict, data_dir: str, timestamp: str, n_runs_main: int, target: float = 0.80):
+def write_endpoint_summary(summaries: dict, data_dir: str, timestamp: str, n_runs_main, target: float = 0.80):
+    # n_runs_main: runs per scenario, an int or a dict[scenario] -> int (adaptive run counts)
 
     rows = []
     for scenario, df in summaries.items():
+        n_runs = n_runs_main[scenario] if isinstance(n_runs_main, dict) else n_runs_main
         # Final row (max step)
         last_step = int(df["Step"].max())
         last = df[df["Step"] == last_step].iloc[0]
         final_avg = float(last["Avg"])
         final_std = float(last["Std"]) if "Std" in df.columns else float("nan")
-        final_ci95 = 1.96 * final_std / np.sqrt(n_runs_main) if final_std == final_std else np.nan
+        final_ci95 = 1.96 * final_std / np.sqrt(n_runs) if final_std == final_std else np.nan
 
         # Time to reach target average
         hit = df[df["Avg"] >= target]
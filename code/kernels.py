@@ -0,0 +1,92 @@
+import math
+
+# numba is optional: without it the same loops run as plain Python (correct, but slow),
+# and VectorizedEngine(kernel="auto") keeps using its NumPy array code instead
+try:
+    import numba
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+    HAVE_NUMBA = False
+
+
+def _jit(fn):
+    return numba.njit(cache=True, nogil=True)(fn) if HAVE_NUMBA else fn
+
+
+def _update_agents(state, threshold, habit, identity, campaign_sens, econ_sens, signal, u,
+                   campaign_strength, campaign_decay, tax, n_per_run,
+                   backlash_gap, backlash_scale, habit_decay, events, counts, changed):
+    """
+    One tick of EaterAgent.step / _maybe_backlash / advance for every agent, over
+    flat arrays (runs x agents flattened; run = i // n_per_run).
+
+    Same rules and operation order as VectorizedEngine.step: reads the social
+    signal of the previous tick, bumps thresholds on backlash, draws the move
+    from u[2], decays habits, and updates state, per-run state counts and peer
+    events in place. Changed agents are written to `changed`; returns how many.
+    """
+    n_changed = 0
+    for i in range(state.size):
+        run = i // n_per_run
+        s = state[i]
+        gap = signal[i] - s
+
+        # potential backlash first
+        p_back = backlash_scale * identity[i] * (1.0 / (1.0 + math.exp(-(gap - backlash_gap))))
+        if gap >= backlash_gap and u[0, i] < p_back:
+            threshold[i] = min(max(threshold[i] + 0.05 * gap, 0.0), 1.0)
+            # the step-down itself is reset by EaterAgent.step; only the event counts
+            if s > 0 and u[1, i] < 0.5 * identity[i]:
+                events[run] += 1
+
+        # pressure to move up one state
+        nudges = campaign_sens[i] * campaign_strength * campaign_decay + econ_sens[i] * tax[run]
+        pressure = gap + nudges
+        effective_threshold = threshold[i] * (1.0 + habit[i])
+        p_up = 1.0 / (1.0 + math.exp(-(2.5 * (pressure - effective_threshold))))
+        p_down = 1.0 / (1.0 + math.exp(-(2.0 * ((-pressure) - 0.5 * habit[i]))))
+
+        new = s
+        if u[2, i] < p_up and s < 3:
+            new = s + 1
+        elif u[2, i] > 1 - p_down and s > 0:
+            new = s - 1
+
+        habit[i] *= habit_decay
+
+        if new != s:
+            events[run] += 1
+            counts[4 * run + s] -= 1
+            counts[4 * run + new] += 1
+            state[i] = new
+            changed[n_changed] = i
+            n_changed += 1
+    return n_changed
+
+
+def _scatter_signal(values, sum_off, sum_on, deg_off, deg_on, w_off, w_on,
+                    off_indptr, off_indices, on_indptr, on_indices, changed, delta):
+    """
+    NeighborSignal.apply_changes: add the state changes to both layers'
+    neighbour-state sums (layers given as their transposes in CSR), then
+    recompute the signal of every agent whose sums changed.
+    """
+    for k in range(changed.size):
+        j = changed[k]
+        for p in range(off_indptr[j], off_indptr[j + 1]):
+            sum_off[off_indices[p]] += delta[k]
+        for p in range(on_indptr[j], on_indptr[j + 1]):
+            sum_on[on_indices[p]] += delta[k]
+    for k in range(changed.size):
+        j = changed[k]
+        for p in range(off_indptr[j], off_indptr[j + 1]):
+            i = off_indices[p]
+            values[i] = w_off * (sum_off[i] / deg_off[i]) + w_on * (sum_on[i] / deg_on[i])
+        for p in range(on_indptr[j], on_indptr[j + 1]):
+            i = on_indices[p]
+            values[i] = w_off * (sum_off[i] / deg_off[i]) + w_on * (sum_on[i] / deg_on[i])
+
+
+update_agents = _jit(_update_agents)
+scatter_signal = _jit(_scatter_signal)
@@ -1,12 +1,14 @@
-from model import SustainableEatingModel
+import runner
+from results_io import ResultsWriter
 from plots import plot_all
 from sweeps import sweep_backlash, sweep_halflife, sweep_taxmax
 from functions_and_parameters import write_endpoint_summary
+from crn import write_paired_summary
+from sensitivity import run_sobol
+from telemetry import Telemetry
 import pandas as pd
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-import random, numpy as np
 
 
 # Base simulation parameters
@@ -16,7 +18,9 @@ base_params = {
     "average_degree": 4,
     "rewiring_prob": 0.1,
     "steps": 60,
-    "collect_agents": False,  # keep False for speed
+    "collect_agents": False,  # keep False for speed (agent-level data: run_monte_carlo(trajectories=...))
+    "engine": "agents",       # "vectorized" for large populations / fast batches
+    "network": "pairwise",    # "block" = fast SBM/BA multiplex generator
 }
 
 # Scenarios
@@ -25,110 +29,155 @@ scenarios = ["social", "campaign", "economic", "combo"]
 # Create data folder and plots subfolder
 data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
 plots_dir = os.path.join(data_dir, "plots")
+cache_dir = os.path.join(data_dir, "cache", "runs")
 os.makedirs(data_dir, exist_ok=True)
 os.makedirs(plots_dir, exist_ok=True)
 
 timestamp = datetime.now().strftime("%d%m%Y-%H%M%S")
 
 
-def run_monte_carlo(scenario, steps, n_runs=100, seed0=123):
-    frames = []
-    for r in range(n_runs):
-        if r % 10 == 0:
-            print(f"{scenario}: run {r}/{n_runs}")
-        rng_seed = seed0+r
-        random.seed(rng_seed)
-        np.random.seed(rng_seed)
-        params = base_params.copy()
-        params["scenario"] = scenario
-        model = SustainableEatingModel(**params)
-        for _ in range(steps):
-            model.step()
-        mdf = (
-            model.datacollector.get_model_vars_dataframe()
-            .reset_index()
-            .rename(columns={"index": "Step"})
+# Advance replicates in lockstep as (runs x agents) arrays instead of one model per run
+BATCHED = False
+# Process-pool workers (None = serial loop); results do not depend on the worker count
+WORKERS = None
+# Output format: "csv" (one file per scenario/table, read by analysis.Rmd), or "parquet" / "ipc"
+# for a compressed, partitioned columnar dataset in data/results_<timestamp>/ (needs pyarrow)
+RESULTS_FORMAT = "csv"
+# Common random numbers: run r gets the same pre-drawn numbers in every scenario and sweep point,
+# and paired scenario-vs-social differences (with CIs) are saved next to the endpoint summary
+CRN = False
+# Adaptive run counts: None = fixed n_runs; or CI95 half-width tolerances per endpoint, e.g.
+# {"FinalAvg": 0.01, "FinalShare3": 0.02, "TimeToTarget": 2.0}: scenarios stop between 20 and
+# 100 runs and sweep points between their n_runs and 100, once every endpoint is that precise
+ADAPTIVE_TOL = None
+# Global sensitivity (Sobol' indices over sensitivity.DEFAULT_BOUNDS, n * (d + 2) runs of 'combo')
+SENSITIVITY = False
+# Fork scenarios / sweep points that only differ in the campaign from a checkpoint at CAMPAIGN_START
+# instead of re-simulating their common warm-up (results are identical)
+FORK = False
+# Multiplex networks depend only on the per-run seed: build each once, reuse across scenarios/sweeps
+# (data/cache/networks, at most 2 GB; model.G_offline/G_online are then CSR matrices, not networkx graphs)
+NETWORK_CACHE = False
+if NETWORK_CACHE:
+    base_params["network_cache"] = os.path.join(data_dir, "cache", "networks")
+# Per-phase timings, network build time and run throughput / ETA as JSON lines (data/telemetry_<timestamp>.jsonl)
+TELEMETRY = False
+if TELEMETRY:
+    base_params["telemetry"] = Telemetry(os.path.join(data_dir, f"telemetry_{timestamp}.jsonl"))
+
+
+def run_monte_carlo(scenario, steps, n_runs=100, seed0=123, params=None):
+    return runner.run_monte_carlo(scenario, steps, n_runs=n_runs, seed0=seed0,
+                                  base_params=base_params, batched=BATCHED, workers=WORKERS,
+                                  params=params, crn=CRN)
+
+
+def main():
+    # ---------- Run scenarios, save CSVs, make plots ----------
+
+    summaries = {}
+    runs_by_scenario = {}
+    n_runs_used = {}
+    adaptive_reports = []
+    writer = (
+        ResultsWriter(os.path.join(data_dir, f"results_{timestamp}"), format=RESULTS_FORMAT)
+        if RESULTS_FORMAT != "csv" else None
+    )
+
+    # with WORKERS set, all scenarios x runs share one process pool; with FORK, social/campaign and
+    # economic/combo simulate their shared pre-campaign ticks once per run (same results)
+    parallel_results = {}
+    if FORK and not BATCHED and ADAPTIVE_TOL is None:
+        parallel_results = runner.run_branches({sc: (sc, None) for sc in scenarios}, base_params["steps"],
+                                               n_runs=100, base_params=base_params, workers=WORKERS, crn=CRN)
+    elif WORKERS is not None and not BATCHED and ADAPTIVE_TOL is None:
+        parallel_results = runner.run_parallel(scenarios, base_params["steps"], n_runs=100, base_params=base_params,
+                                               workers=WORKERS, crn=CRN)
+
+    for scenario in scenarios:
+        print(f"Running scenario: {scenario}")
+        if scenario in parallel_results:
+            all_runs, summary = parallel_results[scenario]
+        elif ADAPTIVE_TOL is not None:
+            all_runs, summary, report = runner.run_adaptive(
+                scenario, base_params["steps"], tol=ADAPTIVE_TOL, min_runs=20, max_runs=100,
+                base_params=base_params, batched=BATCHED, workers=WORKERS, crn=CRN
+            )
+            adaptive_reports.append(report)
+        else:
+            all_runs, summary = run_monte_carlo(
+                scenario, steps=base_params["steps"], n_runs=100   # bump to 100 for finals
+            )
+        summaries[scenario] = summary
+        n_runs_used[scenario] = int(all_runs["Run"].nunique())
+        if CRN:
+            runs_by_scenario[scenario] = all_runs
+        if writer is not None:
+            writer.write_runs(all_runs, scenario)
+            writer.write_summary(summary, scenario)
+            print(f"Saved: {scenario} -> {writer.root}")
+            continue
+        # Save CSVs
+        all_runs_out = os.path.join(
+            data_dir, f"sustainable_eating_{scenario}_allruns_{timestamp}.csv"
         )
-        mdf["Run"] = r
-        frames.append(mdf)
-
-    all_runs = pd.concat(frames, ignore_index=True)
-
-    # aggregate with CI
-    agg = (
-        all_runs.groupby("Step")
-        .agg(
-            Avg=("AverageSustainability", "mean"),
-            Std=("AverageSustainability", "std"),      # <- function is "std" (lowercase)
-            Share0=("ShareState0", "mean"),
-            Share1=("ShareState1", "mean"),
-            Share2=("ShareState2", "mean"),
-            Share3=("ShareState3", "mean"),
-            # Optional: add this if you want CI bars for Final State 3 in sweeps:
-            # Share3Std=("ShareState3", "std"),
-            Gini=("GiniScore", "mean"),
-            Velocity=("AdoptionVelocity", "mean"),
-            PeerEvents=("PeerInfluenceEvents", "mean"),
-            TaxSignal=("TaxSignal", "mean"),
+        summary_out = os.path.join(
+            data_dir, f"sustainable_eating_{scenario}_summary_{timestamp}.csv"
         )
-        .reset_index()
+        all_runs.to_csv(all_runs_out, index=False)
+        summary.to_csv(summary_out, index=False)
+        print(f"Saved: {all_runs_out}")
+        print(f"Saved: {summary_out}")
+
+    # Produce all figures into data/plots/
+    plot_all(summaries, plots_dir, timestamp)
+
+    write_endpoint_summary(
+        summaries,
+        data_dir,
+        timestamp,
+        n_runs_main=n_runs_used,
+        target=0.80
     )
-    agg["CI95"] = 1.96 * agg["Std"] / np.sqrt(n_runs)
-    return all_runs, agg
+    if adaptive_reports:
+        adaptive_out = os.path.join(data_dir, f"adaptive_runs_{timestamp}.csv")
+        pd.DataFrame(adaptive_reports).to_csv(adaptive_out, index=False)
+        print(f"Saved: {adaptive_out}")
+    if CRN:
+        write_paired_summary(runs_by_scenario, "social", data_dir, timestamp, target=0.80)
 
+    # ---------- Robustness sweeps (adjust values & n_runs) ----------
 
-# ---------- Run scenarios, save CSVs, make plots ----------
+    backlash_vals = [0.20, 0.25, 0.30, 0.35]
+    halflife_vals = [6, 10, 14, 18, 22]
+    taxmax_vals   = [0.24, 0.26, 0.28, 0.30, 0.32]
 
-summaries = {}
+    # (point, run) jobs are cached on disk: points shared between sweeps (the default
+    # combo configuration) run once, and an interrupted sweep resumes where it stopped
+    sweep_kwargs = dict(target=0.80, data_dir=data_dir, plot_dir=plots_dir, timestamp=timestamp,
+                        base_params=base_params, workers=WORKERS or 1, cache_dir=cache_dir,
+                        writer=writer, crn=CRN, tol=ADAPTIVE_TOL, max_runs=100, fork=FORK)
 
-for scenario in scenarios:
-    print(f"Running scenario: {scenario}")
-    all_runs, summary = run_monte_carlo(
-        scenario, steps=base_params["steps"], n_runs=100   # bump to 100 for finals
-    )
-    # Save CSVs
-    all_runs_out = os.path.join(
-        data_dir, f"sustainable_eating_{scenario}_allruns_{timestamp}.csv"
-    )
-    summary_out = os.path.join(
-        data_dir, f"sustainable_eating_{scenario}_summary_{timestamp}.csv"
-    )
-    all_runs.to_csv(all_runs_out, index=False)
-    summary.to_csv(summary_out, index=False)
-    print(f"Saved: {all_runs_out}")
-    print(f"Saved: {summary_out}")
-    summaries[scenario] = summary
-
-# Produce all figures into data/plots/
-plot_all(summaries, plots_dir, timestamp)
-
-write_endpoint_summary(
-    summaries,
-    data_dir,
-    timestamp,
-    n_runs_main=100,
-    target=0.80
-)
-
-# ---------- Robustness sweeps (adjust values & n_runs) ----------
-
-backlash_vals = [0.20, 0.25, 0.30, 0.35]
-halflife_vals = [6, 10, 14, 18, 22]
-taxmax_vals   = [0.24, 0.26, 0.28, 0.30, 0.32]
-
-# Backlash (combo)
-sweep_backlash(run_monte_carlo, backlash_vals,
-               steps=base_params["steps"], n_runs=30,
-               target=0.80, data_dir=data_dir, plot_dir=plots_dir, timestamp=timestamp)
-
-# Campaign half-life (combo)
-sweep_halflife(run_monte_carlo, halflife_vals,
-               steps=base_params["steps"], n_runs=20,
-               target=0.80, data_dir=data_dir, plot_dir=plots_dir, timestamp=timestamp)
-
-# Tax max (combo)
-sweep_taxmax(run_monte_carlo, taxmax_vals,
-             steps=base_params["steps"], n_runs=20,
-             target=0.80, data_dir=data_dir, plot_dir=plots_dir, timestamp=timestamp)
-
-print("Done.")
\ No newline at end of file
+    # Backlash (combo)
+    sweep_backlash(run_monte_carlo, backlash_vals, steps=base_params["steps"], n_runs=30, **sweep_kwargs)
+
+    # Campaign half-life (combo)
+    sweep_halflife(run_monte_carlo, halflife_vals, steps=base_params["steps"], n_runs=20, **sweep_kwargs)
+
+    # Tax max (combo)
+    sweep_taxmax(run_monte_carlo, taxmax_vals, steps=base_params["steps"], n_runs=20, **sweep_kwargs)
+
+    # ---------- Global sensitivity (optional, slow) ----------
+
+    if SENSITIVITY:
+        indices, evals = run_sobol(n=256, steps=base_params["steps"], base_params=base_params, workers=WORKERS)
+        indices.to_csv(os.path.join(data_dir, f"sobol_indices_{timestamp}.csv"), index=False)
+        evals.to_csv(os.path.join(data_dir, f"sobol_evaluations_{timestamp}.csv"), index=False)
+        print(indices.to_string(index=False))
+
+    print("Done.")
+
+
+# Guarded so process-pool workers (spawn start method) can re-import this module
+if __name__ == "__main__":
+    main()
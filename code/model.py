@@ -1,44 +1,203 @@
+import random
+import time
+from dataclasses import dataclass
 from mesa import Model
 from mesa.time import SimultaneousActivation
 from mesa.datacollection import DataCollector
 from agent import EaterAgent
-from functions_and_parameters import (
-    generate_multiplex, OFFLINE_WEIGHT, ONLINE_WEIGHT, state_to_score, gini, tax_signal
-)
+from vectorized import VectorizedEngine
+from neighbors import NeighborSignal
+from policy import schedule_for
+from network_cache import NetworkCache, _rng_state, _set_rng_state
+from functions_and_parameters import generate_multiplex, gini_from_counts, DEFAULT_PARAMS
 import numpy as np
 
+ENGINES = ("agents", "vectorized")
+# trait name -> attribute on EaterAgent / VectorizedEngine
+TRAIT_ATTRS = {"habit": "habit_strength", "threshold": "threshold", "identity": "identity_strength",
+               "campaign": "campaign_sensitivity", "econ": "econ_sensitivity"}
+# ModelParams fields that only act from campaign_start on (see shared_prefix)
+CAMPAIGN_FIELDS = ("campaign_start", "campaign_end", "campaign_half_life", "campaign_base_strength")
+
+
+@dataclass(frozen=True)
+class SteadyState:
+    """
+    Settings of the optional steady-state detector (model argument steady_state).
+
+    The run counts as stationary when a linear trend fitted to the average score
+    and every state share over the latest max(window, t // 2) ticks projects a
+    change of at most drift_tol over the remaining steps (upper 95% bound of
+    the slope, so noisy runs need more evidence), and mean peer events
+    in the two halves of the last `window` ticks differ by at most events_rtol
+    (relative). The trend window grows with t because habit decay and the
+    backlash threshold ratchet make the drift slow, and the check is
+    horizon-aware, so long runs must be flatter before they stop. A linear trend
+    cannot foresee a decline that only speeds up later (combo's slow backlash
+    erosion), so lower drift_tol for such runs. Checked every window // 4 ticks,
+    never while the campaign can still start or end.
+    """
+    window: int = 20
+    drift_tol: float = 0.02
+    events_rtol: float = 0.2
+
+
+@dataclass
+class Checkpoint:
+    """
+    Snapshot of a SustainableEatingModel between two ticks (model.checkpoint()).
+
+    Holds copies of everything a tick changes: agent states and traits, the
+    neighbour signal, counters, the rows collected so far, the steady-state
+    history and the RNG state (the global numpy / random state for runs seeded
+    the legacy way). The multiplex and the common random numbers are not
+    modified by a run, so they are referenced, not copied.
+    SustainableEatingModel.restore(checkpoint) continues from it; several
+    restores fork independent branches.
+    """
+    time: int
+    init_kwargs: dict
+    scenario: str
+    params: object
+    multiplex: tuple        # (G_offline, G_online, tribes)
+    crn: object
+    state: np.ndarray
+    traits: dict            # TRAIT_ATTRS name -> values
+    signal: np.ndarray
+    counters: dict
+    model_vars: dict
+    agent_records: dict
+    history: list
+    rng: dict
+
+
+def shared_prefix(branches, steps, policy=None, steady_state=None) -> int:
+    """
+    Number of leading ticks that runs of several (scenario, ModelParams)
+    branches with the same seed have in common: the scenarios and parameters
+    only differ in the campaign, so they agree up to the first tick where their
+    compiled campaign intensities differ (social and campaign share their
+    first CAMPAIGN_START ticks, as do economic and combo, and all points of a
+    campaign half-life or strength sweep). 0 if the branches differ in
+    anything else (tax schedule, other parameters). policy: the runs' shared
+    policy.Policy, if not the scenarios' defaults. With steady_state the prefix
+    also ends where the first branch could stop early.
+    """
+    schedules = [schedule_for(scenario, params, steps, policy) for scenario, params in branches]
+    signatures = {
+        (tuple(schedule.tax), params.replace(**{f: getattr(DEFAULT_PARAMS, f) for f in CAMPAIGN_FIELDS}).digest())
+        for schedule, (scenario, params) in zip(schedules, branches)
+    }
+    if len(signatures) > 1:
+        return 0
+    first = schedules[0].campaign
+    prefix = next((t for t in range(steps) if any(s.campaign[t] != first[t] for s in schedules[1:])), steps)
+    if steady_state:
+        window = (SteadyState() if steady_state is True else steady_state).window
+        prefix = min(prefix, min(s.settled for s in schedules) + window)
+    return prefix
+
+
 class SustainableEatingModel(Model):
-    def __init__(self, num_agents, network_type, average_degree, rewiring_prob, scenario, steps, collect_agents=False):
+    def __init__(self, num_agents, network_type, average_degree, rewiring_prob, scenario, steps, collect_agents=False,
+                 engine="agents", network="pairwise", reference_size=None, rng=None, params=None,
+                 network_cache=None, crn=None, steady_state=None, kernel="auto", telemetry=None,
+                 multiplex=None, policy=None):
         super().__init__()
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == "vectorized" and collect_agents:
+            raise ValueError("collect_agents requires engine='agents'")
         # keep the signature (network_type/degree not used for multiplex, but kept for API compatibility)
         self.num_agents = num_agents
         self.scenario = scenario
         self.steps = steps
+        # constructor settings a Checkpoint needs to rebuild this model
+        self._init_kwargs = dict(num_agents=num_agents, network_type=network_type, average_degree=average_degree,
+                                 rewiring_prob=rewiring_prob, steps=steps, collect_agents=collect_agents,
+                                 engine=engine, network=network, reference_size=reference_size,
+                                 steady_state=steady_state, kernel=kernel, telemetry=telemetry, policy=policy)
         self.last_velocity = 0.0
+        self.engine = None  # VectorizedEngine when engine="vectorized"
+        # All draws (network, priors, per-tick moves) come from self.rng: an explicit
+        # numpy Generator per run, or the globally seeded np.random module by default
+        # crn (crn.CommonDraws): pre-drawn priors, initial states and per-tick uniforms shared
+        # by every scenario/sweep point of this run; the network then draws from its own stream
+        self.crn = crn
+        self.tick_uniforms = None
+        if crn is not None and rng is None:
+            rng = crn.network_rng()
+        self.rng = np.random if rng is None else rng
+        # Model constants (ModelParams); sweeps pass a modified copy instead of patching globals
+        self.params = DEFAULT_PARAMS if params is None else params
+        # Campaign intensity and tax scale per tick (policy.Policy, default: the scenario's), compiled
+        # once; agents only multiply the current values by their sensitivities
+        self.policy = schedule_for(scenario, self.params, steps, policy)
+        self.campaign_intensity = 0.0
 
         self.schedule = SimultaneousActivation(self)
 
-        # Build multiplex graphs + tribes
-        self.G_offline, self.G_online, self.tribes = generate_multiplex(num_agents)
+        # Optional per-phase timing (telemetry.Telemetry); step() only checks `timer is None` when off
+        self.timer = telemetry.timer() if telemetry is not None else None
+        t_network = time.perf_counter()
+
+        # Build multiplex graphs + tribes (network="block" uses the fast SBM/BA generators;
+        # the vectorized engine takes the layers as (E, 2) edge arrays; reference_size keeps
+        # the offline degree of a population of that size when scaling up).
+        # With network_cache (a NetworkCache or its directory) the layers are CSR adjacencies
+        # shared on disk by every scenario and sweep point that uses the same seed.
+        # multiplex: (G_offline, G_online, tribes) already built (restoring a Checkpoint).
+        if multiplex is not None:
+            self.G_offline, self.G_online, self.tribes = multiplex
+        elif network_cache is not None:
+            if not isinstance(network_cache, NetworkCache):
+                network_cache = NetworkCache(network_cache)
+            self.G_offline, self.G_online, self.tribes = network_cache.multiplex(
+                num_agents, rng=self.rng, method=network, reference_size=reference_size, params=self.params)
+        else:
+            self.G_offline, self.G_online, self.tribes = generate_multiplex(
+                num_agents, method=network, as_edges=(engine == "vectorized"), reference_size=reference_size,
+                rng=self.rng, params=self.params)
+        if self.timer is not None:
+            self.timer.network_seconds = time.perf_counter() - t_network
+
+        # Weighted neighbour-state signal for all agents (sparse, incrementally updated)
+        # (the compiled scatter only with the vectorized engine's kernel choice)
+        self.neighbor_signal = NeighborSignal(self.G_offline, self.G_online, num_agents,
+                                              self.params.offline_weight, self.params.online_weight,
+                                              kernel=kernel if engine == "vectorized" else "numpy")
+        self._moved = []  # (unique_id, new_state) recorded by EaterAgent.advance
 
-        # Create agents
-        for i in range(self.num_agents):
-            agent = EaterAgent(i, self, scenario)
-            self.schedule.add(agent)
-        
-        self.id2agent = {a.unique_id: a for a in self.schedule.agents}
+        if engine == "vectorized":
+            # Array-backed population; the schedule stays empty and only keeps time.
+            # kernel: "numpy" array code, "compiled" fused per-agent loop (Numba if installed), or "auto"
+            self.engine = VectorizedEngine(num_agents, scenario, self.neighbor_signal, rng=self.rng,
+                                           params=self.params, draws=crn, kernel=kernel, policy=self.policy)
+            self.id2agent = {}
+            self.state_counts = self.engine.state_counts
+        else:
+            # Create agents
+            for i in range(self.num_agents):
+                agent = EaterAgent(i, self, scenario)
+                self.schedule.add(agent)
 
-        # Assign neighbors for both layers
-        for agent in self.schedule.agents:
-            off_n = [self.id2agent[i] for i in self.G_offline.neighbors(agent.unique_id)]
-            on_n  = [self.id2agent[i] for i in self.G_online.neighbors(agent.unique_id)]
-            agent.set_neighbors(off_n, on_n)
+            self.id2agent = {a.unique_id: a for a in self.schedule.agents}
+            self.neighbor_signal.reset(self.state_array())
+            # agents per state (0-3), kept current by EaterAgent.advance
+            self.state_counts = np.bincount(self.state_array(), minlength=4)
 
         # Data collection & metrics
         self.prev_avg_score = None
         self.current_tax_signal = 0.0
         self.peer_events = 0
 
+        # Optional early stop: once stationary (SteadyState, or True for the defaults), the
+        # remaining ticks up to `steps` are filled with the window means instead of being simulated
+        self.steady_state = SteadyState() if steady_state is True else (steady_state or None)
+        self.converged_at = None     # first extrapolated Step (None: simulated to the end)
+        self.extrapolating = False   # True for rows filled in after converged_at
+        self._history = []  # per tick: state counts (4), peer events, tax signal
+
         agent_reporters = {} if not collect_agents else {
     "State": "state",
     "Habit": "habit_strength",
@@ -48,35 +207,212 @@ class SustainableEatingModel(Model):
 
         self.datacollector = DataCollector(
             model_reporters={
-                "AverageSustainability": lambda m: float(np.mean([state_to_score(a.state) for a in m.schedule.agents])),
-                "ShareState0": lambda m: np.mean([1.0 if a.state == 0 else 0.0 for a in m.schedule.agents]),
-                "ShareState1": lambda m: np.mean([1.0 if a.state == 1 else 0.0 for a in m.schedule.agents]),
-                "ShareState2": lambda m: np.mean([1.0 if a.state == 2 else 0.0 for a in m.schedule.agents]),
-                "ShareState3": lambda m: np.mean([1.0 if a.state == 3 else 0.0 for a in m.schedule.agents]),
-                "GiniScore": lambda m: gini([state_to_score(a.state) for a in m.schedule.agents]),
+                "AverageSustainability": lambda m: m.average_score(),
+                "ShareState0": lambda m: m.state_share(0),
+                "ShareState1": lambda m: m.state_share(1),
+                "ShareState2": lambda m: m.state_share(2),
+                "ShareState3": lambda m: m.state_share(3),
+                "GiniScore": lambda m: float(gini_from_counts(m.metric_counts(), m.params.state_scores)),
                 "AdoptionVelocity": lambda m: m.last_velocity,
                 "PeerInfluenceEvents": lambda m: m.peer_events,
                 "TaxSignal": lambda m: m.current_tax_signal,
+                **({"Extrapolated": lambda m: m.extrapolating} if self.steady_state is not None else {}),
             },
             agent_reporters=agent_reporters
         )
 
+    def state_array(self):
+        """Current states of all agents as an int array (either engine)."""
+        if self.engine is not None:
+            return self.engine.state
+        return np.fromiter((a.state for a in self.schedule.agents), dtype=np.int64, count=self.num_agents)
+
+    def trait_array(self, name):
+        """Current values of one trait ("habit", "threshold" or "identity") of all agents (either engine)."""
+        attr = TRAIT_ATTRS[name]
+        if self.engine is not None:
+            return getattr(self.engine, attr)
+        return np.fromiter((getattr(a, attr) for a in self.schedule.agents), dtype=np.float64, count=self.num_agents)
+
+    def state_scores(self):
+        return np.asarray(self.params.state_scores)[self.state_array()]
+
+    # Population metrics from the live state histogram: O(1) in the number of agents
+    # (after an early stop: from the stationary window's mean counts)
+    def metric_counts(self):
+        return self._fill_counts if self.extrapolating else self.state_counts
+
+    def state_share(self, k):
+        return self.metric_counts()[k] / self.num_agents
+
+    def adoption_share(self):
+        return (self.num_agents - self.state_counts[0]) / self.num_agents
+
+    def average_score(self):
+        return float(self.metric_counts() @ np.asarray(self.params.state_scores)) / self.num_agents
+
+    def _is_stationary(self):
+        """Record this tick; True once the run is stationary (see SteadyState)."""
+        cfg, t = self.steady_state, self.schedule.time
+        self._history.append(np.concatenate([self.state_counts, (self.peer_events, self.current_tax_signal)]))
+        if t < self.policy.settled + cfg.window or t >= self.steps or t % max(1, cfg.window // 4):
+            return False
+        recent = np.asarray(self._history[-max(cfg.window, t // 2):])
+        shares = recent[:, :4] / self.num_agents
+        series = np.column_stack([shares @ np.asarray(self.params.state_scores), shares])
+        x = np.arange(len(recent)) - (len(recent) - 1) / 2.0
+        centred = series - series.mean(axis=0)
+        slopes = x @ centred / (x @ x)
+        resid = centred - np.outer(x, slopes)
+        se = np.sqrt((resid ** 2).sum(axis=0) / max(len(x) - 2, 1) / (x @ x))
+        # upper 95% bound on the trend, projected over the steps still to come
+        if (np.abs(slopes) + 1.96 * se).max() * (self.steps - t) > cfg.drift_tol:
+            return False
+        events = recent[-cfg.window:, 4]
+        half = cfg.window // 2
+        e1, e2 = events[:half].mean(), events[half:].mean()
+        return abs(e1 - e2) <= cfg.events_rtol * max(e1, e2, 1.0)
+
+    def _extrapolate(self):
+        """A tick after the early stop: means of the last window, no simulation."""
+        self.last_velocity = 0.0
+        self.peer_events = int(round(self._fill[4]))
+        self.current_tax_signal = float(self._fill[5])
+        self.schedule.steps += 1
+        self.schedule.time += 1
+        self.datacollector.collect(self)
+
     def step(self):
-    # 1) update tax signal from current adoption (pre-move)
-        adoption_share = np.mean([1.0 if a.state >= 1 else 0.0 for a in self.schedule.agents])
-        self.current_tax_signal = tax_signal(adoption_share) if self.scenario in ("economic", "combo") else 0.0
+        if self.extrapolating:
+            self._extrapolate()
+            return
+
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+
+    # 1) this tick's policy; tax signal from current adoption (pre-move)
+        self.campaign_intensity, tax_scale = self.policy.at(self.schedule.time)
+        adoption_share = self.adoption_share()
+        self.current_tax_signal = tax_scale * self.params.tax_signal(adoption_share) if tax_scale else 0.0
+        if timer is not None:
+            timer.lap("tax")
 
     # 2) snapshot avg before move + reset counters
-        prev_avg = float(np.mean([state_to_score(a.state) for a in self.schedule.agents]))
+        prev_avg = self.average_score()
         self.peer_events = 0
+        if timer is not None:
+            timer.lap("snapshot")
 
     # 3) advance one tick
+        if self.crn is not None:
+            self.tick_uniforms = self.crn.uniforms(self.schedule.time)
+        if self.engine is not None:
+            self.peer_events = self.engine.step(self.schedule.time, self.current_tax_signal)
         self.schedule.step()
+        if self._moved:
+            ids, new_states = zip(*self._moved)
+            self.neighbor_signal.apply_changes(ids, new_states)
+            self._moved = []
+        if timer is not None:
+            timer.lap("advance")
 
     # 4) compute velocity after agents moved
-        current_avg = float(np.mean([state_to_score(a.state) for a in self.schedule.agents]))
+        current_avg = self.average_score()
         self.last_velocity = current_avg - prev_avg
         self.prev_avg_score = current_avg  # optional, if you still use it elsewhere
+        if timer is not None:
+            timer.lap("velocity")
 
     # 5) NOW collect (captures peer_events of this step)
         self.datacollector.collect(self)
+        if timer is not None:
+            timer.lap("collect")
+
+    # 6) optional steady-state check: the remaining steps are filled in, not simulated
+        if self.steady_state is not None and self._is_stationary():
+            self.converged_at = self.schedule.time
+            self._fill = np.mean(self._history[-self.steady_state.window:], axis=0)
+            self._fill_counts = self._fill[:4]
+            self._history = []
+            self.extrapolating = True
+
+    # ----------------------------
+    # Checkpoint / restore
+    # ----------------------------
+
+    def checkpoint(self) -> Checkpoint:
+        """Snapshot of the model between ticks (see Checkpoint)."""
+        if self.extrapolating:
+            raise ValueError("cannot checkpoint a run that stopped at steady state")
+        rng = {"numpy": _rng_state(self.rng)}
+        if self.rng is np.random:
+            rng["python"] = random.getstate()
+        dc = self.datacollector
+        return Checkpoint(
+            time=self.schedule.time,
+            init_kwargs=dict(self._init_kwargs),
+            scenario=self.scenario,
+            params=self.params,
+            multiplex=(self.G_offline, self.G_online, self.tribes),
+            crn=self.crn,
+            state=np.array(self.state_array(), dtype=np.int64),
+            traits={name: np.array(self.trait_array(name)) for name in TRAIT_ATTRS},
+            signal=self.neighbor_signal.values.copy(),
+            counters={
+                "schedule_steps": self.schedule.steps, "model_steps": self._steps, "model_time": self._time,
+                "peer_events": self.peer_events, "current_tax_signal": self.current_tax_signal,
+                "last_velocity": self.last_velocity, "prev_avg_score": self.prev_avg_score,
+            },
+            model_vars={k: list(v) for k, v in dc.model_vars.items()},
+            agent_records=dict(dc._agent_records),
+            history=list(self._history),
+            rng=rng,
+        )
+
+    @classmethod
+    def restore(cls, checkpoint: Checkpoint, scenario=None, params=None) -> "SustainableEatingModel":
+        """
+        A new model continuing from checkpoint, optionally as another scenario or
+        with other ModelParams (a branch; only meaningful while the branches
+        agree up to the checkpoint, see shared_prefix). The network is reused,
+        not rebuilt.
+        """
+        ck = checkpoint
+        legacy = ck.rng["numpy"]["kind"] == "legacy"
+        model = cls(**ck.init_kwargs, scenario=ck.scenario if scenario is None else scenario,
+                     params=ck.params if params is None else params, crn=ck.crn, multiplex=ck.multiplex,
+                     rng=None if legacy else np.random.default_rng())
+
+        if model.engine is not None:
+            model.engine.state = ck.state.copy()
+            for name, attr in TRAIT_ATTRS.items():
+                setattr(model.engine, attr, ck.traits[name].copy())
+            model.engine.state_counts[...] = np.bincount(model.engine._count_bins(
+                np.arange(ck.state.size), ck.state), minlength=4)
+            model.engine.last_peer_events = ck.counters["peer_events"]
+        else:
+            for agent in model.schedule.agents:
+                i = agent.unique_id
+                agent.state = agent.next_state = int(ck.state[i])
+                for name, attr in TRAIT_ATTRS.items():
+                    setattr(agent, attr, float(ck.traits[name][i]))
+            model.state_counts[:] = np.bincount(ck.state, minlength=4)
+        # states the incremental updates diff against, and the exact (incrementally updated) signal
+        model.neighbor_signal.reset(ck.state)
+        model.neighbor_signal.values = ck.signal.copy()
+
+        c = ck.counters
+        model.schedule.steps, model.schedule.time = c["schedule_steps"], ck.time
+        model._steps, model._time = c["model_steps"], c["model_time"]
+        model.peer_events, model.current_tax_signal = c["peer_events"], c["current_tax_signal"]
+        model.last_velocity, model.prev_avg_score = c["last_velocity"], c["prev_avg_score"]
+        model.datacollector.model_vars = {k: list(v) for k, v in ck.model_vars.items()}
+        model.datacollector._agent_records = dict(ck.agent_records)
+        model._history = list(ck.history)
+
+        # last: building the model above drew from the same generators
+        _set_rng_state(model.rng, ck.rng["numpy"])
+        if "python" in ck.rng:
+            random.setstate(ck.rng["python"])
+        return model
@@ -0,0 +1,134 @@
+import importlib.util
+import numpy as np
+import scipy.sparse as sp
+from functions_and_parameters import OFFLINE_WEIGHT, ONLINE_WEIGHT
+
+
+def use_compiled(kernel: str) -> bool:
+    """
+    Whether a kernel choice selects kernels.py: "compiled", or "auto" when
+    Numba is installed ("numpy": never). Decided without importing Numba, so
+    kernels.py (and Numba) are only loaded by the code paths that use them.
+    """
+    return kernel == "compiled" or (kernel == "auto" and importlib.util.find_spec("numba") is not None)
+
+
+def layer_csr(layer, num_agents: int) -> sp.csr_matrix:
+    """Symmetric 0/1 CSR adjacency of one layer (networkx graph, (E, 2) edge array or CSR adjacency)."""
+    if sp.issparse(layer):
+        layer = sp.csr_matrix(layer)
+        return sp.csr_matrix((np.ones(layer.nnz), layer.indices, layer.indptr), shape=(num_agents, num_agents))
+    edges = layer if isinstance(layer, np.ndarray) else np.array(layer.edges(), dtype=np.int64)
+    edges = edges.reshape(-1, 2)
+    rows = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols = np.concatenate([edges[:, 1], edges[:, 0]])
+    A = sp.csr_matrix((np.ones(rows.size), (rows, cols)), shape=(num_agents, num_agents))
+    A.sum_duplicates()
+    A.data[:] = 1.0
+    return A
+
+
+def _with_self_loops(A: sp.csr_matrix) -> sp.csr_matrix:
+    """Isolated rows get a 1 on the diagonal: the agent counts as its own neighbour (uses its own state)."""
+    deg = np.asarray(A.sum(axis=1)).ravel()
+    return sp.csr_matrix(A + sp.diags((deg == 0).astype(float)))
+
+
+def _row_ranges(indptr, rows):
+    """Flat positions of the stored entries of the given CSR rows, plus row lengths."""
+    starts, ends = indptr[rows], indptr[rows + 1]
+    lengths = ends - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(lengths.sum()) + offsets, lengths
+
+
+class NeighborSignal:
+    """
+    Social signal for all agents: OFFLINE_WEIGHT * mean offline neighbour state
+    + ONLINE_WEIGHT * mean online neighbour state.
+
+    Each layer is held as a 0/1 CSR adjacency, and the signal is built from
+    the exact integer sums of neighbour states per layer:
+    w_off * (sum_off / deg_off) + w_on * (sum_on / deg_on), which is the same
+    arithmetic as averaging the neighbours' states, bit for bit. After a tick,
+    `apply_changes` only adds the state changes to the sums of the changed
+    agents' neighbours and recomputes those agents' signal, so saturated runs
+    cost O(changes x degree) instead of O(edges); the sums stay exact, so the
+    incremental signal never drifts from a full recomputation. When more than
+    `full_refresh` of the population changed, full mat-vecs are used instead.
+    kernel (see use_compiled) picks the NumPy scatter or kernels.scatter_signal
+    for the incremental updates; both give the same values.
+    """
+
+    def __init__(self, offline, online, num_agents, offline_weight=OFFLINE_WEIGHT,
+                 online_weight=ONLINE_WEIGHT, full_refresh=0.1, kernel="numpy"):
+        layers = [_with_self_loops(layer_csr(layer, num_agents)) for layer in (offline, online)]
+        self._set_layers(layers, (offline_weight, online_weight), full_refresh, kernel)
+
+    def _set_layers(self, layers, weights, full_refresh, kernel="numpy"):
+        # layers: (offline, online) 0/1 adjacency with complete rows, so row sums are the degrees
+        self.layers = [sp.csr_matrix(A) for A in layers]
+        self.weights = tuple(weights)
+        self.num_agents = self.layers[0].shape[0]
+        self.full_refresh = full_refresh
+        self.compiled = use_compiled(kernel)
+        self.degrees = [np.asarray(A.sum(axis=1)).ravel() for A in self.layers]
+        # transposes in CSR = column access to the layers for incremental updates
+        self._cols = [A.T.tocsr() for A in self.layers]
+        self.sums = [np.zeros(self.num_agents) for _ in self.layers]
+        self.values = np.zeros(self.num_agents)
+
+    @classmethod
+    def block_diagonal(cls, signals, full_refresh=0.1, kernel="numpy"):
+        """Pack independent populations (e.g. one per Monte Carlo run) into one signal."""
+        packed = cls.__new__(cls)
+        layers = [sp.block_diag([s.layers[k] for s in signals], format="csr") for k in range(2)]
+        packed._set_layers(layers, signals[0].weights, full_refresh, kernel)
+        return packed
+
+    @property
+    def W(self) -> sp.csr_matrix:
+        """Combined row-normalized weight matrix (the signal is W @ states up to rounding), e.g. for partitioning."""
+        return sp.csr_matrix(sum(w * sp.diags(1.0 / deg) @ A
+                                 for w, deg, A in zip(self.weights, self.degrees, self.layers)))
+
+    def _combine(self, rows=slice(None)):
+        (w_off, w_on), (s_off, s_on), (d_off, d_on) = self.weights, self.sums, self.degrees
+        return w_off * (s_off[rows] / d_off[rows]) + w_on * (s_on[rows] / d_on[rows])
+
+    def reset(self, states):
+        """Recompute the signal from scratch for the given states."""
+        self._states = np.asarray(states, dtype=float).copy()
+        self.sums = [A @ self._states for A in self.layers]
+        self.values = self._combine()
+        return self.values
+
+    def apply_changes(self, changed, new_states):
+        """Update the signal after the agents in `changed` moved to `new_states`."""
+        changed = np.asarray(changed, dtype=np.int64)
+        if changed.size == 0:
+            return self.values
+        new_states = np.asarray(new_states, dtype=float)
+        if changed.size > self.full_refresh * self.num_agents:
+            self._states[changed] = new_states
+            self.sums = [A @ self._states for A in self.layers]
+            self.values = self._combine()
+            return self.values
+        delta = new_states - self._states[changed]
+        self._states[changed] = new_states
+        if self.compiled:
+            from kernels import scatter_signal
+            # same sums and signal as below, without the index arrays
+            (off, on), (s_off, s_on), (d_off, d_on) = self._cols, self.sums, self.degrees
+            scatter_signal(self.values, s_off, s_on, d_off, d_on, *self.weights,
+                                   off.indptr, off.indices, on.indptr, on.indices, changed, delta)
+            return self.values
+        touched = []
+        for cols, sums in zip(self._cols, self.sums):
+            pos, lengths = _row_ranges(cols.indptr, changed)
+            rows = cols.indices[pos]
+            np.add.at(sums, rows, np.repeat(delta, lengths))
+            touched.append(rows)
+        rows = np.concatenate(touched)
+        self.values[rows] = self._combine(rows)
+        return self.values
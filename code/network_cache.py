@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import scipy.sparse as sp
+
+from neighbors import layer_csr
+from functions_and_parameters import generate_multiplex, DEFAULT_PARAMS
+
+LAYERS = ("offline", "online")
+
+
+def _rng_state(rng):
+    """JSON-able state of a numpy Generator, RandomState or the np.random module."""
+    if isinstance(rng, np.random.Generator):
+        return {"kind": "generator", "state": rng.bit_generator.state}
+    name, keys, pos, has_gauss, cached = rng.get_state()
+    return {"kind": "legacy", "state": [name, keys.tolist(), int(pos), int(has_gauss), float(cached)]}
+
+
+def _set_rng_state(rng, saved):
+    if saved["kind"] == "generator":
+        rng.bit_generator.state = saved["state"]
+    else:
+        name, keys, pos, has_gauss, cached = saved["state"]
+        rng.set_state((name, np.asarray(keys, dtype=np.uint32), pos, has_gauss, cached))
+
+
+def network_key(num_agents, method, reference_size, params, rng) -> str:
+    """
+    Content address of one multiplex build: population size, generator and its
+    parameters, and the state of the RNG it will draw from. The same seed gives
+    the same key in every scenario and sweep point.
+    """
+    payload = {
+        "num_agents": num_agents, "method": method, "reference_size": reference_size,
+        "p_same": params.homophily_p_same, "p_diff": params.homophily_p_diff, "n_tribes": params.n_tribes,
+        "rng": _rng_state(rng),
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class NetworkCache:
+    """
+    On-disk cache of multiplex networks, one directory per key:
+
+        root/<key>/offline_indptr.npy, offline_indices.npy, online_*.npy, tribes.npy, rng.json
+
+    Layers are stored as the CSR structure of their symmetric adjacency
+    (int32 indices), loaded back memory-mapped without copying. rng.json holds
+    the RNG state right after the build, so a cache hit leaves the caller's RNG
+    exactly where building the network would have, and runs are bit-identical
+    with or without the cache. Once the cache grows past max_bytes the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.path(key), "rng.json"))
+
+    def save(self, key: str, offline: sp.csr_matrix, online: sp.csr_matrix, tribes, rng) -> None:
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name, A in zip(LAYERS, (offline, online)):
+            np.save(os.path.join(tmp, f"{name}_indptr.npy"), A.indptr.astype(np.int64))
+            np.save(os.path.join(tmp, f"{name}_indices.npy"), A.indices.astype(np.int32))
+        np.save(os.path.join(tmp, "tribes.npy"), np.asarray(tribes, dtype=np.int16))
+        with open(os.path.join(tmp, "rng.json"), "w") as f:
+            json.dump(_rng_state(rng), f)
+        try:
+            os.rename(tmp, path)  # atomic; another process may have stored the same key first
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def load(self, key: str, rng):
+        """(offline CSR, online CSR, tribes) over memory-mapped arrays; restores the post-build RNG state."""
+        path = self.path(key)
+        layers = []
+        for name in LAYERS:
+            indptr = np.load(os.path.join(path, f"{name}_indptr.npy"), mmap_mode="r")
+            indices = np.load(os.path.join(path, f"{name}_indices.npy"), mmap_mode="r")
+            n = indptr.size - 1
+            data = np.broadcast_to(np.float64(1.0), indices.shape)   # implicit 0/1 weights
+            layers.append(sp.csr_matrix((data, indices, indptr), shape=(n, n), copy=False))
+        tribes = np.load(os.path.join(path, "tribes.npy"), mmap_mode="r")
+        with open(os.path.join(path, "rng.json")) as f:
+            _set_rng_state(rng, json.load(f))
+        os.utime(path)  # mark as recently used
+        return layers[0], layers[1], tribes
+
+    def multiplex(self, num_agents, rng=None, method="pairwise", reference_size=None, params=DEFAULT_PARAMS):
+        """generate_multiplex() through the cache; layers come back as CSR adjacency matrices."""
+        rng = np.random if rng is None else rng
+        key = network_key(num_agents, method, reference_size, params, rng)
+        if self.has(key):
+            return self.load(key, rng)
+        off, on, tribes = generate_multiplex(num_agents, method=method, as_edges=True,
+                                             reference_size=reference_size, rng=rng, params=params)
+        offline, online = layer_csr(off, num_agents), layer_csr(on, num_agents)
+        self.save(key, offline, online, tribes, rng)
+        return offline, online, tribes
+
+    def size(self) -> int:
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                total += sum(f.stat().st_size for f in os.scandir(entry.path))
+        return total
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and not entry.name.endswith(".tmp"):
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -1,145 +1,167 @@
 
 from typing import Dict, Optional, Iterable
 import os
-import matplotlib.pyplot as plt
 import pandas as pd
 
+from render import FigureSpec, render
+
+# Figures are drawn by render.py on matplotlib's object-oriented API (no pyplot
+# state, Agg canvas) in a process pool; each draw_* gets the Axes and only the
+# columns it plots, so a figure is redrawn only when those columns change.
+
 
 def _ensure_dir(d: str) -> None:
     os.makedirs(d, exist_ok=True)
 
 
-def plot_ci_trend(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str,
-                  title: str = "Average Sustainability Over Time (mean ± 95% CI)") -> str:
-    """Plot the mean with 95% CI ribbon for each scenario."""
-    _ensure_dir(outdir)
-    plt.figure(figsize=(10, 6))
-    for scenario, df in summaries.items():
-        if not {"Step", "Avg", "CI95"}.issubset(df.columns):
-            continue
+def _columns(summaries: Dict[str, pd.DataFrame], columns) -> Dict[str, pd.DataFrame]:
+    """Per scenario, just the plotted columns (scenarios missing any are left out)."""
+    return {scenario: df[list(columns)] for scenario, df in summaries.items() if set(columns).issubset(df.columns)}
+
+
+# ----------------------------
+# Drawing (module-level: pickled to render workers)
+# ----------------------------
+
+def draw_ci_trend(ax, data, title):
+    for scenario, df in data.items():
         x = df["Step"].values
         y = df["Avg"].values
         ci = df["CI95"].values
-        plt.plot(x, y, label=scenario)
-        plt.fill_between(x, y - ci, y + ci, alpha=0.15)
-    plt.title(title)
-    plt.xlabel("Step")
-    plt.ylabel("Average Sustainability Score")
-    plt.legend(title="Scenario")
-    plt.tight_layout()
-    path = os.path.join(outdir, f"sustainability_trends_ci_{timestamp}.png")
-    plt.savefig(path); plt.close()
-    return path
+        ax.plot(x, y, label=scenario)
+        ax.fill_between(x, y - ci, y + ci, alpha=0.15)
+    ax.set_title(title)
+    ax.set_xlabel("Step")
+    ax.set_ylabel("Average Sustainability Score")
+    ax.legend(title="Scenario")
+
+
+def draw_state_shares(ax, df, scenario):
+    x = df["Step"].values
+    ax.stackplot(x, *(df[f"Share{k}"].values for k in range(4)), labels=["State0", "State1", "State2", "State3"])
+    ax.set_title(f"State Shares Over Time — {scenario}")
+    ax.set_xlabel("Step")
+    ax.set_ylabel("Share")
+    ax.legend(loc="upper right")
+
+
+def draw_lines(ax, data, column, title, ylabel, legend="Scenario", label="{}", marker=None):
+    """One line of `column` against Step per entry of data."""
+    for key, df in data.items():
+        ax.plot(df["Step"].values, df[column].values, label=label.format(key), marker=marker)
+    ax.set_title(title)
+    ax.set_xlabel("Step")
+    ax.set_ylabel(ylabel)
+    ax.legend(title=legend)
+
+
+def draw_points(ax, df, x, y, title, xlabel, ylabel, yerr=None):
+    """y against x with markers (error bars when yerr names a column)."""
+    if yerr is not None:
+        ax.errorbar(df[x], df[y], yerr=df[yerr], marker="o", capsize=3)
+    else:
+        ax.plot(df[x], df[y], marker="o")
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+
+
+# ----------------------------
+# Figure specs
+# ----------------------------
+
+def ci_trend_spec(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str,
+                  title: str = "Average Sustainability Over Time (mean ± 95% CI)") -> FigureSpec:
+    return FigureSpec(os.path.join(outdir, f"sustainability_trends_ci_{timestamp}.png"), draw_ci_trend,
+                      _columns(summaries, ("Step", "Avg", "CI95")), {"title": title})
+
+
+def state_shares_specs(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> Dict[str, FigureSpec]:
+    return {scenario: FigureSpec(os.path.join(outdir, f"state_shares_{scenario}_{timestamp}.png"),
+                                 draw_state_shares, df, {"scenario": scenario})
+            for scenario, df in _columns(summaries, ("Step", "Share0", "Share1", "Share2", "Share3")).items()}
+
+
+def tax_signal_spec(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str,
+                    scenarios: Optional[Iterable[str]] = ("economic", "combo")) -> FigureSpec:
+    data = _columns({s: summaries[s] for s in (scenarios or []) if s in summaries}, ("Step", "TaxSignal"))
+    return FigureSpec(os.path.join(outdir, f"tax_signal_{timestamp}.png"), draw_lines, data,
+                      {"column": "TaxSignal", "title": "Tax Signal Over Time (Endogenous Price Pressure)",
+                       "ylabel": "Tax Signal"})
+
+
+def velocity_spec(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> FigureSpec:
+    return FigureSpec(os.path.join(outdir, f"velocity_{timestamp}.png"), draw_lines,
+                      _columns(summaries, ("Step", "Velocity")),
+                      {"column": "Velocity", "title": "Adoption Velocity Over Time",
+                       "ylabel": "Δ Average Sustainability per Step"})
+
+
+def peer_events_spec(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> FigureSpec:
+    return FigureSpec(os.path.join(outdir, f"peer_events_{timestamp}.png"), draw_lines,
+                      _columns(summaries, ("Step", "PeerEvents")),
+                      {"column": "PeerEvents", "title": "Peer Influence Events Per Step", "ylabel": "Events"})
+
+
+def gini_spec(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> FigureSpec:
+    return FigureSpec(os.path.join(outdir, f"gini_{timestamp}.png"), draw_lines,
+                      _columns(summaries, ("Step", "Gini")),
+                      {"column": "Gini", "title": "Inequality of Sustainability (Gini) Over Time",
+                       "ylabel": "Gini Score"})
+
+
+# ----------------------------
+# Plots
+# ----------------------------
+
+def plot_ci_trend(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str,
+                  title: str = "Average Sustainability Over Time (mean ± 95% CI)") -> str:
+    """Plot the mean with 95% CI ribbon for each scenario."""
+    return render([ci_trend_spec(summaries, outdir, timestamp, title)])[0]
 
 
 def plot_state_shares(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> Dict[str, str]:
     """Stacked area of state shares (0..3) — one figure per scenario."""
-    _ensure_dir(outdir)
-    out = {}
-    for scenario, df in summaries.items():
-        if not {"Step", "Share0", "Share1", "Share2", "Share3"}.issubset(df.columns):
-            continue
-        plt.figure(figsize=(10, 6))
-        x = df["Step"].values
-        s0 = df["Share0"].values
-        s1 = df["Share1"].values
-        s2 = df["Share2"].values
-        s3 = df["Share3"].values
-        plt.stackplot(x, s0, s1, s2, s3, labels=["State0", "State1", "State2", "State3"])
-        plt.title(f"State Shares Over Time — {scenario}")
-        plt.xlabel("Step")
-        plt.ylabel("Share")
-        plt.legend(loc="upper right")
-        plt.tight_layout()
-        path = os.path.join(outdir, f"state_shares_{scenario}_{timestamp}.png")
-        plt.savefig(path); plt.close()
-        out[scenario] = path
-    return out
+    specs = state_shares_specs(summaries, outdir, timestamp)
+    return dict(zip(specs, render(specs.values())))
 
 
 def plot_tax_signal(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str,
                     scenarios: Optional[Iterable[str]] = ("economic", "combo")) -> str:
     """Tax signal over time for selected scenarios."""
-    _ensure_dir(outdir)
-    plt.figure(figsize=(10, 6))
-    for scenario in (scenarios or []):
-        if scenario not in summaries:
-            continue
-        df = summaries[scenario]
-        if not {"Step", "TaxSignal"}.issubset(df.columns):
-            continue
-        plt.plot(df["Step"].values, df["TaxSignal"].values, label=scenario)
-    plt.title("Tax Signal Over Time (Endogenous Price Pressure)")
-    plt.xlabel("Step")
-    plt.ylabel("Tax Signal")
-    plt.legend(title="Scenario")
-    plt.tight_layout()
-    path = os.path.join(outdir, f"tax_signal_{timestamp}.png")
-    plt.savefig(path); plt.close()
-    return path
+    return render([tax_signal_spec(summaries, outdir, timestamp, scenarios)])[0]
 
 
 def plot_velocity(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> str:
     """Adoption velocity over time by scenario."""
-    _ensure_dir(outdir)
-    plt.figure(figsize=(10, 6))
-    for scenario, df in summaries.items():
-        if not {"Step", "Velocity"}.issubset(df.columns):
-            continue
-        plt.plot(df["Step"].values, df["Velocity"].values, label=scenario)
-    plt.title("Adoption Velocity Over Time")
-    plt.xlabel("Step")
-    plt.ylabel("Δ Average Sustainability per Step")
-    plt.legend(title="Scenario")
-    plt.tight_layout()
-    path = os.path.join(outdir, f"velocity_{timestamp}.png")
-    plt.savefig(path); plt.close()
-    return path
+    return render([velocity_spec(summaries, outdir, timestamp)])[0]
 
 
 def plot_peer_events(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> str:
     """Peer influence events per step by scenario."""
-    _ensure_dir(outdir)
-    plt.figure(figsize=(10, 6))
-    for scenario, df in summaries.items():
-        if not {"Step", "PeerEvents"}.issubset(df.columns):
-            continue
-        plt.plot(df["Step"].values, df["PeerEvents"].values, label=scenario)
-    plt.title("Peer Influence Events Per Step")
-    plt.xlabel("Step")
-    plt.ylabel("Events")
-    plt.legend(title="Scenario")
-    plt.tight_layout()
-    path = os.path.join(outdir, f"peer_events_{timestamp}.png")
-    plt.savefig(path); plt.close()
-    return path
+    return render([peer_events_spec(summaries, outdir, timestamp)])[0]
 
 
 def plot_gini(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> str:
     """Inequality of sustainability (Gini) over time by scenario."""
-    _ensure_dir(outdir)
-    plt.figure(figsize=(10, 6))
-    for scenario, df in summaries.items():
-        if not {"Step", "Gini"}.issubset(df.columns):
-            continue
-        plt.plot(df["Step"].values, df["Gini"].values, label=scenario)
-    plt.title("Inequality of Sustainability (Gini) Over Time")
-    plt.xlabel("Step")
-    plt.ylabel("Gini Score")
-    plt.legend(title="Scenario")
-    plt.tight_layout()
-    path = os.path.join(outdir, f"gini_{timestamp}.png")
-    plt.savefig(path); plt.close()
-    return path
-
-
-def plot_all(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str) -> dict:
-    """Convenience wrapper to produce all figures; returns dict of paths."""
-    paths = {}
-    paths["ci"] = plot_ci_trend(summaries, outdir, timestamp)
-    paths["state_shares"] = plot_state_shares(summaries, outdir, timestamp)
-    paths["tax_signal"] = plot_tax_signal(summaries, outdir, timestamp)
-    paths["velocity"] = plot_velocity(summaries, outdir, timestamp)
-    paths["peer_events"] = plot_peer_events(summaries, outdir, timestamp)
-    paths["gini"] = plot_gini(summaries, outdir, timestamp)
-    return paths
+    return render([gini_spec(summaries, outdir, timestamp)])[0]
+
+
+def plot_all(summaries: Dict[str, pd.DataFrame], outdir: str, timestamp: str, workers: Optional[int] = None) -> dict:
+    """
+    Produce all figures in one render pass (drawn in parallel; figures whose
+    data and spec are unchanged since an earlier render are not redrawn).
+    Returns dict of paths.
+    """
+    shares = state_shares_specs(summaries, outdir, timestamp)
+    specs = {
+        "ci": ci_trend_spec(summaries, outdir, timestamp),
+        "tax_signal": tax_signal_spec(summaries, outdir, timestamp),
+        "velocity": velocity_spec(summaries, outdir, timestamp),
+        "peer_events": peer_events_spec(summaries, outdir, timestamp),
+        "gini": gini_spec(summaries, outdir, timestamp),
+    }
+    render([*specs.values(), *shares.values()], workers)
+    paths = {key: spec.path for key, spec in specs.items()}
+    paths["state_shares"] = {scenario: spec.path for scenario, spec in shares.items()}
+    return {key: paths[key] for key in ("ci", "state_shares", "tax_signal", "velocity", "peer_events", "gini")}
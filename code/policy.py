@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+from functions_and_parameters import exp_decay, DEFAULT_PARAMS
+
+# ----------------------------
+# Shapes: weight of a policy at tick t
+# ----------------------------
+# Any frozen dataclass with __call__(t) -> float works; frozen so that policies
+# hash (compile_policy cache) and have a stable repr (sweep run-cache keys).
+
+
+@dataclass(frozen=True)
+class Constant:
+    """The same weight at every tick."""
+    level: float = 1.0
+
+    def __call__(self, t):
+        return self.level
+
+
+@dataclass(frozen=True)
+class ExpDecay:
+    """1 at start, halving every half_life ticks, 0 outside [start, end] (the default campaign)."""
+    start: int
+    end: int
+    half_life: float
+
+    def __call__(self, t):
+        return exp_decay(t, self.start, self.half_life) if self.start <= t <= self.end else 0.0
+
+
+@dataclass(frozen=True)
+class Pulse:
+    """1 for `length` ticks from start, repeated every `period` ticks (0: once), `count` times (0: no limit)."""
+    start: int
+    length: int = 1
+    period: int = 0
+    count: int = 0
+
+    def __call__(self, t):
+        if t < self.start:
+            return 0.0
+        k, phase = divmod(t - self.start, self.period) if self.period else (0, t - self.start)
+        if self.count and k >= self.count:
+            return 0.0
+        return 1.0 if phase < self.length else 0.0
+
+
+@dataclass(frozen=True)
+class Ramp:
+    """lo up to start, linear to hi at end, hi afterwards (a phase-in; lo > hi phases out)."""
+    start: int
+    end: int
+    lo: float = 0.0
+    hi: float = 1.0
+
+    def __call__(self, t):
+        if t <= self.start:
+            return self.lo
+        if t >= self.end:
+            return self.hi
+        return self.lo + (self.hi - self.lo) * (t - self.start) / (self.end - self.start)
+
+
+@dataclass(frozen=True)
+class Steps:
+    """Piecewise constant: values[i] from tick ticks[i] on, 0 before ticks[0] (ticks ascending)."""
+    ticks: tuple
+    values: tuple
+
+    def __call__(self, t):
+        level = 0.0
+        for tick, value in zip(self.ticks, self.values):
+            if t < tick:
+                break
+            level = value
+        return level
+
+
+# ----------------------------
+# Policies
+# ----------------------------
+
+@dataclass(frozen=True)
+class Campaign:
+    """Campaign pressure strength * shape(t); each agent feels it times its campaign sensitivity."""
+    strength: float
+    shape: object
+
+
+@dataclass(frozen=True)
+class Policy:
+    """
+    The exogenous side of a run: campaigns (their intensities add up) and the
+    tax scale, a shape multiplying the endogenous tax signal
+    (ModelParams.tax_signal of the adoption share; None = no tax).
+
+    Pass one as SustainableEatingModel(policy=...) / base_params["policy"] to
+    replace the scenario's default (scenario_policy), e.g. two campaign pulses
+    and a phased-in tax:
+
+        Policy(campaigns=(Campaign(0.3, Pulse(10, length=5, period=20, count=2)),),
+               tax=Ramp(20, 40))
+    """
+    campaigns: tuple = ()
+    tax: object = None
+
+
+def scenario_policy(scenario: str, params=DEFAULT_PARAMS) -> Policy:
+    """The policy the four scenarios always had: an exp-decaying campaign and/or the full tax."""
+    campaigns = ()
+    if scenario in ("campaign", "combo"):
+        campaigns = (Campaign(params.campaign_base_strength,
+                              ExpDecay(params.campaign_start, params.campaign_end, params.campaign_half_life)),)
+    return Policy(campaigns=campaigns, tax=Constant() if scenario in ("economic", "combo") else None)
+
+
+class PolicySchedule:
+    """
+    A Policy evaluated once for ticks 0..steps-1: campaign[t] (summed campaign
+    intensity) and tax[t] (tax scale) as plain floats, so a tick costs one
+    lookup and each agent one multiplication by its sensitivity, however many
+    campaigns or shapes the policy has. settled is the first tick from which
+    the policy no longer changes (no campaign, constant tax scale).
+    """
+
+    def __init__(self, policy: Policy, steps: int):
+        self.policy = policy
+        self.steps = steps
+        self.campaign = [self._campaign(t) for t in range(steps)]
+        self.tax = [self._tax(t) for t in range(steps)]
+        changing = [t for t in range(steps) if self.campaign[t] != 0.0 or self.tax[t] != self.tax[-1]]
+        self.settled = changing[-1] + 1 if changing else 0
+
+    def _campaign(self, t):
+        intensity = 0.0
+        for campaign in self.policy.campaigns:
+            intensity += campaign.strength * campaign.shape(t)
+        return intensity
+
+    def _tax(self, t):
+        return 0.0 if self.policy.tax is None else float(self.policy.tax(t))
+
+    def at(self, t):
+        """(campaign intensity, tax scale) at tick t (evaluated directly past the compiled horizon)."""
+        if t < self.steps:
+            return self.campaign[t], self.tax[t]
+        return self._campaign(t), self._tax(t)
+
+
+@lru_cache(maxsize=256)
+def compile_policy(policy: Policy, steps: int) -> PolicySchedule:
+    """Shared PolicySchedule: compiled once per (policy, steps) in each process, i.e. once per sweep point."""
+    return PolicySchedule(policy, steps)
+
+
+def schedule_for(scenario: str, params, steps: int, policy=None) -> PolicySchedule:
+    """The compiled policy of a run: `policy`, or the scenario's default."""
+    return compile_policy(scenario_policy(scenario, params) if policy is None else policy, steps)
@@ -0,0 +1,125 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+
+# Per output directory: file name -> hash of the spec it was drawn from
+MANIFEST = ".figures.json"
+
+
+@dataclass
+class FigureSpec:
+    """
+    One figure: draw(ax, data, **options) on a figsize figure, saved to path.
+    draw must be a module-level function (it is pickled to pool workers by
+    name); its source is part of the figure's hash, so editing it redraws.
+    """
+    path: str
+    draw: Callable
+    data: object
+    options: dict = field(default_factory=dict)
+    figsize: tuple = (10, 6)
+
+
+def _hash_data(h, data) -> None:
+    if isinstance(data, pd.DataFrame):
+        h.update(json.dumps([[str(c) for c in data.columns], [str(t) for t in data.dtypes]]).encode())
+        h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    elif isinstance(data, np.ndarray):
+        h.update(f"{data.dtype}{data.shape}".encode())
+        h.update(np.ascontiguousarray(data).tobytes())
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            h.update(repr(key).encode())
+            _hash_data(h, value)
+    elif isinstance(data, (list, tuple)):
+        for value in data:
+            _hash_data(h, value)
+    else:
+        h.update(repr(data).encode())
+
+
+def spec_hash(spec: FigureSpec) -> str:
+    """Hash of the figure's data, options, size and drawing code."""
+    h = hashlib.sha1()
+    h.update(inspect.getsource(spec.draw).encode())
+    h.update(json.dumps(spec.options, sort_keys=True, default=str).encode())
+    h.update(repr(tuple(spec.figsize)).encode())
+    _hash_data(h, spec.data)
+    return h.hexdigest()
+
+
+def _draw(spec: FigureSpec) -> str:
+    """Pool worker: draw and save one figure (object-oriented API: no pyplot state, Agg canvas)."""
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=spec.figsize)
+    ax = fig.add_subplot()
+    spec.draw(ax, spec.data, **spec.options)
+    fig.tight_layout()
+    fig.savefig(spec.path)
+    return spec.path
+
+
+def _load_manifest(outdir: str) -> dict:
+    try:
+        with open(os.path.join(outdir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(outdir: str, manifest: dict) -> None:
+    path = os.path.join(outdir, MANIFEST)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def render(specs, workers: Optional[int] = None) -> list:
+    """
+    Save every figure in specs, redrawing only what changed: a figure whose
+    file already holds the same spec hash is skipped, one identical to another
+    rendered file (e.g. the same summary under a new timestamp) is copied, and
+    the rest are drawn on a process pool (workers=1 or a single figure:
+    in-process). Returns the paths, in order.
+    """
+    specs = [s for s in specs if s is not None]
+    manifests, todo = {}, []
+    n_skipped = n_copied = 0
+    for spec in specs:
+        outdir, name = os.path.split(os.path.abspath(spec.path))
+        os.makedirs(outdir, exist_ok=True)
+        manifest = manifests.setdefault(outdir, _load_manifest(outdir))
+        key = spec_hash(spec)
+        if manifest.get(name) == key and os.path.exists(spec.path):
+            n_skipped += 1
+            continue
+        same = next((n for n, k in manifest.items() if k == key and os.path.exists(os.path.join(outdir, n))), None)
+        if same is not None:
+            shutil.copyfile(os.path.join(outdir, same), spec.path)
+            manifest[name] = key
+            n_copied += 1
+            continue
+        todo.append((spec, outdir, name, key))
+
+    workers = min(len(todo), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for spec, *_ in todo:
+            _draw(spec)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_draw, [spec for spec, *_ in todo]))
+    for _, outdir, name, key in todo:
+        manifests[outdir][name] = key
+    for outdir, manifest in manifests.items():
+        _save_manifest(outdir, manifest)
+    if n_skipped or n_copied:
+        print(f"[render] {len(todo)} drawn, {n_skipped} unchanged, {n_copied} copied")
+    return [spec.path for spec in specs]
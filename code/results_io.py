@@ -0,0 +1,127 @@
+import os
+import uuid
+import numpy as np
+import pandas as pd
+
+# pyarrow is optional: only needed when results are written/read as Parquet or Arrow IPC
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+
+FORMATS = {"parquet": "parquet", "ipc": "arrow"}   # format -> file extension
+
+# Compact on-disk dtypes (everything not listed is stored as float32)
+INT_COLUMNS = {"Step": "int16", "Run": "int16", "PeerInfluenceEvents": "int32"}
+
+# Partition columns, in directory order: <table>/scenario=.../sweep=.../value=.../Run=...
+NO_SWEEP = "none"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("columnar results need pyarrow: pip install pyarrow")
+
+
+def _partitioning(table):
+    _require_pyarrow()
+    fields = [pa.field("scenario", pa.string()), pa.field("sweep", pa.string()), pa.field("value", pa.string())]
+    if table == "allruns":
+        fields.append(pa.field("Run", pa.int16()))
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast a runs/summary frame: int16 Step/Run, int32 peer events, float32 elsewhere."""
+    out = {}
+    for col in df.columns:
+        if col in INT_COLUMNS:
+            out[col] = df[col].to_numpy().astype(INT_COLUMNS[col])
+        elif pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            out[col] = df[col].to_numpy().astype(np.float32)
+        else:
+            out[col] = df[col].to_numpy()
+    return pd.DataFrame(out, index=df.index)
+
+
+class ResultsWriter:
+    """
+    Writes all-runs and summary tables as a hive-partitioned columnar dataset:
+
+        root/allruns/scenario=combo/sweep=backlash/value=0.25/Run=3/part-*.parquet
+        root/summary/scenario=combo/sweep=none/value=none/part-*.parquet
+
+    format is "parquet" (zstd-compressed) or "ipc" (Arrow IPC / Feather v2;
+    uncompressed by default so read_results can memory-map it without copies).
+    Every write adds new part files, so appending runs to an existing dataset
+    (e.g. while streaming a Monte Carlo) never rewrites what is already there.
+    """
+
+    def __init__(self, root, format="parquet", compression=None):
+        _require_pyarrow()
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; use one of {sorted(FORMATS)}")
+        self.root = root
+        self.format = format
+        if format == "parquet":
+            self.options = ds.ParquetFileFormat().make_write_options(compression=compression or "zstd")
+        else:
+            self.options = ds.IpcFileFormat().make_write_options(compression=compression)
+
+    def _write(self, table, df, scenario, sweep, value):
+        df = compact(df)
+        df["scenario"] = scenario
+        df["sweep"] = sweep or NO_SWEEP
+        df["value"] = NO_SWEEP if value is None else str(value)
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None),
+            os.path.join(self.root, table),
+            format=self.format,
+            file_options=self.options,
+            partitioning=_partitioning(table),
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.{FORMATS[self.format]}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def write_runs(self, all_runs: pd.DataFrame, scenario, sweep=None, value=None):
+        """Append per-step rows of one or more runs (needs a Run column)."""
+        self._write("allruns", all_runs, scenario, sweep, value)
+
+    def write_summary(self, summary: pd.DataFrame, scenario, sweep=None, value=None):
+        """Append a per-step summary table (runner.summarize_runs layout)."""
+        self._write("summary", summary, scenario, sweep, value)
+
+
+def read_results(root, table="allruns", format="parquet", scenario=None, sweep=None, value=None,
+                 runs=None, columns=None, memory_map=True) -> pd.DataFrame:
+    """
+    Load (a filtered slice of) a dataset written by ResultsWriter.
+
+    scenario/sweep/value/runs select partitions (a single value or a list), so
+    only the matching files are opened; columns selects the columns to load.
+    memory_map=True maps the files instead of reading them into buffers.
+    Rows come back ordered by partition and Step.
+    """
+    _require_pyarrow()
+    dataset = ds.dataset(
+        os.path.join(root, table),
+        format=format,
+        partitioning=_partitioning(table),
+        filesystem=pafs.LocalFileSystem(use_mmap=memory_map),
+    )
+    filters = []
+    for name, want in (("scenario", scenario), ("sweep", sweep), ("value", value), ("Run", runs)):
+        if want is None:
+            continue
+        want = list(want) if isinstance(want, (list, tuple, set, np.ndarray)) else [want]
+        if name == "value":
+            want = [str(v) for v in want]
+        filters.append(ds.field(name).isin(want))
+    expr = None
+    for f in filters:
+        expr = f if expr is None else expr & f
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    order = [c for c in ("scenario", "sweep", "value", "Run", "Step") if c in df.columns]
+    return df.sort_values(order, kind="stable").reset_index(drop=True) if order else df
@@ -0,0 +1,564 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from model import SustainableEatingModel, TRAIT_ATTRS, shared_prefix
+from neighbors import NeighborSignal
+from policy import schedule_for
+from vectorized import VectorizedEngine
+from aggregation import StreamingSummary, EndpointStats, DEFAULT_TOLERANCE
+from network_cache import NetworkCache
+from crn import CommonDraws
+from trajectories import TrajectoryStore
+from shm_transport import ResultBlock, summarize_block
+from functions_and_parameters import DEFAULT_PARAMS, generate_multiplex, gini_from_counts
+
+# Model reporter columns, in DataCollector order
+MODEL_COLUMNS = [
+    "AverageSustainability",
+    "ShareState0", "ShareState1", "ShareState2", "ShareState3",
+    "GiniScore",
+    "AdoptionVelocity",
+    "PeerInfluenceEvents",
+    "TaxSignal",
+]
+
+
+def summarize_runs(all_runs: pd.DataFrame, n_runs: int) -> pd.DataFrame:
+    """Per-step mean (and CI95 of the average score) across runs."""
+    agg = (
+        all_runs.groupby("Step")
+        .agg(
+            Avg=("AverageSustainability", "mean"),
+            Std=("AverageSustainability", "std"),      # <- function is "std" (lowercase)
+            Share0=("ShareState0", "mean"),
+            Share1=("ShareState1", "mean"),
+            Share2=("ShareState2", "mean"),
+            Share3=("ShareState3", "mean"),
+            # Optional: add this if you want CI bars for Final State 3 in sweeps:
+            # Share3Std=("ShareState3", "std"),
+            Gini=("GiniScore", "mean"),
+            Velocity=("AdoptionVelocity", "mean"),
+            PeerEvents=("PeerInfluenceEvents", "mean"),
+            TaxSignal=("TaxSignal", "mean"),
+        )
+        .reset_index()
+    )
+    agg["CI95"] = 1.96 * agg["Std"] / np.sqrt(n_runs)
+    return agg
+
+
+def _iter_serial(scenario, steps, runs, seed0, base_params, params):
+    for r in runs:
+        if r % 10 == 0:
+            print(f"{scenario}: run {r}/{runs[-1] + 1}")
+        rng_seed = seed0+r
+        random.seed(rng_seed)
+        np.random.seed(rng_seed)
+        model = SustainableEatingModel(**_model_kwargs(base_params, scenario), params=params)
+        yield _run_model(model, steps, scenario, r, base_params.get("trajectories"))
+
+
+def _model_kwargs(base_params, scenario):
+    # trajectories (a TrajectoryStore) is recorded by the runner, not passed to the model
+    return {**{k: v for k, v in base_params.items() if k != "trajectories"}, "scenario": scenario}
+
+
+def _run_model(model, steps, scenario, r, trajectories=None, frame=True):
+    """
+    Step one model to the end -> its model-vars frame (and its telemetry "run"
+    record, if on; with a trajectories.TrajectoryStore, every tick's agent states).
+    frame=False leaves the results in model.datacollector and returns None.
+    """
+    if model.timer is not None:
+        model.timer.scenario, model.timer.run = scenario, r
+    if trajectories is not None:
+        trajectories.record_model(r, 0, model)
+    for t in range(steps):
+        model.step()
+        if trajectories is not None:
+            trajectories.record_model(r, t + 1, model)
+    if model.timer is not None:
+        model.timer.finish(model.num_agents)
+    if trajectories is not None:
+        trajectories.flush()
+    if not frame:
+        return None
+    mdf = (
+        model.datacollector.get_model_vars_dataframe()
+        .reset_index()
+        .rename(columns={"index": "Step"})
+    )
+    mdf["Run"] = r
+    return mdf
+
+
+class _RunStreams:
+    """
+    The batched engine's rng: a draw of size (..., runs, agents) stacks every
+    run's own (..., agents) draw from its stream, in run order.
+    """
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    def _stack(self, method, size, *args):
+        *lead, _, n = size
+        return np.stack([getattr(g, method)(*args, size=(*lead, n)) for g in self.streams], axis=len(lead))
+
+    def random(self, size):
+        return self._stack("random", size)
+
+    def beta(self, a, b, size):
+        return self._stack("beta", size, a, b)
+
+    def lognormal(self, mean, sigma, size):
+        return self._stack("lognormal", size, mean, sigma)
+
+    def normal(self, loc, scale, size):
+        return self._stack("normal", size, loc, scale)
+
+
+def _run_batch(scenario, steps, runs, seed0, base_params, params, crn=False):
+    """
+    Advance the replicates in `runs` in lockstep with one VectorizedEngine:
+    arrays are (runs x agents) and the per-run networks are packed as a
+    block-diagonal sparse matrix. Returns one model-vars frame per run.
+    Run r draws its network and engine numbers from its own
+    RandomState(seed0 + r), like the serial loop (the global RNG is left
+    alone), so its results do not depend on the batch it runs in.
+    crn=True uses each run's crn.CommonDraws (and its network stream) instead.
+    """
+    n = base_params["num_agents"]
+    method, reference_size = base_params.get("network", "pairwise"), base_params.get("reference_size")
+    cache = NetworkCache(base_params["network_cache"]) if base_params.get("network_cache") else None
+    draws = [CommonDraws(n, steps, seed0, r, params) for r in runs] if crn else None
+    telemetry = base_params.get("telemetry")
+    timer = telemetry.timer() if telemetry is not None else None
+    t_network = time.perf_counter()
+    signals, tribes = [], []
+    # run r's own stream, seeded like the serial loop (without touching the global RNG): its network,
+    # then its engine draws, so run r does not depend on which runs share its batch
+    streams = [np.random.RandomState(seed0 + r) for r in runs]
+    for i, r in enumerate(runs):
+        net_rng = draws[i].network_rng() if crn else streams[i]
+        if cache is not None:
+            off, on, tr = cache.multiplex(n, rng=net_rng, method=method, reference_size=reference_size,
+                                          params=params)
+        else:
+            off, on, tr = generate_multiplex(n, method=method, as_edges=True, reference_size=reference_size,
+                                             rng=net_rng, params=params)
+        tribes.append(tr)
+        signals.append(NeighborSignal(off, on, n, params.offline_weight, params.online_weight))
+    if timer is not None:
+        timer.network_seconds = time.perf_counter() - t_network
+        timer.scenario, timer.run = scenario, f"{runs[0]}-{runs[-1]}"
+    R = len(runs)
+    rng = _RunStreams(streams)
+    policy = schedule_for(scenario, params, steps, base_params.get("policy"))
+    kernel = base_params.get("kernel", "auto")
+    signal = NeighborSignal.block_diagonal(signals, kernel=kernel)
+    engine = VectorizedEngine(n, scenario, signal, rng=rng, n_runs=R,
+                              params=params, draws=CommonDraws.stack(draws) if crn else None,
+                              kernel=kernel, policy=policy)
+
+    # agent trajectories of consecutive runs go to one slice of the store
+    trajectories = base_params.get("trajectories")
+    if trajectories is not None:
+        rows = slice(runs[0], runs[-1] + 1)
+        trajectories.record_static(rows, engine.identity_strength, np.stack(tribes))
+        trajectories.record(rows, 0, engine.state, {k: getattr(engine, TRAIT_ATTRS[k]) for k in trajectories.traits})
+
+    scores = np.asarray(params.state_scores)
+    out = {c: np.empty((steps, R)) for c in MODEL_COLUMNS}
+    counts = engine.state_counts.copy()   # (R, 4), kept current by the engine
+    for t in range(steps):
+        if timer is not None:
+            timer.start()
+        # 1) tax signal from current adoption (pre-move), one value per run
+        adoption_share = 1.0 - counts[:, 0] / n
+        tax_scale = policy.tax[t]
+        tax = tax_scale * params.tax_signal(adoption_share) if tax_scale else np.zeros(R)
+        if timer is not None:
+            timer.lap("tax")
+        # 2) snapshot avg before move
+        prev_avg = (counts * scores).sum(axis=1) / n   # row by row: independent of the batch size
+        if timer is not None:
+            timer.lap("snapshot")
+        # 3) advance one tick
+        events = engine.step(t, tax)
+        if timer is not None:
+            timer.lap("advance")
+        # 4) metrics after agents moved
+        counts = engine.state_counts.copy()
+        avg = (counts * scores).sum(axis=1) / n
+        if timer is not None:
+            timer.lap("velocity")
+        out["AverageSustainability"][t] = avg
+        for k in range(4):
+            out[f"ShareState{k}"][t] = counts[:, k] / n
+        out["GiniScore"][t] = gini_from_counts(counts, params.state_scores)
+        out["AdoptionVelocity"][t] = avg - prev_avg
+        out["PeerInfluenceEvents"][t] = events
+        out["TaxSignal"][t] = tax
+        if timer is not None:
+            timer.lap("collect")
+        if trajectories is not None:
+            trajectories.record(rows, t + 1, engine.state,
+                                {k: getattr(engine, TRAIT_ATTRS[k]) for k in trajectories.traits})
+    if timer is not None:
+        timer.finish(n * R)
+    if trajectories is not None:
+        trajectories.flush()
+
+    frames = []
+    for i, r in enumerate(runs):
+        mdf = pd.DataFrame({"Step": np.arange(steps)})
+        for c in MODEL_COLUMNS:
+            mdf[c] = out[c][:, i]
+        mdf["PeerInfluenceEvents"] = mdf["PeerInfluenceEvents"].astype(np.int64)
+        mdf["Run"] = r
+        frames.append(mdf)
+    return frames
+
+
+def run_rng(seed0: int, r: int) -> np.random.Generator:
+    """Independent Generator for run r: child r of SeedSequence(seed0)."""
+    return np.random.default_rng(np.random.SeedSequence(seed0, spawn_key=(r,)))
+
+
+def _job_model(job):
+    """The model of a pool job: its own Generator (or common random numbers)."""
+    scenario, steps, r, seed0, base_params, params, crn = job
+    model_kwargs = _model_kwargs(base_params, scenario)
+    if crn:
+        draws = CommonDraws(base_params["num_agents"], steps, seed0, r, params)
+        return SustainableEatingModel(**model_kwargs, params=params, crn=draws)
+    return SustainableEatingModel(**model_kwargs, rng=run_rng(seed0, r), params=params)
+
+
+def _run_one(job):
+    """Pool worker: one replicate -> model-vars frame."""
+    scenario, steps, r, _, base_params, _, _ = job
+    return _run_model(_job_model(job), steps, scenario, r, base_params.get("trajectories"))
+
+
+def _run_into(item):
+    """Pool worker: one replicate, written into its slot of a shared ResultBlock instead of returned."""
+    block, slot, job = item
+    scenario, steps, r, _, base_params, _, _ = job
+    model = _job_model(job)
+    _run_model(model, steps, scenario, r, base_params.get("trajectories"), frame=False)
+    block.write(slot, model.datacollector.model_vars)
+    return slot
+
+
+def _branch_groups(branches, steps, policy=None, steady_state=None):
+    """Split branch indices into groups that share a prefix of ticks (see model.shared_prefix)."""
+    groups = []
+    for i, branch in enumerate(branches):
+        for group in groups:
+            if shared_prefix([branches[j] for j in group] + [branch], steps, policy, steady_state) > 0:
+                group.append(i)
+                break
+        else:
+            groups.append([i])
+    return groups
+
+
+def _run_branches(job):
+    """
+    Pool worker: run r of several (scenario, params) branches. Branches that
+    agree on their first ticks run them once, then fork from a checkpoint at
+    the divergence step; each frame is what running that branch alone gives.
+    legacy=True seeds the global RNGs like the serial loop, otherwise the run
+    draws from run_rng(seed0, r) (or common random numbers with crn).
+    """
+    branches, steps, r, seed0, base_params, crn, legacy = job
+    frames = [None] * len(branches)
+    policy, steady_state = base_params.get("policy"), base_params.get("steady_state")
+    for group in _branch_groups(branches, steps, policy, steady_state):
+        prefix = shared_prefix([branches[i] for i in group], steps, policy, steady_state)
+        scenario, params = branches[group[0]]
+        model_kwargs = _model_kwargs(base_params, scenario)
+        if crn:
+            draws = CommonDraws(base_params["num_agents"], steps, seed0, r, params)
+            trunk = SustainableEatingModel(**model_kwargs, params=params, crn=draws)
+        elif legacy:
+            random.seed(seed0 + r)
+            np.random.seed(seed0 + r)
+            trunk = SustainableEatingModel(**model_kwargs, params=params)
+        else:
+            trunk = SustainableEatingModel(**model_kwargs, rng=run_rng(seed0, r), params=params)
+        for _ in range(prefix):
+            trunk.step()
+        checkpoint = trunk.checkpoint() if len(group) > 1 else None
+        for k, i in enumerate(group):
+            scenario, params = branches[i]
+            model = trunk if k == 0 else SustainableEatingModel.restore(checkpoint, scenario, params)
+            frames[i] = _run_model(model, steps - prefix, scenario, r)
+    return frames
+
+
+def _iter_jobs(jobs, workers):
+    """Run pool jobs, yielding frames in job order as they become available."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for job in jobs:
+            yield _run_one(job)
+        return
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, mdf in enumerate(pool.map(_run_one, jobs, chunksize=chunksize)):
+            if i % 50 == 0:
+                print(f"parallel: {i}/{len(jobs)} runs done ({workers} workers)")
+            yield mdf
+
+
+def _block_columns(base_params):
+    """Model columns of a run, as collected by its DataCollector."""
+    return MODEL_COLUMNS + (["Extrapolated"] if base_params.get("steady_state") else [])
+
+
+def _fill_block(jobs, workers, block):
+    """
+    Run pool jobs into the slots of a shm_transport.ResultBlock (job i -> slot i),
+    yielding each slot as it is written, in job order. Workers send back only
+    the slot number, so the pool moves no frames between processes.
+    """
+    items = [(block, i, job) for i, job in enumerate(jobs)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for item in items:
+            yield _run_into(item)
+        return
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, slot in enumerate(pool.map(_run_into, items, chunksize=chunksize)):
+            if i % 50 == 0:
+                print(f"parallel: {i}/{len(jobs)} runs done ({workers} workers)")
+            yield slot
+
+
+def _run_jobs(jobs, workers, block, base_params, label, steps):
+    """Fill block with jobs' runs (with telemetry progress records, if on)."""
+    slots = _fill_block(jobs, workers, block)
+    if base_params.get("telemetry") is not None:
+        slots = _with_progress(slots, base_params, label, steps, len(jobs))
+    for _ in slots:
+        pass
+
+
+def _iter_batched(scenario, steps, runs, seed0, base_params, params, batch_size, crn=False):
+    if base_params.get("collect_agents") or base_params.get("steady_state"):
+        raise ValueError("batched runs do not support collect_agents or steady_state")
+    size = batch_size or len(runs)
+    for start in range(0, len(runs), size):
+        chunk = runs[start:start + size]
+        print(f"{scenario}: runs {chunk[0]}-{chunk[-1]}/{runs[-1] + 1} (batched)")
+        yield from _run_batch(scenario, steps, chunk, seed0, base_params, params, crn)
+
+
+def _iter_runs(scenario, steps, runs, seed0, base_params, params, batched, batch_size, workers, crn):
+    """Model-vars frames of the given run indices, in order, for the chosen execution mode."""
+    if batched:
+        frames = _iter_batched(scenario, steps, runs, seed0, base_params, params, batch_size, crn)
+    elif workers is not None or crn:
+        jobs = [(scenario, steps, r, seed0, base_params, params, crn) for r in runs]
+        # crn without workers: the same jobs, in-process (workers=None means serial, not one per CPU)
+        frames = _iter_jobs(jobs, 1 if workers is None else workers)
+    else:
+        frames = _iter_serial(scenario, steps, runs, seed0, base_params, params)
+    if base_params.get("telemetry") is not None:
+        frames = _with_progress(frames, base_params, scenario, steps, len(runs))
+    return frames
+
+
+def _with_progress(frames, base_params, label, steps, n_runs):
+    """Pass frames through, writing a telemetry "progress" record (agent-steps/s, ETA) after each."""
+    progress = base_params["telemetry"].progress(label, n_runs, base_params.get("num_agents", 0) * steps)
+    for mdf in frames:
+        progress.update()
+        yield mdf
+
+
+def run_parallel(scenarios, steps, n_runs=100, seed0=123, base_params=None, workers=None, params=None,
+                 crn=False, transport="shm"):
+    """
+    Spread (scenario, run) jobs over a process pool.
+
+    Every run draws only from run_rng(seed0, r), which is passed explicitly into
+    the model, agents and network generator, so the results are bit-identical
+    for any number of workers (workers=1 runs in-process). As in the serial
+    loop, run r uses the same seed in every scenario; crn=True goes further and
+    gives run r the same pre-drawn numbers in every scenario (crn.CommonDraws).
+
+    transport="shm" has the workers write their runs into one shared-memory
+    block (shm_transport.ResultBlock) that is summarized in place;
+    transport="pickle" sends every run's frame back through the pool.
+    Returns dict[scenario] -> (all_runs, agg).
+    """
+    base_params = dict(base_params or {})
+    params = DEFAULT_PARAMS if params is None else params
+    jobs = [(sc, steps, r, seed0, base_params, params, crn) for sc in scenarios for r in range(n_runs)]
+    results = {}
+    if transport == "shm":
+        with ResultBlock(len(jobs), steps, _block_columns(base_params)) as block:
+            _run_jobs(jobs, workers, block, base_params, "parallel", steps)
+            for k, scenario in enumerate(scenarios):
+                slots = slice(k * n_runs, (k + 1) * n_runs)
+                results[scenario] = (block.all_runs(slots, range(n_runs)),
+                                     summarize_block(block.values[slots], block.columns))
+        return results
+
+    frames = _iter_jobs(jobs, workers)
+    if base_params.get("telemetry") is not None:
+        frames = _with_progress(frames, base_params, "parallel", steps, len(jobs))
+    frames = list(frames)
+    for k, scenario in enumerate(scenarios):
+        all_runs = pd.concat(frames[k * n_runs:(k + 1) * n_runs], ignore_index=True)
+        results[scenario] = (all_runs, summarize_runs(all_runs, n_runs))
+    return results
+
+
+def run_branches(branches: dict, steps, n_runs=100, seed0=123, base_params=None, workers=None, crn=False):
+    """
+    Monte Carlo runs of several branches, {name: (scenario, ModelParams)}, that
+    fork from a shared warm-up where they can: with the same seed, branches
+    that only differ in the campaign (social/campaign, economic/combo, campaign
+    half-life or strength values) follow the same trajectory until
+    CAMPAIGN_START, so run r simulates those ticks once and restores a
+    checkpoint for the other branches, reusing the network too.
+
+    The results are those of running every branch on its own: the serial loop
+    (workers=None, crn=False) or the per-run Generators / common random numbers
+    of run_parallel. Returns dict[name] -> (all_runs, agg).
+    """
+    base_params = dict(base_params or {})
+    names = list(branches)
+    specs = [(branches[n][0], DEFAULT_PARAMS if branches[n][1] is None else branches[n][1]) for n in names]
+    legacy = workers is None and not crn
+    jobs = [(specs, steps, r, seed0, base_params, crn, legacy) for r in range(n_runs)]
+    policy, steady_state = base_params.get("policy"), base_params.get("steady_state")
+    for group in _branch_groups(specs, steps, policy, steady_state):
+        if len(group) > 1:
+            print(f"[branches] {'/'.join(names[i] for i in group)}: "
+                  f"first {shared_prefix([specs[i] for i in group], steps, policy, steady_state)} ticks shared")
+    if workers is None or workers == 1:
+        per_run = [_run_branches(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_run = list(pool.map(_run_branches, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+    results = {}
+    for k, name in enumerate(names):
+        all_runs = pd.concat([frames[k] for frames in per_run], ignore_index=True)
+        results[name] = (all_runs, summarize_runs(all_runs, n_runs))
+    return results
+
+
+def run_monte_carlo(scenario, steps, n_runs=100, seed0=123, base_params=None,
+                    batched=False, batch_size=None, workers=None, params=None,
+                    stream=False, runs_path=None, quantiles=None, on_run=None, writer=None, crn=False,
+                    trajectories=None, transport="shm"):
+    """
+    Run n_runs replicates of one scenario and return (all_runs, agg).
+
+    batched=True advances replicates in lockstep (vectorized engine), batch_size
+    runs at a time (default: all of them); the returned frames have the same
+    layout as the one-model-per-run loop and do not depend on batch_size. workers=N runs the replicates on a
+    process pool with independent per-run Generators (see run_parallel; without
+    stream, transport="shm" returns the runs through shared memory).
+    params: ModelParams for these runs (default: DEFAULT_PARAMS).
+    crn=True runs with common random numbers: run r draws its priors, initial
+    states, per-tick uniforms and network from crn.CommonDraws(seed0, r), the
+    same in every scenario and sweep point, so paired differences between
+    scenarios (crn.paired_differences) need far fewer runs.
+
+    stream=True folds each finished run into an aggregation.StreamingSummary
+    instead of keeping it, so memory stays flat in the number of runs; all_runs
+    is then None. runs_path appends every run to a CSV as it finishes,
+    writer (a results_io.ResultsWriter) appends it to a columnar dataset,
+    quantiles adds per-step quantiles of the average score, and
+    on_run(summary) is called after each run so the summary can be read mid-run.
+
+    trajectories: a directory for a trajectories.TrajectoryStore of every
+    agent's state and traits at every tick of every run (memory-mapped, on
+    disk; open it afterwards with TrajectoryStore(path)). The shm transport
+    only carries the per-step model columns: agent-level arrays never go
+    through the ResultBlock, pool workers write them straight into the
+    store's memory maps.
+    """
+    base_params = dict(base_params or {})
+    params = DEFAULT_PARAMS if params is None else params
+    if trajectories is not None:
+        base_params["trajectories"] = TrajectoryStore.create(trajectories, n_runs, steps, base_params["num_agents"])
+    if not stream and not batched and transport == "shm" and (workers is not None or crn):
+        jobs = [(scenario, steps, r, seed0, base_params, params, crn) for r in range(n_runs)]
+        with ResultBlock(n_runs, steps, _block_columns(base_params)) as block:
+            _run_jobs(jobs, 1 if workers is None else workers, block, base_params, scenario, steps)
+            return block.all_runs(slice(None), range(n_runs)), summarize_block(block.values, block.columns)
+
+    frames = _iter_runs(scenario, steps, list(range(n_runs)), seed0, base_params, params,
+                        batched, batch_size, workers, crn)
+
+    if not stream:
+        all_runs = pd.concat(list(frames), ignore_index=True)
+        return all_runs, summarize_runs(all_runs, n_runs)
+
+    summary = StreamingSummary(steps, quantiles=quantiles)
+    for i, mdf in enumerate(frames):
+        summary.update(mdf)
+        if runs_path:
+            mdf.to_csv(runs_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        if writer is not None:
+            writer.write_runs(mdf, scenario)
+        if on_run is not None:
+            on_run(summary)
+    return None, summary.summary()
+
+
+def run_adaptive(scenario, steps, tol=None, min_runs=20, batch_runs=10, max_runs=200, target=0.80,
+                 seed0=123, base_params=None, batched=False, batch_size=None, workers=None, params=None,
+                 crn=False, stream=False):
+    """
+    Sequential-stopping Monte Carlo: run min_runs replicates, then further
+    batches of batch_runs until the CI95 half-width of every endpoint in tol
+    (aggregation.ENDPOINTS: FinalAvg, FinalShare3, TimeToTarget) is at most its
+    tolerance, or max_runs is reached. Runs 0..n-1 are the runs
+    run_monte_carlo(n_runs=n) would make (batched draws also depend on how
+    runs are grouped, so batched results differ).
+
+    Returns (all_runs, agg, report); report has the runs used, endpoint means
+    and half-widths, and whether the tolerance was met.
+    """
+    base_params = dict(base_params or {})
+    params = DEFAULT_PARAMS if params is None else params
+    tol = DEFAULT_TOLERANCE if tol is None else tol
+    stats = EndpointStats(target)
+    summary = StreamingSummary(steps) if stream else None
+    frames = []
+
+    n, next_n = 0, min(min_runs, max_runs)
+    while True:
+        for mdf in _iter_runs(scenario, steps, list(range(n, next_n)), seed0, base_params, params,
+                              batched, batch_size, workers, crn):
+            stats.update(mdf)
+            if summary is not None:
+                summary.update(mdf)
+            else:
+                frames.append(mdf)
+        n = next_n
+        if stats.converged(tol) or n >= max_runs:
+            break
+        next_n = min(n + batch_runs, max_runs)
+
+    report = dict(stats.report(), Scenario=scenario, Converged=stats.converged(tol))
+    print(f"{scenario}: {'converged' if report['Converged'] else 'run budget used'} after {n} runs")
+    if summary is not None:
+        return None, summary.summary(), report
+    all_runs = pd.concat(frames, ignore_index=True)
+    return all_runs, summarize_runs(all_runs, n), report
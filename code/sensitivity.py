@@ -0,0 +1,220 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+import numpy as np
+import pandas as pd
+
+from functions_and_parameters import DEFAULT_PARAMS, ModelParams
+from aggregation import run_endpoints, ENDPOINTS
+import runner
+
+# Default factor ranges (ModelParams field -> (low, high)) around the values in functions_and_parameters.py
+DEFAULT_BOUNDS = {
+    "threshold_alpha": (1.5, 3.5),
+    "threshold_beta": (2.5, 4.5),
+    "habit_decay": (0.97, 1.0),
+    "campaign_start": (5, 20),
+    "campaign_half_life": (6.0, 22.0),
+    "campaign_base_strength": (0.12, 0.32),
+    "tax_max": (0.20, 0.40),
+    "tax_pivot": (0.40, 0.70),
+    "backlash_scale": (0.10, 0.50),
+}
+
+_INT_FIELDS = {f.name for f in fields(ModelParams) if f.type in (int, "int")}
+_FLOAT_FIELDS = {f.name for f in fields(ModelParams) if f.type in (float, "float")}
+
+
+def _check_bounds(bounds: dict) -> dict:
+    bounds = {k.lower(): (float(lo), float(hi)) for k, (lo, hi) in bounds.items()}
+    unknown = set(bounds) - _INT_FIELDS - _FLOAT_FIELDS
+    if unknown:
+        raise ValueError(f"Not numeric ModelParams fields: {sorted(unknown)}")
+    bad = [k for k, (lo, hi) in bounds.items() if not lo < hi]
+    if bad:
+        raise ValueError(f"Empty ranges for: {bad}")
+    return bounds
+
+
+def _scale(unit: np.ndarray, bounds: dict) -> np.ndarray:
+    lo = np.array([b[0] for b in bounds.values()])
+    hi = np.array([b[1] for b in bounds.values()])
+    return lo + unit * (hi - lo)
+
+
+def point_params(names, row, base=DEFAULT_PARAMS) -> ModelParams:
+    """ModelParams of one design row (integer fields rounded)."""
+    return base.replace(**{n: (int(round(v)) if n in _INT_FIELDS else float(v)) for n, v in zip(names, row)})
+
+
+# ----------------------------
+# Designs
+# ----------------------------
+
+def saltelli_design(bounds: dict, n: int, seed: int = 0) -> np.ndarray:
+    """
+    Saltelli (2010) design: rows A (n), B (n), then AB_i (n each; A with column i
+    from B) for every factor -> n * (d + 2) points. A and B are the two halves of
+    a scrambled Sobol' sequence in 2d dimensions; n should be a power of two.
+    """
+    from scipy.stats import qmc   # scipy.stats takes ~1 s to import: only load it for a Sobol' design
+    bounds = _check_bounds(bounds)
+    d = len(bounds)
+    base = qmc.Sobol(2 * d, scramble=True, seed=seed).random(n)
+    A, B = base[:, :d], base[:, d:]
+    AB = np.repeat(A[None], d, axis=0)
+    AB[np.arange(d), :, np.arange(d)] = B.T
+    return _scale(np.concatenate([A, B, AB.reshape(d * n, d)]), bounds)
+
+
+def morris_design(bounds: dict, r: int, levels: int = 4, seed: int = 0) -> np.ndarray:
+    """
+    Morris one-at-a-time design: r trajectories of d + 1 points on a `levels`-grid;
+    consecutive points of a trajectory differ in one factor by +-delta, with
+    delta = levels / (2 (levels - 1)), factors moved in random order.
+    """
+    bounds = _check_bounds(bounds)
+    d = len(bounds)
+    rng = np.random.default_rng(seed)
+    delta = levels / (2.0 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    starts = rng.choice(grid[grid <= 1 - delta + 1e-12], size=(r, d))
+    signs = rng.choice([-1.0, 1.0], size=(r, d))
+    # factors moving down start delta higher, so every step stays in [0, 1]
+    x0 = starts + (signs < 0) * delta
+    order = np.argsort(rng.random((r, d)), axis=1)
+    steps = np.zeros((r, d + 1, d))
+    moves = np.zeros((r, d, d))
+    rows = np.arange(r)[:, None]
+    moves[rows, np.arange(d)[None, :], order] = (signs[rows, order]) * delta
+    steps[:, 1:] = np.cumsum(moves, axis=1)
+    unit = x0[:, None, :] + steps
+    return _scale(np.clip(unit, 0, 1).reshape(r * (d + 1), d), bounds)
+
+
+# ----------------------------
+# Evaluation
+# ----------------------------
+
+def _evaluate_chunk(job):
+    """Pool worker: endpoints (mean over replicates) of a chunk of design rows."""
+    names, rows, scenario, steps, reps, seed0, base_params, base, crn, target = job
+    out = np.empty((len(rows), len(ENDPOINTS)))
+    for i, row in enumerate(rows):
+        params = point_params(names, row, base)
+        ends = [run_endpoints(mdf, target) for mdf in runner._iter_runs(
+            scenario, steps, list(range(reps)), seed0, base_params, params,
+            batched=False, batch_size=None, workers=1, crn=crn)]
+        out[i] = [np.mean([e[k] for e in ends]) for k in ENDPOINTS]
+    return out
+
+
+def evaluate_design(X: np.ndarray, names, steps, scenario="combo", reps=1, seed0=123, base_params=None,
+                    params=DEFAULT_PARAMS, workers=None, crn=True, target=0.80, chunk_size=None) -> pd.DataFrame:
+    """
+    Run the model at every design row and return design + outputs (one column per
+    aggregation.ENDPOINTS, averaged over reps replicates).
+
+    Rows are evaluated in chunks on a process pool. With crn=True (default) every
+    row uses the same common random numbers for replicate r, so output
+    differences between rows come from the parameters, not from noise; with a
+    network_cache in base_params the shared networks are built only once.
+    """
+    base_params = dict(base_params or {})
+    names = [n.lower() for n in names]
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, min(64, len(X) // (4 * workers) or 1))
+    jobs = [(names, X[i:i + chunk_size], scenario, steps, reps, seed0, base_params, params, crn, target)
+            for i in range(0, len(X), chunk_size)]
+    print(f"[sensitivity] {len(X)} points x {reps} runs in {len(jobs)} chunks ({workers} workers)")
+    if workers == 1:
+        Y = np.concatenate([_evaluate_chunk(job) for job in jobs])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            Y = np.concatenate(list(pool.map(_evaluate_chunk, jobs)))
+    df = pd.DataFrame(X, columns=names)
+    for k, name in enumerate(ENDPOINTS):
+        df[name] = Y[:, k]
+    return df
+
+
+# ----------------------------
+# Indices
+# ----------------------------
+
+def sobol_indices(y: np.ndarray, d: int, n_boot: int = 500, seed: int = 0) -> dict:
+    """
+    First-order (Saltelli 2010) and total-order (Jansen) Sobol' indices from outputs
+    laid out like saltelli_design, with CI95 half-widths (1.96 x bootstrap std over
+    resampled base rows).
+    """
+    y = np.asarray(y, dtype=float)
+    n = y.size // (d + 2)
+    fA, fB, fAB = y[:n], y[n:2 * n], y[2 * n:].reshape(d, n)
+
+    def estimate(idx):
+        # idx: (..., n) resampled base rows
+        a, b, ab = fA[idx], fB[idx], fAB[:, idx]
+        var = np.concatenate([a, b], axis=-1).var(axis=-1)
+        var = np.where(var > 0, var, np.nan)
+        s1 = np.mean(b * (ab - a), axis=-1) / var
+        st = 0.5 * np.mean((a - ab) ** 2, axis=-1) / var
+        return s1, st
+
+    s1, st = estimate(np.arange(n))
+    rng = np.random.default_rng(seed)
+    chunks = [estimate(rng.integers(0, n, size=(min(64, n_boot - i), n))) for i in range(0, n_boot, 64)]
+    s1_b = np.concatenate([c[0] for c in chunks], axis=1)
+    st_b = np.concatenate([c[1] for c in chunks], axis=1)
+    return {"S1": s1, "S1_CI95": 1.96 * np.nanstd(s1_b, axis=1),
+            "ST": st, "ST_CI95": 1.96 * np.nanstd(st_b, axis=1)}
+
+
+def morris_indices(X: np.ndarray, y: np.ndarray, bounds: dict, n_boot: int = 500, seed: int = 0) -> dict:
+    """mu, mu* (with bootstrap CI95 half-width) and sigma of the elementary effects in unit-scaled factors."""
+    bounds = _check_bounds(bounds)
+    d = len(bounds)
+    lo = np.array([b[0] for b in bounds.values()])
+    hi = np.array([b[1] for b in bounds.values()])
+    U = ((X - lo) / (hi - lo)).reshape(-1, d + 1, d)
+    Y = np.asarray(y, dtype=float).reshape(-1, d + 1)
+    dU = np.diff(U, axis=1)                      # (r, d, d): one nonzero factor per step
+    factor = np.abs(dU).argmax(axis=2)
+    step = np.take_along_axis(dU, factor[..., None], axis=2)[..., 0]
+    ee = np.empty((U.shape[0], d))
+    np.put_along_axis(ee, factor, np.diff(Y, axis=1) / step, axis=1)
+    boot = np.random.default_rng(seed).integers(0, ee.shape[0], size=(n_boot, ee.shape[0]))
+    return {"mu": ee.mean(axis=0), "mu_star": np.abs(ee).mean(axis=0),
+            "mu_star_CI95": 1.96 * np.abs(ee)[boot].mean(axis=1).std(axis=0),
+            "sigma": ee.std(axis=0, ddof=1)}
+
+
+def _index_table(names, per_output: dict) -> pd.DataFrame:
+    rows = []
+    for output, idx in per_output.items():
+        for j, name in enumerate(names):
+            rows.append({"Output": output, "Parameter": name, **{k: float(v[j]) for k, v in idx.items()}})
+    return pd.DataFrame(rows)
+
+
+def run_sobol(bounds=None, n=256, steps=60, scenario="combo", reps=1, n_boot=500, seed=0, **eval_kwargs):
+    """
+    Sobol' analysis over `bounds` (ModelParams field -> (low, high), default
+    DEFAULT_BOUNDS): n * (d + 2) model evaluations. eval_kwargs go to
+    evaluate_design (seed0, base_params, params, workers, crn, target).
+    Returns (indices, evaluations) dataframes.
+    """
+    bounds = _check_bounds(bounds or DEFAULT_BOUNDS)
+    X = saltelli_design(bounds, n, seed)
+    evals = evaluate_design(X, list(bounds), steps, scenario, reps, **eval_kwargs)
+    indices = {out: sobol_indices(evals[out].to_numpy(), len(bounds), n_boot, seed) for out in ENDPOINTS}
+    return _index_table(list(bounds), indices), evals
+
+
+def run_morris(bounds=None, r=20, levels=4, steps=60, scenario="combo", reps=1, n_boot=500, seed=0, **eval_kwargs):
+    """Morris screening with r trajectories (r * (d + 1) evaluations); see run_sobol."""
+    bounds = _check_bounds(bounds or DEFAULT_BOUNDS)
+    X = morris_design(bounds, r, levels, seed)
+    evals = evaluate_design(X, list(bounds), steps, scenario, reps, **eval_kwargs)
+    indices = {out: morris_indices(X, evals[out].to_numpy(), bounds, n_boot, seed) for out in ENDPOINTS}
+    return _index_table(list(bounds), indices), evals
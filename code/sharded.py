@@ -0,0 +1,341 @@
+import multiprocessing as mp
+import os
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+# pymetis is optional: without it partition refines tribe blocks with Kernighan-Lin swaps
+try:
+    import pymetis
+except ImportError:  # pragma: no cover - depends on the environment
+    pymetis = None
+
+from functions_and_parameters import DEFAULT_PARAMS, generate_multiplex, gini_from_counts
+from neighbors import NeighborSignal
+from vectorized import VectorizedEngine
+from crn import CommonDraws
+from policy import schedule_for
+from runner import MODEL_COLUMNS, summarize_runs
+
+
+class HaloSignal(NeighborSignal):
+    """
+    Social signal of one shard's agents: the rows of both layers' adjacency
+    (see NeighborSignal) for the shard's own agents, over the columns of its
+    own agents followed by its halo (agents of other shards that own agents
+    are linked to). The halo states are refreshed every tick with
+    update_halo; only halo agents that changed touch the signal.
+    """
+
+    def __init__(self, layers, weights, lo: int, hi: int, halo: np.ndarray, full_refresh=0.1, kernel="numpy"):
+        cols = np.concatenate([np.arange(lo, hi), halo])
+        self._set_layers([A[lo:hi][:, cols] for A in layers], weights, full_refresh, kernel)
+        self.n_own = hi - lo
+        self.halo = np.zeros(halo.size)
+
+    def reset(self, states):
+        """Recompute from scratch; own states only -> with the current halo states."""
+        states = np.asarray(states, dtype=float)
+        if states.size == self.n_own:
+            states = np.concatenate([states, self.halo])
+        return super().reset(states)
+
+    def update_halo(self, halo_states):
+        halo_states = np.asarray(halo_states, dtype=float)
+        changed = np.flatnonzero(halo_states != self.halo)
+        self.halo = halo_states
+        return self.apply_changes(self.n_own + changed, halo_states[changed])
+
+
+def _links(W: sp.csr_matrix) -> sp.csr_matrix:
+    """Symmetric 0/1 link structure of W, without the diagonal."""
+    A = sp.csr_matrix(W, copy=True)
+    A.data[:] = 1.0
+    A = sp.csr_matrix((A + A.T) > 0, dtype=np.float64)
+    A = sp.csr_matrix(A - sp.diags(A.diagonal()))
+    A.eliminate_zeros()
+    return A
+
+
+def _cut_links(A: sp.csr_matrix, member: np.ndarray) -> int:
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    return int(np.count_nonzero(member[rows] != member[A.indices])) // 2
+
+
+def _tribe_blocks(tribes, rank, n_shards, imbalance):
+    """
+    Initial shards: agents in (tribe, RCM) order, cut at the tribe boundary
+    nearest to each equal-size cut when that keeps the shard sizes within
+    `imbalance` of n / n_shards, otherwise at the equal-size cut (tribes
+    larger than a shard are split).
+    """
+    n = tribes.size
+    order = np.lexsort((rank, tribes))
+    edges = np.flatnonzero(np.diff(tribes[order])) + 1
+    target = n / n_shards
+    bounds = [0]
+    for k in range(1, n_shards):
+        cut = int(round(k * target))
+        if edges.size:
+            near = int(edges[np.argmin(np.abs(edges - cut))])
+            if abs(near - cut) <= imbalance * target and bounds[-1] < near < n:
+                cut = near
+        bounds.append(max(cut, bounds[-1]))
+    bounds.append(n)
+    member = np.empty(n, dtype=np.int64)
+    member[order] = np.repeat(np.arange(n_shards), np.diff(bounds))
+    return member
+
+
+def _refine(A: sp.csr_matrix, member: np.ndarray, n_shards: int, passes: int) -> np.ndarray:
+    """
+    Kernighan-Lin style refinement of a partition: each pass swaps, between
+    every pair of shards, the agents whose moves gain the most (links to the
+    other shard - links to their own) while a swap's total gain is positive,
+    so shard sizes do not change. Returns the best partition seen.
+    """
+    n = member.size
+    best, best_cut = member.copy(), _cut_links(A, member)
+    for _ in range(passes):
+        member = best.copy()
+        onehot = sp.csr_matrix((np.ones(n), (np.arange(n), member)), shape=(n, n_shards))
+        counts = (A @ onehot).toarray()        # links of every agent to every shard
+        own = counts[np.arange(n), member]
+        moved = np.zeros(n, dtype=bool)      # an agent moves at most once per pass
+        for a in range(n_shards):
+            for b in range(a + 1, n_shards):
+                ia, ib = np.flatnonzero((best == a) & ~moved), np.flatnonzero((best == b) & ~moved)
+                ga, gb = counts[ia, b] - own[ia], counts[ib, a] - own[ib]
+                sa, sb = np.argsort(-ga, kind="stable"), np.argsort(-gb, kind="stable")
+                m = min(ia.size, ib.size)
+                # -2: the two agents of a swap may be linked to each other
+                k = int(np.count_nonzero(ga[sa[:m]] + gb[sb[:m]] - 2 > 0))
+                member[ia[sa[:k]]], member[ib[sb[:k]]] = b, a
+                moved[ia[sa[:k]]] = moved[ib[sb[:k]]] = True
+        cut = _cut_links(A, member)
+        if cut >= best_cut:
+            break
+        best, best_cut = member, cut
+    return best
+
+
+def partition(W: sp.csr_matrix, tribes: np.ndarray, n_shards: int, passes: int = 10, imbalance: float = 0.05):
+    """
+    Agent order and shard bounds. With pymetis installed, METIS partitions
+    the multiplex links into n_shards balanced parts. Otherwise the shards
+    start as tribe blocks (the offline layer links mostly within tribes; see
+    _tribe_blocks), refined by Kernighan-Lin swaps (_refine). Inside a shard
+    agents are in (tribe, reverse Cuthill-McKee) order, so neighbours end up
+    close together. Returns (order, bounds): shard k holds agents
+    order[bounds[k]:bounds[k + 1]].
+    """
+    n = W.shape[0]
+    tribes = np.asarray(tribes)
+    A = _links(W)
+    rank = np.empty(n, dtype=np.int64)
+    rank[reverse_cuthill_mckee(A, symmetric_mode=True)] = np.arange(n)
+    if n_shards <= 1:
+        member = np.zeros(n, dtype=np.int64)
+    elif pymetis is not None:
+        member = np.asarray(pymetis.part_graph(n_shards, xadj=A.indptr, adjncy=A.indices)[1], dtype=np.int64)
+    else:
+        member = _refine(A, _tribe_blocks(tribes, rank, n_shards, imbalance), n_shards, passes)
+    order = np.lexsort((rank, tribes, member))
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(member, minlength=n_shards))]).astype(np.int64)
+    return order, bounds
+
+
+def cut_fraction(W: sp.csr_matrix, bounds) -> float:
+    """Share of the links (nonzeros of W, in shard order) between agents of different shards."""
+    shard = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+    rows = np.repeat(np.arange(W.shape[0]), np.diff(W.indptr))
+    return float(np.mean(shard[rows] != shard[W.indices])) if W.nnz else 0.0
+
+
+def partition_report(Wp: sp.csr_matrix, bounds, halos) -> dict:
+    """
+    Size of a partition's exchange (Wp in shard order, halos: per-shard halo
+    agents): shard sizes, halo sizes, links cut and their share of all links.
+    """
+    A = _links(Wp)
+    shard = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+    cut = _cut_links(A, shard)
+    return {"sizes": np.diff(bounds).tolist(), "halo": [int(h.size) for h in halos],
+            "cut_links": cut, "links": A.nnz // 2, "cut_fraction": cut / max(1, A.nnz // 2)}
+
+
+# ----------------------------
+# Shared memory
+# ----------------------------
+
+def _attach(name, shape, dtype):
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _shard_worker(k, shard, blocks, barrier, scenario, steps, params, policy, kernel):
+    """
+    Process of shard k. Per tick: reduce the global state counts for the tax
+    signal, step the shard's engine, then (after everyone has read the old
+    states) publish its new states and counts; after a second barrier, read
+    the halo's new states.
+    """
+    attached = []
+    try:
+        attached, views = zip(*(_attach(*blocks[key]) for key in ("states", "counts", "metrics")))
+        states, counts, metrics = views
+        lo, hi, halo, signal, seed, draws = shard
+        n_total = states.size
+        schedule = schedule_for(scenario, params, steps, policy)
+        engine = VectorizedEngine(hi - lo, scenario, signal, rng=np.random.default_rng(seed), params=params,
+                                  draws=draws, kernel=kernel, policy=schedule)
+        states[lo:hi] = engine.state
+        counts[k] = metrics[0, k, :4] = engine.state_counts
+        barrier.wait()
+        signal.halo = states[halo].astype(float)
+        engine.neighbor_signal.reset(engine.state)
+
+        for t in range(steps):
+            # global adoption share for the tax: reduction over the shards' counts
+            tax_scale = schedule.tax[t]
+            tax = tax_scale * params.tax_signal((n_total - counts[:, 0].sum()) / n_total) if tax_scale else 0.0
+            before = engine.state.copy()
+            events = engine.step(t, tax)
+            barrier.wait()   # all shards have read the previous states and counts
+            changed = np.flatnonzero(engine.state != before)
+            states[lo + changed] = engine.state[changed]
+            counts[k] = metrics[t + 1, k, :4] = engine.state_counts
+            metrics[t + 1, k, 4] = events
+            barrier.wait()   # new states visible: exchange the boundary agents
+            signal.update_halo(states[halo])
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        for shm in attached:
+            shm.close()
+
+
+# ----------------------------
+# Runs
+# ----------------------------
+
+def _shard_specs(Wp, signal, order, bounds, seeds, draws, kernel):
+    """Per-shard (lo, hi, halo, signal, seed, draws); Wp: the combined weight matrix in shard order."""
+    layers = [sp.csr_matrix(A[order][:, order]) for A in signal.layers]
+    specs = []
+    for k in range(len(bounds) - 1):
+        lo, hi = int(bounds[k]), int(bounds[k + 1])
+        cols = np.unique(Wp.indices[Wp.indptr[lo]:Wp.indptr[hi]])
+        halo = cols[(cols < lo) | (cols >= hi)]
+        sub = draws.subset(order[lo:hi]) if draws is not None else None
+        specs.append((lo, hi, halo, HaloSignal(layers, signal.weights, lo, hi, halo, kernel=kernel), seeds[k], sub))
+    return specs
+
+
+def run_sharded_once(scenario, steps, r=0, seed0=123, base_params=None, n_shards=None, params=None, crn=False):
+    """
+    One run of a single population split over n_shards worker processes
+    (default: one per CPU). The network is built here (block generator) and
+    partitioned (see partition); each shard steps its agents with a
+    VectorizedEngine and exchanges only its boundary agents' states through
+    shared memory. Returns the run's model-vars frame (runner layout).
+
+    Without crn the network and every shard draw from their own streams
+    (SeedSequence(seed0, spawn_key=(r, 0)) and children of (r, 1)), so the run matches the single-process model in
+    distribution, not draw by draw; with crn the agents get their common
+    random numbers (crn.CommonDraws, same network) and the run follows the
+    single-process crn run.
+    """
+    base_params = base_params or {}
+    params = DEFAULT_PARAMS if params is None else params
+    n = base_params["num_agents"]
+    n_shards = n_shards or os.cpu_count() or 1
+    policy = base_params.get("policy")
+    draws = CommonDraws(n, steps, seed0, r, params) if crn else None
+    net_rng = draws.network_rng() if crn else np.random.default_rng(np.random.SeedSequence(seed0, spawn_key=(r, 0)))
+    offline, online, tribes = generate_multiplex(n, method=base_params.get("network", "block"), as_edges=True,
+                                                 reference_size=base_params.get("reference_size"), rng=net_rng,
+                                                 params=params)
+    signal = NeighborSignal(offline, online, n, params.offline_weight, params.online_weight)
+    W = signal.W
+    order, bounds = partition(W, tribes, n_shards)
+    Wp = sp.csr_matrix(W[order][:, order])   # permuted once, for the halos and the cut
+    del W
+    seeds = np.random.SeedSequence(seed0, spawn_key=(r, 1)).spawn(n_shards)
+    kernel = base_params.get("kernel", "auto")
+    specs = _shard_specs(Wp, signal, order, bounds, seeds, draws, kernel)
+    if n_shards > 1:
+        rep = partition_report(Wp, bounds, [s[2] for s in specs])
+        print(f"[sharded] {n} agents, {n_shards} shards (sizes {rep['sizes']}, halos {rep['halo']}, "
+              f"{sum(rep['halo'])} halo agents in all), {rep['cut_links']}/{rep['links']} links cut "
+              f"({rep['cut_fraction']:.1%}; partition: {'METIS' if pymetis is not None else 'tribe blocks + KL'})")
+
+    layout = {"states": ((n,), np.int8), "counts": ((n_shards, 4), np.int64),
+              "metrics": ((steps + 1, n_shards, 5), np.int64)}
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_shards)
+    shms = {}
+    try:
+        for key, (shape, dtype) in layout.items():
+            shms[key] = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+        blocks = {key: (shms[key].name, *layout[key]) for key in layout}
+        procs = [ctx.Process(target=_shard_worker, args=(k, specs[k], blocks, barrier, scenario, steps, params,
+                                                        policy, kernel))
+                 for k in range(n_shards)]
+        for proc in procs:
+            proc.start()
+        # a shard that dies without reaching its except clause would leave the others waiting
+        while any(proc.exitcode is None for proc in procs):
+            next(proc for proc in procs if proc.exitcode is None).join(0.5)
+            if any(proc.exitcode not in (None, 0) for proc in procs):
+                barrier.abort()
+        failed = [proc.exitcode for proc in procs if proc.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"{len(failed)} shard worker(s) failed (exit codes {failed})")
+        metrics = np.ndarray(layout["metrics"][0], dtype=np.int64, buffer=shms["metrics"].buf).copy()
+    finally:
+        for shm in shms.values():
+            shm.close()
+            shm.unlink()
+    return _frame(metrics, n, params, schedule_for(scenario, params, steps, policy), r)
+
+
+def _frame(metrics, n, params, schedule, r) -> pd.DataFrame:
+    """Model-vars frame of a sharded run from the per-shard counts/events of every tick (row 0: initial)."""
+    counts = metrics[:, :, :4].sum(axis=1)            # (steps + 1, 4)
+    steps = counts.shape[0] - 1
+    avg = counts @ np.asarray(params.state_scores) / n
+    # tax of tick t: from the counts before it, as each shard computed it
+    tax = np.array([schedule.tax[t] * params.tax_signal((n - counts[t, 0]) / n) if schedule.tax[t] else 0.0
+                    for t in range(steps)])
+    out = {
+        "AverageSustainability": avg[1:],
+        **{f"ShareState{k}": counts[1:, k] / n for k in range(4)},
+        "GiniScore": gini_from_counts(counts[1:], params.state_scores),
+        "AdoptionVelocity": np.diff(avg),
+        "PeerInfluenceEvents": metrics[1:, :, 4].sum(axis=1),
+        "TaxSignal": tax,
+    }
+    mdf = pd.DataFrame({"Step": np.arange(steps)})
+    for c in MODEL_COLUMNS:
+        mdf[c] = out[c]
+    mdf["Run"] = r
+    return mdf
+
+
+def run_sharded(scenario, steps, n_runs=1, seed0=123, base_params=None, n_shards=None, params=None, crn=False):
+    """
+    Monte Carlo runs of one very large population, each run sharded over
+    n_shards processes (see run_sharded_once). base_params: num_agents and
+    optionally network, reference_size, kernel and policy (the shards always
+    use the vectorized engine). Returns (all_runs, agg) like run_monte_carlo.
+    """
+    frames = []
+    for r in range(n_runs):
+        print(f"{scenario}: run {r}/{n_runs} ({n_shards or os.cpu_count()} shards)")
+        frames.append(run_sharded_once(scenario, steps, r, seed0, base_params, n_shards, params, crn))
+    all_runs = pd.concat(frames, ignore_index=True)
+    return all_runs, summarize_runs(all_runs, n_runs)
@@ -0,0 +1,123 @@
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pandas as pd
+
+# Integer / boolean model columns (stored as float64 in the block, exact below 2**53)
+INT_COLUMNS = ("PeerInfluenceEvents",)
+BOOL_COLUMNS = ("Extrapolated",)
+
+# summary column -> (model column, reduction over runs), as in runner.summarize_runs
+SUMMARY = {
+    "Avg": ("AverageSustainability", "mean"),
+    "Std": ("AverageSustainability", "std"),
+    "Share0": ("ShareState0", "mean"),
+    "Share1": ("ShareState1", "mean"),
+    "Share2": ("ShareState2", "mean"),
+    "Share3": ("ShareState3", "mean"),
+    "Gini": ("GiniScore", "mean"),
+    "Velocity": ("AdoptionVelocity", "mean"),
+    "PeerEvents": ("PeerInfluenceEvents", "mean"),
+    "TaxSignal": ("TaxSignal", "mean"),
+}
+
+# segments attached by this (worker) process, by name: opened once per pool, not per job
+_attached = {}
+
+
+def _release(shm: SharedMemory, owner: bool) -> None:
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    try:
+        shm.close()
+    except BufferError:   # a view is still alive: the mapping goes when it does
+        pass
+
+
+class ResultBlock:
+    """
+    Per-step model metrics of a batch of runs in one shared-memory segment:
+    values[slot, step, column] (float64), one slot per pool job.
+
+    The parent creates the block; pickling it only sends its handle, and pool
+    workers attach to the segment and write a finished run's DataCollector
+    columns straight into its slot (write), so no DataFrame crosses the
+    process boundary. The parent then summarizes directly on the shared
+    array (summarize_block) and builds the all-runs frame with one copy
+    (all_runs). The creator unlinks the segment on close() / leaving a with
+    block, or at the latest when the block is garbage collected.
+    """
+
+    def __init__(self, n_slots: int, steps: int, columns, name=None):
+        self.n_slots, self.steps, self.columns = n_slots, steps, tuple(columns)
+        self.owner = name is None
+        if self.owner:
+            size = max(1, n_slots * steps * len(self.columns) * 8)
+            self._shm = SharedMemory(create=True, size=size)
+            self._finalizer = weakref.finalize(self, _release, self._shm, True)
+        else:
+            if name not in _attached:
+                _attached[name] = SharedMemory(name=name)
+            self._shm = _attached[name]
+        self.values = np.ndarray((n_slots, steps, len(self.columns)), dtype=np.float64, buffer=self._shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __reduce__(self):
+        return ResultBlock, (self.n_slots, self.steps, self.columns, self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.values = None
+        if self.owner:
+            self._finalizer()
+
+    def write(self, slot: int, model_vars: dict) -> None:
+        """Store one run: model_vars maps column -> per-step values (DataCollector.model_vars)."""
+        for j, column in enumerate(self.columns):
+            self.values[slot, :, j] = model_vars[column]
+
+    def all_runs(self, slots, runs) -> pd.DataFrame:
+        """The runs in `slots` as one all-runs frame (runner layout: Step, model columns, Run), copied out."""
+        block = self.values[slots]
+        n, steps = block.shape[0], self.steps
+        data = {"Step": np.tile(np.arange(steps), n)}
+        flat = block.reshape(n * steps, len(self.columns))
+        for j, column in enumerate(self.columns):
+            values = flat[:, j].copy()
+            if column in INT_COLUMNS:
+                values = values.astype(np.int64)
+            elif column in BOOL_COLUMNS:
+                values = values.astype(bool)
+            data[column] = values
+        data["Run"] = np.repeat(np.asarray(runs, dtype=np.int64), steps)
+        return pd.DataFrame(data)
+
+
+def summarize_block(values: np.ndarray, columns) -> pd.DataFrame:
+    """
+    runner.summarize_runs computed on a (runs, steps, columns) array, e.g. a
+    ResultBlock slice, with reductions over the runs axis (no frame built).
+    """
+    index = {column: j for j, column in enumerate(columns)}
+    n_runs = values.shape[0]
+    out = {"Step": np.arange(values.shape[1])}
+    for name, (column, how) in SUMMARY.items():
+        v = values[:, :, index[column]]
+        if how == "mean":
+            out[name] = v.mean(axis=0)
+        else:
+            out[name] = v.std(axis=0, ddof=1) if n_runs > 1 else np.full(v.shape[1], np.nan)
+    agg = pd.DataFrame(out)
+    agg["CI95"] = 1.96 * agg["Std"] / np.sqrt(n_runs)
+    return agg
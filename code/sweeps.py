@@ -1,11 +1,23 @@
+import hashlib
+import itertools
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
-# We tweak globals at runtime, then restore:
-import functions_and_parameters as fp
-import agent as agent_module
+# Each sweep point is an explicit ModelParams copy; runs go through the runner
+from functions_and_parameters import DEFAULT_PARAMS
+from aggregation import StreamingSummary, EndpointStats
+import runner
+import plots
+from render import FigureSpec, render
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Source files whose contents decide what a cached run contains
+CODE_FILES = ("functions_and_parameters.py", "agent.py", "model.py", "neighbors.py", "vectorized.py", "runner.py",
+              "crn.py", "policy.py")
 
 
 def _ensure_dir(d: str):
@@ -23,284 +35,319 @@ def _final_row(df: pd.DataFrame) -> pd.Series:
     return df.loc[last_idx]
 
 
-def sweep_backlash(run_monte_carlo, values, steps, n_runs=20, target=0.80,
-                   data_dir=".", plot_dir=None, timestamp=""):
+# ----------------------------
+# Result cache
+# ----------------------------
+
+def code_version() -> str:
+    """Hash of the simulation sources; editing the model invalidates cached runs."""
+    h = hashlib.sha1()
+    for name in CODE_FILES:
+        with open(os.path.join(_HERE, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def job_key(scenario, steps, seed0, run, base_params, params, version, crn=False) -> str:
+    """Content address of one (sweep point, run) job."""
+    payload = {
+        "scenario": scenario, "steps": steps, "seed0": seed0, "run": run,
+        # where networks are cached and whether runs are timed does not change what a run produces
+        "model": {k: v for k, v in base_params.items() if k not in ("network_cache", "telemetry")},
+        "params": params.digest(), "code": version,
+    }
+    if crn:
+        payload["crn"] = True
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """One .npz per job under root/<key[:2]>/<key>.npz, written atomically."""
+
+    def __init__(self, root: str):
+        self.root = root
+        _ensure_dir(root)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.npz")
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def save(self, key: str, df: pd.DataFrame) -> None:
+        path = self.path(key)
+        _ensure_dir(os.path.dirname(path))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **{c: df[c].to_numpy() for c in df.columns})
+        os.replace(tmp, path)  # an interrupted write never leaves a half file behind
+
+    def load(self, key: str) -> pd.DataFrame:
+        with np.load(self.path(key)) as z:
+            return pd.DataFrame({c: z[c] for c in z.files})
+
+
+def _sweep_job(job):
     """
-    Run 'combo' for several BACKLASH_SCALE values.
-    Saves overlay + final-outcome plots to plot_dir and per-value CSVs to data_dir.
-    Returns a dict[value] -> summary dataframe.
+    Pool worker: run one replicate (forked: run r of several points, see
+    runner.run_branches) and store it in the cache (if any) -> [(key, frame or None)].
     """
-    _ensure_dir(data_dir)
-    pdir = plot_dir or data_dir
-    _ensure_dir(pdir)
+    keys, cache_root, run_job, fork = job
+    frames = runner._run_branches(run_job) if fork else [runner._run_one(run_job)]
+    if cache_root is None:
+        return list(zip(keys, frames))
+    cache = ResultCache(cache_root)
+    for key, mdf in zip(keys, frames):
+        cache.save(key, mdf)
+    return [(key, None) for key in keys]
+
+
+# ----------------------------
+# Sweep engine
+# ----------------------------
 
-    # Save originals so we can restore
-    orig_fp = getattr(fp, "BACKLASH_SCALE", None)
-    orig_ag = getattr(agent_module, "BACKLASH_SCALE", None)
+def grid_points(grid: dict):
+    """Cartesian product of {param_name: values} as a list of {name: value} dicts."""
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def _run_jobs(jobs: list, workers, progress=None) -> dict:
+    """
+    Run sweep jobs on a pool (workers=1: in-process); returns {key: frame or None if cached}.
+    progress: a telemetry.Progress updated after each job.
+    """
+    frames = {}
+    if workers == 1:
+        for job in jobs:
+            frames.update(_sweep_job(job))
+            if progress is not None:
+                progress.update()
+        return frames
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_sweep_job, job) for job in jobs]
+        for i, fut in enumerate(as_completed(futures)):
+            frames.update(fut.result())
+            if progress is not None:
+                progress.update()
+            if i % 50 == 0:
+                print(f"[sweep] {i + 1}/{len(jobs)} jobs done")
+    return frames
+
+
+def run_sweep(grid: dict, steps, n_runs=20, scenario="combo", seed0=123, base_params=None,
+              params=DEFAULT_PARAMS, workers=None, cache_dir=None, crn=False,
+              tol=None, batch_runs=10, max_runs=None, target=0.80, fork=False):
+    """
+    Run `scenario` at every point of an N-dimensional grid of ModelParams values,
+    e.g. {"backlash_scale": [0.2, 0.3], "tax_max": [0.26, 0.30]}.
+
+    (point, run) jobs are scheduled across a process pool (workers=1: in-process).
+    With cache_dir, each job is stored under a hash of its parameters, seed,
+    model settings and code version: identical configurations shared by several
+    sweeps are computed once, and re-running an interrupted sweep only runs the
+    missing jobs. Runs use runner.run_rng(seed0, r), so cached and fresh jobs mix;
+    crn=True gives run r the same common random numbers at every point.
+
+    With tol (e.g. aggregation.DEFAULT_TOLERANCE), n_runs is the starting count:
+    points whose endpoint CI95 half-widths (see runner.run_adaptive) are still
+    above tol get batch_runs more runs per round, up to max_runs, and each
+    summary gets a Runs column with the number of runs it used.
+
+    fork=True runs each run index once for all points up to where they diverge
+    and forks the points from a checkpoint there (runner.run_branches): points
+    that only differ in campaign settings share their first CAMPAIGN_START
+    ticks. Results are identical, so cached runs stay valid.
+    Returns dict[tuple of grid values] -> summary dataframe.
+    """
+    base_params = dict(base_params or {})
+    if base_params.get("trajectories") is not None:
+        raise ValueError("agent trajectories are recorded by runner.run_monte_carlo, not by sweeps")
+    version = code_version()
+    cache = ResultCache(cache_dir) if cache_dir else None
+    workers = workers or os.cpu_count() or 1
+    max_runs = n_runs if tol is None else max(n_runs, max_runs or 10 * n_runs)
+
+    points = {tuple(point.values()): params.replace(**point) for point in grid_points(grid)}
+    summaries = {p: StreamingSummary(steps) for p in points}
+    stats = {p: EndpointStats(target) for p in points}
+    done = dict.fromkeys(points, 0)
+    active, upto = list(points), n_runs
+    while active:
+        point_keys, pending = {}, {}
+        for point in active:
+            keys = []
+            for r in range(done[point], upto):
+                key = job_key(scenario, steps, seed0, r, base_params, points[point], version, crn)
+                keys.append(key)
+                if key not in pending and not (cache and cache.has(key)):
+                    pending[key] = (r, points[point])
+            point_keys[point] = keys
+        if fork:
+            by_run = {}
+            for key, (r, p) in pending.items():
+                by_run.setdefault(r, []).append((key, p))
+            jobs = [([key for key, _ in items], cache_dir,
+                     ([(scenario, p) for _, p in items], steps, r, seed0, base_params, crn, False), True)
+                    for r, items in by_run.items()]
+        else:
+            jobs = [([key], cache_dir, (scenario, steps, r, seed0, base_params, p, crn), False)
+                    for key, (r, p) in pending.items()]
+
+        n_total = sum(len(k) for k in point_keys.values())
+        print(f"[sweep] {len(point_keys)} points x runs {done[active[0]]}-{upto - 1}: {len(pending)} to run, "
+              f"{n_total - len(pending)} cached or shared")
+        telemetry = base_params.get("telemetry")
+        progress = None
+        if telemetry is not None:
+            # a forked job runs several points
+            progress = telemetry.progress(f"sweep {scenario} runs {done[active[0]]}-{upto - 1}", len(jobs),
+                                          base_params.get("num_agents", 0) * steps * len(pending) // max(len(jobs), 1))
+        frames = _run_jobs(jobs, workers, progress)
+
+        for point, keys in point_keys.items():
+            # fold runs in one at a time; only one run per point is in memory when cached
+            for k in keys:
+                mdf = frames[k] if frames.get(k) is not None else cache.load(k)
+                summaries[point].update(mdf)
+                stats[point].update(mdf)
+            done[point] = upto
+        if tol is None:
+            break
+        active = [p for p in active if not stats[p].converged(tol) and done[p] < max_runs]
+        upto = min(upto + batch_runs, max_runs)
 
     results = {}
-    for bl in values:
-        print(f"[sweep_backlash] BACKLASH_SCALE={bl}")
-        if orig_fp is not None: setattr(fp, "BACKLASH_SCALE", bl)
-        if orig_ag is not None: setattr(agent_module, "BACKLASH_SCALE", bl)
-
-        _, summary = run_monte_carlo("combo", steps=steps, n_runs=n_runs)
-        results[bl] = summary
-        summary.to_csv(os.path.join(data_dir, f"combo_backlash_{bl}_summary_{timestamp}.csv"), index=False)
-
-    # Restore
-    if orig_fp is not None: setattr(fp, "BACKLASH_SCALE", orig_fp)
-    if orig_ag is not None: setattr(agent_module, "BACKLASH_SCALE", orig_ag)
-
-    # Overlay trajectories
-    plt.figure(figsize=(10, 6))
-    for bl, df in results.items():
-        plt.plot(df["Step"], df["Avg"], label=f"BL={bl}")
-    plt.title("Combo: Sensitivity to BACKLASH_SCALE")
-    plt.xlabel("Step"); plt.ylabel("Average Sustainability Score")
-    plt.legend(title="Backlash scale"); plt.tight_layout()
-    p_overlay = os.path.join(pdir, f"combo_backlash_overlay_{timestamp}.png")
-    plt.savefig(p_overlay); plt.close()
-
-    # Final outcomes & time-to-target (+ CI on FinalAvg)
+    for point, summary in summaries.items():
+        results[point] = summary.summary()
+        if tol is not None:
+            results[point]["Runs"] = summary.n
+            print(f"[sweep] {point}: {summary.n} runs "
+                  f"({'converged' if stats[point].converged(tol) else 'run budget used'})")
+    return results
+
+
+# ----------------------------
+# One-parameter sweeps + plots
+# ----------------------------
+
+# name -> (ModelParams field, finals column, legend prefix, legend title, axis label, overlay title)
+SWEEP_SPECS = {
+    "backlash": ("backlash_scale", "Backlash", "BL", "Backlash scale", "BACKLASH_SCALE",
+                 "Combo: Sensitivity to BACKLASH_SCALE"),
+    "halflife": ("campaign_half_life", "HalfLife", "HL", "Half-life", "Campaign Half-life",
+                 "Combo: Sensitivity to Campaign Half-life"),
+    "taxmax": ("tax_max", "TAX_MAX", "TAX_MAX", "TAX_MAX", "TAX_MAX",
+               "Combo: Sensitivity to TAX_MAX (Price Pressure Ceiling)"),
+}
+
+
+def sweep_finals(results: dict, column: str, n_runs: int, target=0.80) -> pd.DataFrame:
+    """Final outcomes & time-to-target (+ CI on FinalAvg) for each swept value."""
     rows = []
-    for bl, df in results.items():
+    for value, df in results.items():
         row = _final_row(df)
         final_avg = float(row["Avg"])
         final_avg_std = float(row["Std"]) if "Std" in df.columns else float("nan")
         out = {
-            "Backlash": bl,
+            column: value,
             "FinalAvg": final_avg,
             "FinalAvgStd": final_avg_std,
             "FinalState3": float(row["Share3"]),
             "T_to_Target": _first_crossing(df, "Avg", target),
+            # adaptive sweeps record how many runs each value used
+            "Runs": int(row["Runs"]) if "Runs" in df.columns else n_runs,
         }
         if "Share3Std" in df.columns:
             out["FinalS3Std"] = float(row["Share3Std"])
         rows.append(out)
-    finals = pd.DataFrame(rows).sort_values("Backlash")
-    finals["FinalAvgCI95"] = 1.96 * finals["FinalAvgStd"] / np.sqrt(n_runs)
+    finals = pd.DataFrame(rows).sort_values(column)
+    finals["FinalAvgCI95"] = 1.96 * finals["FinalAvgStd"] / np.sqrt(finals["Runs"])
     if "FinalS3Std" in finals.columns:
-        finals["FinalS3CI95"] = 1.96 * finals["FinalS3Std"] / np.sqrt(n_runs)
-
-    # Final Avg with CI
-    plt.figure(figsize=(10, 6))
-    plt.errorbar(finals["Backlash"], finals["FinalAvg"],
-                 yerr=finals["FinalAvgCI95"], marker="o", capsize=3)
-    plt.title("Combo: Final Average vs BACKLASH_SCALE")
-    plt.xlabel("BACKLASH_SCALE"); plt.ylabel("Final Average Sustainability")
-    plt.tight_layout()
-    p_finalavg = os.path.join(pdir, f"combo_backlash_finalavg_{timestamp}.png")
-    plt.savefig(p_finalavg); plt.close()
-
-    # Final State3
-    plt.figure(figsize=(10, 6))
-    if "FinalS3CI95" in finals.columns:
-        plt.errorbar(finals["Backlash"], finals["FinalState3"],
-                     yerr=finals["FinalS3CI95"], marker="o", capsize=3)
-    else:
-        plt.plot(finals["Backlash"], finals["FinalState3"], marker="o")
-    plt.title("Combo: Final Share of State 3 vs BACKLASH_SCALE")
-    plt.xlabel("BACKLASH_SCALE"); plt.ylabel("Final Share in State 3")
-    plt.tight_layout()
-    p_finalstate3 = os.path.join(pdir, f"combo_backlash_finalstate3_{timestamp}.png")
-    plt.savefig(p_finalstate3); plt.close()
-
-    # Time to target
-    plt.figure(figsize=(10, 6))
-    plt.plot(finals["Backlash"], finals["T_to_Target"], marker="o")
-    plt.title(f"Combo: Time to Avg ≥ {target} vs BACKLASH_SCALE")
-    plt.xlabel("BACKLASH_SCALE"); plt.ylabel("Steps to target (NaN = not reached)")
-    plt.tight_layout()
-    p_ttt = os.path.join(pdir, f"combo_backlash_timetotarget_{timestamp}.png")
-    plt.savefig(p_ttt); plt.close()
-
-    print("Saved sweep plots:", p_overlay, p_finalavg, p_finalstate3, p_ttt)
-    return results
-
-
-def sweep_halflife(run_monte_carlo, values, steps, n_runs=20, target=0.80,
-                   data_dir=".", plot_dir=None, timestamp=""):
+        finals["FinalS3CI95"] = 1.96 * finals["FinalS3Std"] / np.sqrt(finals["Runs"])
+    return finals
+
+
+def plot_sweep(name: str, results: dict, n_runs: int, target=0.80, plot_dir=".", timestamp="", workers=None):
+    """Overlay, final-average, final-state-3 and time-to-target plots for one sweep."""
+    _, column, short, legend, label, overlay_title = SWEEP_SPECS[name]
+    finals = sweep_finals(results, column, n_runs, target)
+    path = lambda kind: os.path.join(plot_dir, f"combo_{name}_{kind}_{timestamp}.png")
+    s3_err = "FinalS3CI95" if "FinalS3CI95" in finals.columns else None
+    specs = [
+        FigureSpec(path("overlay"), plots.draw_lines, {value: df[["Step", "Avg"]] for value, df in results.items()},
+                   {"column": "Avg", "title": overlay_title, "ylabel": "Average Sustainability Score",
+                    "legend": legend, "label": f"{short}={{}}"}),
+        FigureSpec(path("finalavg"), plots.draw_points, finals[[column, "FinalAvg", "FinalAvgCI95"]],
+                   {"x": column, "y": "FinalAvg", "yerr": "FinalAvgCI95", "title": f"Combo: Final Average vs {label}",
+                    "xlabel": label, "ylabel": "Final Average Sustainability"}),
+        FigureSpec(path("finalstate3"), plots.draw_points, finals[[column, "FinalState3"] + ([s3_err] if s3_err else [])],
+                   {"x": column, "y": "FinalState3", "yerr": s3_err, "title": f"Combo: Final Share of State 3 vs {label}",
+                    "xlabel": label, "ylabel": "Final Share in State 3"}),
+        FigureSpec(path("timetotarget"), plots.draw_points, finals[[column, "T_to_Target"]],
+                   {"x": column, "y": "T_to_Target", "title": f"Combo: Time to Avg ≥ {target} vs {label}",
+                    "xlabel": label, "ylabel": "Steps to target (NaN = not reached)"}),
+    ]
+    p_overlay, p_finalavg, p_finalstate3, p_ttt = render(specs, workers)
+    print(f"Saved {name} sweep plots:", p_overlay, p_finalavg, p_finalstate3, p_ttt)
+    return p_overlay, p_finalavg, p_finalstate3, p_ttt
+
+
+def sweep_parameter(name, values, steps, n_runs=20, target=0.80, data_dir=".", plot_dir=None,
+                    timestamp="", params=DEFAULT_PARAMS, writer=None, **engine_kwargs):
     """
-    Run 'combo' for several CAMPAIGN_HALF_LIFE values.
-    Saves overlay + final-outcome plots to plot_dir and per-value CSVs to data_dir.
+    Run 'combo' for several values of one SWEEP_SPECS parameter (on top of `params`).
+    Saves overlay + final-outcome plots to plot_dir and per-value CSVs to data_dir
+    (or, with a results_io.ResultsWriter, per-value summary partitions).
+    engine_kwargs (seed0, base_params, workers, cache_dir, crn, tol, batch_runs,
+    max_runs, fork) go to run_sweep; with tol the run count varies per value.
     Returns a dict[value] -> summary dataframe.
     """
     _ensure_dir(data_dir)
     pdir = plot_dir or data_dir
-    _ensure_dir(pdir)
+    field = SWEEP_SPECS[name][0]
+    print(f"[sweep_{name}] {field.upper()}={list(values)}")
+
+    points = run_sweep({field: list(values)}, steps, n_runs=n_runs, params=params, target=target, **engine_kwargs)
+    results = {point[0]: summary for point, summary in points.items()}
+    for value, summary in results.items():
+        if writer is not None:
+            writer.write_summary(summary, "combo", sweep=name, value=value)
+        else:
+            summary.to_csv(os.path.join(data_dir, f"combo_{name}_{value}_summary_{timestamp}.csv"), index=False)
+
+    plot_sweep(name, results, n_runs, target, pdir, timestamp)
+    return results
 
-    orig_fp = getattr(fp, "CAMPAIGN_HALF_LIFE", None)
-    orig_ag = getattr(agent_module, "CAMPAIGN_HALF_LIFE", None)
 
-    results = {}
-    for hl in values:
-        print(f"[sweep_halflife] CAMPAIGN_HALF_LIFE={hl}")
-        if orig_fp is not None: setattr(fp, "CAMPAIGN_HALF_LIFE", hl)
-        if orig_ag is not None: setattr(agent_module, "CAMPAIGN_HALF_LIFE", hl)
-
-        _, summary = run_monte_carlo("combo", steps=steps, n_runs=n_runs)
-        results[hl] = summary
-        summary.to_csv(os.path.join(data_dir, f"combo_halflife_{hl}_summary_{timestamp}.csv"), index=False)
-
-    # Restore
-    if orig_fp is not None: setattr(fp, "CAMPAIGN_HALF_LIFE", orig_fp)
-    if orig_ag is not None: setattr(agent_module, "CAMPAIGN_HALF_LIFE", orig_ag)
-
-    # Overlay trajectories
-    plt.figure(figsize=(10, 6))
-    for hl, df in results.items():
-        plt.plot(df["Step"], df["Avg"], label=f"HL={hl}")
-    plt.title("Combo: Sensitivity to Campaign Half-life")
-    plt.xlabel("Step"); plt.ylabel("Average Sustainability Score")
-    plt.legend(title="Half-life"); plt.tight_layout()
-    p_overlay = os.path.join(pdir, f"combo_halflife_overlay_{timestamp}.png")
-    plt.savefig(p_overlay); plt.close()
-
-    # Final outcomes & time-to-target (+ CI on FinalAvg)
-    rows = []
-    for hl, df in results.items():
-        row = _final_row(df)
-        final_avg = float(row["Avg"])
-        final_avg_std = float(row["Std"]) if "Std" in df.columns else float("nan")
-        out = {
-            "HalfLife": hl,
-            "FinalAvg": final_avg,
-            "FinalAvgStd": final_avg_std,
-            "FinalState3": float(row["Share3"]),
-            "T_to_Target": _first_crossing(df, "Avg", target),
-        }
-        if "Share3Std" in df.columns:
-            out["FinalS3Std"] = float(row["Share3Std"])
-        rows.append(out)
-    finals = pd.DataFrame(rows).sort_values("HalfLife")
-    finals["FinalAvgCI95"] = 1.96 * finals["FinalAvgStd"] / np.sqrt(n_runs)
-    if "FinalS3Std" in finals.columns:
-        finals["FinalS3CI95"] = 1.96 * finals["FinalS3Std"] / np.sqrt(n_runs)
-
-    # Final Avg with CI
-    plt.figure(figsize=(10, 6))
-    plt.errorbar(finals["HalfLife"], finals["FinalAvg"],
-                 yerr=finals["FinalAvgCI95"], marker="o", capsize=3)
-    plt.title("Combo: Final Average vs Campaign Half-life")
-    plt.xlabel("Campaign Half-life"); plt.ylabel("Final Average Sustainability")
-    plt.tight_layout()
-    p_finalavg = os.path.join(pdir, f"combo_halflife_finalavg_{timestamp}.png")
-    plt.savefig(p_finalavg); plt.close()
-
-    # Final State3
-    plt.figure(figsize=(10, 6))
-    if "FinalS3CI95" in finals.columns:
-        plt.errorbar(finals["HalfLife"], finals["FinalState3"],
-                     yerr=finals["FinalS3CI95"], marker="o", capsize=3)
-    else:
-        plt.plot(finals["HalfLife"], finals["FinalState3"], marker="o")
-    plt.title("Combo: Final Share of State 3 vs Campaign Half-life")
-    plt.xlabel("Campaign Half-life"); plt.ylabel("Final Share in State 3")
-    plt.tight_layout()
-    p_finalstate3 = os.path.join(pdir, f"combo_halflife_finalstate3_{timestamp}.png")
-    plt.savefig(p_finalstate3); plt.close()
-
-    # Time to target
-    plt.figure(figsize=(10, 6))
-    plt.plot(finals["HalfLife"], finals["T_to_Target"], marker="o")
-    plt.title(f"Combo: Time to Avg ≥ {target} vs Campaign Half-life")
-    plt.xlabel("Campaign Half-life"); plt.ylabel("Steps to target (NaN = not reached)")
-    plt.tight_layout()
-    p_ttt = os.path.join(pdir, f"combo_halflife_timetotarget_{timestamp}.png")
-    plt.savefig(p_ttt); plt.close()
-
-    print("Saved half-life sweep plots:", p_overlay, p_finalavg, p_finalstate3, p_ttt)
-    return results
+def sweep_backlash(run_monte_carlo, values, steps, n_runs=20, target=0.80, data_dir=".", plot_dir=None,
+                   timestamp="", params=DEFAULT_PARAMS, writer=None, **engine_kwargs):
+    """
+    Run 'combo' for several BACKLASH_SCALE values (see sweep_parameter).
+    run_monte_carlo is unused (kept for the original call signature): runs go
+    through run_sweep's cached (point, run) jobs.
+    """
+    return sweep_parameter("backlash", values, steps, n_runs, target, data_dir, plot_dir, timestamp,
+                           params, writer, **engine_kwargs)
 
 
-def sweep_taxmax(run_monte_carlo, values, steps, n_runs=20, target=0.80,
-                 data_dir=".", plot_dir=None, timestamp=""):
+def sweep_halflife(run_monte_carlo, values, steps, n_runs=20, target=0.80, data_dir=".", plot_dir=None,
+                   timestamp="", params=DEFAULT_PARAMS, writer=None, **engine_kwargs):
     """
-    Run 'combo' for several TAX_MAX values.
-    Saves overlay + final-outcome plots to plot_dir and per-value CSVs to data_dir.
-    Returns a dict[value] -> summary dataframe.
+    Run 'combo' for several CAMPAIGN_HALF_LIFE values (see sweep_parameter).
+    run_monte_carlo is unused (kept for the original call signature): runs go
+    through run_sweep's cached (point, run) jobs.
     """
-    _ensure_dir(data_dir)
-    pdir = plot_dir or data_dir
-    _ensure_dir(pdir)
+    return sweep_parameter("halflife", values, steps, n_runs, target, data_dir, plot_dir, timestamp,
+                           params, writer, **engine_kwargs)
 
-    orig_tax_max = getattr(fp, "TAX_MAX", None)
 
-    results = {}
-    for tx in values:
-        print(f"[sweep_taxmax] TAX_MAX={tx}")
-        if orig_tax_max is not None: setattr(fp, "TAX_MAX", tx)  # tax_signal() reads this at runtime
-
-        _, summary = run_monte_carlo("combo", steps=steps, n_runs=n_runs)
-        results[tx] = summary
-        summary.to_csv(os.path.join(data_dir, f"combo_taxmax_{tx}_summary_{timestamp}.csv"), index=False)
-
-    # Restore
-    if orig_tax_max is not None: setattr(fp, "TAX_MAX", orig_tax_max)
-
-    # Overlay trajectories
-    plt.figure(figsize=(10, 6))
-    for tx, df in results.items():
-        plt.plot(df["Step"], df["Avg"], label=f"TAX_MAX={tx}")
-    plt.title("Combo: Sensitivity to TAX_MAX (Price Pressure Ceiling)")
-    plt.xlabel("Step"); plt.ylabel("Average Sustainability Score")
-    plt.legend(title="TAX_MAX"); plt.tight_layout()
-    p_overlay = os.path.join(pdir, f"combo_taxmax_overlay_{timestamp}.png")
-    plt.savefig(p_overlay); plt.close()
-
-    # Final outcomes & time-to-target (+ CI on FinalAvg)
-    rows = []
-    for tx, df in results.items():
-        row = _final_row(df)
-        final_avg = float(row["Avg"])
-        final_avg_std = float(row["Std"]) if "Std" in df.columns else float("nan")
-        out = {
-            "TAX_MAX": tx,
-            "FinalAvg": final_avg,
-            "FinalAvgStd": final_avg_std,
-            "FinalState3": float(row["Share3"]),
-            "T_to_Target": _first_crossing(df, "Avg", target),
-        }
-        if "Share3Std" in df.columns:
-            out["FinalS3Std"] = float(row["Share3Std"])
-        rows.append(out)
-    finals = pd.DataFrame(rows).sort_values("TAX_MAX")
-    finals["FinalAvgCI95"] = 1.96 * finals["FinalAvgStd"] / np.sqrt(n_runs)
-    if "FinalS3Std" in finals.columns:
-        finals["FinalS3CI95"] = 1.96 * finals["FinalS3Std"] / np.sqrt(n_runs)
-
-    # Final Avg with CI
-    plt.figure(figsize=(10, 6))
-    plt.errorbar(finals["TAX_MAX"], finals["FinalAvg"],
-                 yerr=finals["FinalAvgCI95"], marker="o", capsize=3)
-    plt.title("Combo: Final Average vs TAX_MAX")
-    plt.xlabel("TAX_MAX"); plt.ylabel("Final Average Sustainability")
-    plt.tight_layout()
-    p_finalavg = os.path.join(pdir, f"combo_taxmax_finalavg_{timestamp}.png")
-    plt.savefig(p_finalavg); plt.close()
-
-    # Final State3
-    plt.figure(figsize=(10, 6))
-    if "FinalS3CI95" in finals.columns:
-        plt.errorbar(finals["TAX_MAX"], finals["FinalState3"],
-                     yerr=finals["FinalS3CI95"], marker="o", capsize=3)
-    else:
-        plt.plot(finals["TAX_MAX"], finals["FinalState3"], marker="o")
-    plt.title("Combo: Final Share of State 3 vs TAX_MAX")
-    plt.xlabel("TAX_MAX"); plt.ylabel("Final Share in State 3")
-    plt.tight_layout()
-    p_finalstate3 = os.path.join(pdir, f"combo_taxmax_finalstate3_{timestamp}.png")
-    plt.savefig(p_finalstate3); plt.close()
-
-    # Time to target
-    plt.figure(figsize=(10, 6))
-    plt.plot(finals["TAX_MAX"], finals["T_to_Target"], marker="o")
-    plt.title(f"Combo: Time to Avg ≥ {target} vs TAX_MAX")
-    plt.xlabel("TAX_MAX"); plt.ylabel("Steps to target (NaN = not reached)")
-    plt.tight_layout()
-    p_ttt = os.path.join(pdir, f"combo_taxmax_timetotarget_{timestamp}.png")
-    plt.savefig(p_ttt); plt.close()
-
-    print("Saved TAX_MAX sweep plots:", p_overlay, p_finalavg, p_finalstate3, p_ttt)
-    return results
\ No newline at end of file
+def sweep_taxmax(run_monte_carlo, values, steps, n_runs=20, target=0.80, data_dir=".", plot_dir=None,
+                 timestamp="", params=DEFAULT_PARAMS, writer=None, **engine_kwargs):
+    """
+    Run 'combo' for several TAX_MAX values (see sweep_parameter).
+    run_monte_carlo is unused (kept for the original call signature): runs go
+    through run_sweep's cached (point, run) jobs.
+    """
+    return sweep_parameter("taxmax", values, steps, n_runs, target, data_dir, plot_dir, timestamp,
+                           params, writer, **engine_kwargs)
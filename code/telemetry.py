@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Phases of one SustainableEatingModel.step (and of one tick of runner._run_batch)
+PHASES = ("tax", "snapshot", "advance", "velocity", "collect")
+
+
+class Telemetry:
+    """
+    Opt-in instrumentation of the model loop, streamed as JSON lines.
+
+    Pass one as base_params["telemetry"] (or SustainableEatingModel(telemetry=...)).
+    Each run then writes a "run" record: network build time and per-phase wall
+    time (plus net traced allocations and peak with trace_memory=True); every
+    > 0 also writes a "step" record every `every` ticks. run_monte_carlo,
+    run_adaptive and the sweeps write a "progress" record per finished run with
+    agent-steps/s and ETA.
+
+    Only the path and options are stored, so the object can be pickled to pool
+    workers; each record is appended with a single write to the same file
+    (path=None: stderr). Without telemetry the model only tests `timer is None`.
+    """
+
+    def __init__(self, path=None, trace_memory=False, every=0):
+        self.path = path
+        self.trace_memory = trace_memory
+        self.every = every
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def emit(self, event: str, **fields) -> None:
+        line = json.dumps({"event": event, "time": round(time.time(), 3), "pid": os.getpid(), **fields}) + "\n"
+        if self.path is None:
+            sys.stderr.write(line)
+            return
+        with open(self.path, "a") as f:
+            f.write(line)
+
+    def timer(self) -> "PhaseTimer":
+        return PhaseTimer(self)
+
+    def progress(self, label: str, total: int, agent_steps_per_run: int) -> "Progress":
+        return Progress(self, label, total, agent_steps_per_run)
+
+
+class PhaseTimer:
+    """Accumulates per-phase times of one model (or one batch of runs)."""
+
+    def __init__(self, telemetry: Telemetry):
+        self.telemetry = telemetry
+        self.trace_memory = telemetry.trace_memory
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.alloc = dict.fromkeys(PHASES, 0)
+        self.network_seconds = 0.0
+        self.steps = 0
+        self.scenario, self.run = None, None   # labels, set by the runner
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self._t = self._started
+        self._mem = 0
+        self._step = None
+
+    def start(self) -> None:
+        """Begin a tick; the next lap() measures from here."""
+        self._t = time.perf_counter()
+        if self.trace_memory:
+            self._mem = tracemalloc.get_traced_memory()[0]
+        if self.telemetry.every:
+            self._step = dict.fromkeys(PHASES, 0.0)
+
+    def lap(self, phase: str) -> None:
+        """Charge the time since the previous start()/lap() to phase."""
+        t = time.perf_counter()
+        self.seconds[phase] += t - self._t
+        if self._step is not None:
+            self._step[phase] = t - self._t
+        self._t = t
+        if self.trace_memory:
+            mem = tracemalloc.get_traced_memory()[0]
+            self.alloc[phase] += mem - self._mem
+            self._mem = mem
+        if phase == PHASES[-1]:
+            self.steps += 1
+            if self._step is not None and self.steps % self.telemetry.every == 0:
+                self.telemetry.emit("step", scenario=self.scenario, run=self.run, step=self.steps - 1,
+                                    phases=self._step)
+
+    def record(self, num_agents: int) -> dict:
+        wall = time.perf_counter() - self._started
+        stepped = sum(self.seconds.values())
+        rec = {"scenario": self.scenario, "run": self.run, "num_agents": num_agents, "steps": self.steps,
+               "network_s": self.network_seconds, "wall_s": wall, "phases": self.seconds,
+               "agent_steps_per_s": num_agents * self.steps / stepped if stepped else None}
+        if self.trace_memory:
+            rec["alloc_bytes"] = self.alloc
+            rec["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        return rec
+
+    def finish(self, num_agents: int) -> None:
+        """Write this run's "run" record."""
+        self.telemetry.emit("run", **self.record(num_agents))
+
+
+class Progress:
+    """Finished-run counter of one Monte Carlo call or sweep round: throughput and ETA."""
+
+    def __init__(self, telemetry: Telemetry, label: str, total: int, agent_steps_per_run: int):
+        self.telemetry = telemetry
+        self.label = label
+        self.total = total
+        self.agent_steps_per_run = agent_steps_per_run
+        self.done = 0
+        self._started = time.perf_counter()
+
+    def update(self, n: int = 1) -> None:
+        self.done += n
+        elapsed = time.perf_counter() - self._started
+        rate = self.done / elapsed if elapsed > 0 else None
+        self.telemetry.emit("progress", label=self.label, done=self.done, total=self.total, elapsed_s=elapsed,
+                            agent_steps_per_s=rate * self.agent_steps_per_run if rate else None,
+                            eta_s=(self.total - self.done) / rate if rate else None)
@@ -0,0 +1,151 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from functions_and_parameters import STATE_SCORES
+
+# Traits that change over a run (stored per tick); identity only once per run, with the tribes
+TRAITS = ("habit", "threshold")
+
+
+class TrajectoryStore:
+    """
+    Agent-level trajectories of a Monte Carlo experiment, on disk:
+
+        root/meta.json
+        root/states.npy            int8    (runs, steps + 1, agents)
+        root/<trait>.npy           float32 (runs, steps + 1, agents), for each of traits
+        root/identity.npy          float32 (runs, agents)
+        root/tribes.npy            int16   (runs, agents)
+
+    Tick 0 is the initial population and tick t + 1 the state after model step
+    t (DataCollector Step t). The arrays are preallocated .npy files opened as
+    memory maps, so runs are written in place (pool workers write their own run
+    slices) and queries only read the slices they need: 100 runs x 60 steps x
+    10k agents is 61 MB of states and 244 MB per trait on disk.
+
+    Replaces collect_agents=True (one dict row per agent per tick) for anything
+    beyond toy sizes; pass the directory as run_monte_carlo(trajectories=...).
+    """
+
+    def __init__(self, root: str, mode: str = "r"):
+        self.root = root
+        self.mode = mode
+        with open(os.path.join(root, "meta.json")) as f:
+            meta = json.load(f)
+        self.n_runs, self.steps, self.num_agents = meta["n_runs"], meta["steps"], meta["num_agents"]
+        self.traits = tuple(meta["traits"])
+        self._arrays = {}
+
+    @classmethod
+    def create(cls, root: str, n_runs: int, steps: int, num_agents: int, traits=TRAITS) -> "TrajectoryStore":
+        """Preallocate the arrays (sparse files: disk is only used as runs are written)."""
+        os.makedirs(root, exist_ok=True)
+        shape = (n_runs, steps + 1, num_agents)
+        np.lib.format.open_memmap(os.path.join(root, "states.npy"), "w+", np.int8, shape)
+        for name in traits:
+            np.lib.format.open_memmap(os.path.join(root, f"{name}.npy"), "w+", np.float32, shape)
+        np.lib.format.open_memmap(os.path.join(root, "identity.npy"), "w+", np.float32, (n_runs, num_agents))
+        np.lib.format.open_memmap(os.path.join(root, "tribes.npy"), "w+", np.int16, (n_runs, num_agents))
+        with open(os.path.join(root, "meta.json"), "w") as f:
+            json.dump({"n_runs": n_runs, "steps": steps, "num_agents": num_agents, "traits": list(traits)}, f)
+        return cls(root, mode="r+")
+
+    def __getstate__(self):
+        # pickled to pool workers without the open memory maps
+        return dict(self.__dict__, _arrays={})
+
+    def array(self, name: str) -> np.memmap:
+        """Memory map of "states", a trait, "identity" or "tribes"."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.root, f"{name}.npy"), mmap_mode=self.mode)
+        return self._arrays[name]
+
+    @property
+    def states(self) -> np.memmap:
+        return self.array("states")
+
+    # ----------------------------
+    # Recording
+    # ----------------------------
+
+    def record(self, run, tick: int, states, traits: dict) -> None:
+        """Write tick `tick` of run `run` (an index, or a slice of runs for the batched engine)."""
+        self.states[run, tick] = states
+        for name in self.traits:
+            self.array(name)[run, tick] = traits[name]
+
+    def record_static(self, run, identity, tribes) -> None:
+        self.array("identity")[run] = identity
+        self.array("tribes")[run] = tribes
+
+    def record_model(self, run: int, tick: int, model) -> None:
+        self.record(run, tick, model.state_array(), {name: model.trait_array(name) for name in self.traits})
+        if tick == 0:
+            self.record_static(run, model.trait_array("identity"), model.tribes)
+
+    def flush(self) -> None:
+        for arr in self._arrays.values():
+            arr.flush()
+
+    # ----------------------------
+    # Queries (read run by run)
+    # ----------------------------
+
+    def _runs(self, runs):
+        return range(self.n_runs) if runs is None else runs
+
+    def agent_history(self, agent: int, runs=None) -> pd.DataFrame:
+        """State and traits of one agent at every tick of the given runs (default: all)."""
+        frames = []
+        for r in self._runs(runs):
+            df = pd.DataFrame({"Run": r, "Tick": np.arange(self.steps + 1), "State": self.states[r, :, agent]})
+            for name in self.traits:
+                df[name.capitalize()] = self.array(name)[r, :, agent]
+            df["Identity"] = self.array("identity")[r, agent]
+            df["Tribe"] = self.array("tribes")[r, agent]
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    def transition_matrix(self, start: int = 0, stop=None, runs=None, normalize: bool = True) -> np.ndarray:
+        """
+        4 x 4 one-tick transitions from state i (row) to state j (column), summed
+        over ticks start..stop-1 -> start+1..stop and the given runs; with
+        normalize, rows are probabilities.
+        """
+        stop = self.steps if stop is None else stop
+        counts = np.zeros(16, dtype=np.int64)
+        for r in self._runs(runs):
+            s = self.states[r, start:stop + 1].astype(np.int64)
+            counts += np.bincount((4 * s[:-1] + s[1:]).ravel(), minlength=16)
+        counts = counts.reshape(4, 4)
+        if not normalize:
+            return counts
+        rows = counts.sum(axis=1, keepdims=True)
+        return np.divide(counts, rows, out=np.zeros((4, 4)), where=rows > 0)
+
+    def tribe_trajectories(self, runs=None, scores=STATE_SCORES) -> pd.DataFrame:
+        """Per run, tick and tribe: state shares and average sustainability score."""
+        scores = np.asarray(scores, dtype=np.float64)
+        frames = []
+        for r in self._runs(runs):
+            s = np.asarray(self.states[r], dtype=np.int64)          # (ticks, agents)
+            tribes = np.asarray(self.array("tribes")[r], dtype=np.int64)
+            n_tribes = int(tribes.max()) + 1
+            size = np.bincount(tribes, minlength=n_tribes)
+            # counts[tick, tribe, state]
+            bins = (np.arange(s.shape[0])[:, None] * n_tribes + tribes[None, :]) * 4 + s
+            counts = np.bincount(bins.ravel(), minlength=s.shape[0] * n_tribes * 4).reshape(-1, n_tribes, 4)
+            shares = counts / np.maximum(size, 1)[None, :, None]
+            df = pd.DataFrame({
+                "Run": r,
+                "Tick": np.repeat(np.arange(s.shape[0]), n_tribes),
+                "Tribe": np.tile(np.arange(n_tribes), s.shape[0]),
+                "Size": np.tile(size, s.shape[0]),
+            })
+            for k in range(4):
+                df[f"Share{k}"] = shares[:, :, k].ravel()
+            df["AvgScore"] = (shares @ scores).ravel()
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,162 @@
+import numpy as np
+from functions_and_parameters import DEFAULT_PARAMS
+from policy import schedule_for
+from neighbors import use_compiled
+
+KERNELS = ("numpy", "compiled", "auto")
+
+
+def _logistic(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class VectorizedEngine:
+    """
+    Array-backed equivalent of stepping every EaterAgent.
+
+    Holds state and traits as NumPy arrays and performs the social signal,
+    backlash, p_up/p_down and synchronous update for all agents at once.
+    Uses the same rules and priors as agent.py; draws come from `rng`
+    (defaults to the globally seeded np.random, like EaterAgent). The social
+    signal is read from a neighbors.NeighborSignal, which is updated
+    incrementally with the agents that moved.
+
+    kernel="numpy" runs the update as whole-array NumPy expressions;
+    "compiled" runs kernels.update_agents, one fused loop over the agents
+    (Numba-compiled when installed, plain Python otherwise); "auto" picks
+    "compiled" only when Numba is available. Both give the same states for the
+    same draws.
+
+    policy: the run's policy.PolicySchedule (campaign intensity and tax scale
+    per tick); default: the scenario's, compiled for `steps` ticks.
+    """
+
+    def __init__(self, num_agents, scenario, neighbor_signal, rng=np.random, n_runs=None, params=DEFAULT_PARAMS,
+                 draws=None, kernel="auto", policy=None, steps=0):
+        if kernel not in KERNELS:
+            raise ValueError(f"Unknown kernel: {kernel}")
+        # with n_runs set, arrays are (n_runs, num_agents): one row per replicate,
+        # and neighbor_signal is the block-diagonal signal over all of them
+        n = (n_runs, num_agents) if n_runs is not None else (num_agents,)
+        self.num_agents = num_agents
+        self.shape = n
+        self.scenario = scenario
+        self.rng = rng
+        self.params = p = params
+        self.policy = schedule_for(scenario, params, steps) if policy is None else policy
+
+        # draws: crn.CommonDraws (stacked when batched) -> pre-drawn traits and per-tick uniforms
+        self.draws = draws
+        if draws is not None:
+            r = draws.state_u
+            self.habit_strength = draws.habit.copy()
+            self.threshold = draws.threshold.copy()
+            self.identity_strength = draws.identity
+            self.campaign_sensitivity = draws.campaign
+            self.econ_sensitivity = draws.econ
+        else:
+            r = rng.random(n)
+
+            # Priors
+            self.habit_strength = rng.beta(p.habit_alpha, p.habit_beta, n)
+            self.threshold = rng.beta(p.threshold_alpha, p.threshold_beta, n)
+            self.identity_strength = rng.beta(p.identity_alpha, p.identity_beta, n)
+
+            # Heterogeneous sensitivities
+            self.campaign_sensitivity = np.maximum(0.0, rng.lognormal(-0.2, 0.5, n))
+            self.econ_sensitivity = np.clip(rng.normal(1.0, 0.25, n), 0.2, 2.0)
+
+        # Initial state: 10% state 1, 2% state 2, others at state 0
+        self.state = np.where(r < 0.02, 2, np.where(r < 0.12, 1, 0)).astype(np.int64)
+
+        self.neighbor_signal = neighbor_signal
+        self.neighbor_signal.reset(self.state.ravel())
+        self.last_peer_events = 0
+        self.compiled = use_compiled(kernel)
+        self._changed = np.empty(self.state.size, dtype=np.int64)
+
+        # live agents-per-state histogram, (4,) or (n_runs, 4); updated from the movers only
+        self._count_offsets = 4 * np.arange(n_runs or 1)
+        self.state_counts = np.bincount(self._count_bins(np.arange(self.state.size), self.state.ravel()),
+                                        minlength=self._count_offsets.size * 4).reshape(n[:-1] + (4,))
+
+    def _count_bins(self, flat_idx, states):
+        """Flat state_counts bin of each (flat agent index, state) pair."""
+        return self._count_offsets[flat_idx // self.num_agents] + states
+
+    def social_signal(self):
+        return self.neighbor_signal.values.reshape(self.shape)
+
+    def _campaign_adjustment(self, campaign):
+        return self.campaign_sensitivity * campaign if campaign else 0.0
+
+    def _economic_adjustment(self, tax, tax_scale):
+        if tax_scale:
+            # tax is a scalar, or one value per run in batched mode
+            return self.econ_sensitivity * np.reshape(tax, np.shape(tax) + (1,) * (np.ndim(tax) > 0))
+        return 0.0
+
+    def step(self, t, tax):
+        """Advance all agents one tick; returns the number of peer events (per run if batched)."""
+        u = self.rng.random((3,) + self.shape) if self.draws is None else self.draws.uniforms(t)
+        campaign, tax_scale = self.policy.at(t)
+        if self.compiled:
+            return self._step_compiled(campaign, tax if tax_scale else 0.0, u)
+        state = self.state
+        social_signal = self.social_signal()
+
+        # potential backlash first
+        gap = social_signal - state
+        p = self.params
+        p_back = p.backlash_scale * self.identity_strength * _logistic(gap - p.backlash_gap)
+        fired = (gap >= p.backlash_gap) & (u[0] < p_back)
+        self.threshold = np.where(fired, np.clip(self.threshold + 0.05 * gap, 0, 1), self.threshold)
+        # EaterAgent.step resets next_state after _maybe_backlash, so a backlash
+        # step-down only shows up as a peer event; mirror that here.
+        events = np.count_nonzero(fired & (state > 0) & (u[1] < 0.5 * self.identity_strength), axis=-1)
+
+        # pressure to move up one state
+        nudges = self._campaign_adjustment(campaign) + self._economic_adjustment(tax, tax_scale)
+        pressure = gap + nudges
+
+        effective_threshold = self.threshold * (1.0 + self.habit_strength)
+
+        p_up = _logistic(2.5 * (pressure - effective_threshold))
+        p_down = _logistic(2.0 * ((-pressure) - 0.5 * self.habit_strength))
+
+        up = (u[2] < p_up) & (state < 3)
+        down = ~up & (u[2] > 1 - p_down) & (state > 0)
+        events += np.count_nonzero(up, axis=-1) + np.count_nonzero(down, axis=-1)
+
+        # Habit decays slightly every step
+        self.habit_strength *= p.habit_decay
+
+        # synchronous advance
+        self.state = state + up - down
+        changed = np.flatnonzero(up | down)
+        new_states = self.state.ravel()[changed]
+        self.neighbor_signal.apply_changes(changed, new_states)
+        flat_counts = self.state_counts.reshape(-1)
+        np.subtract.at(flat_counts, self._count_bins(changed, state.ravel()[changed]), 1)
+        np.add.at(flat_counts, self._count_bins(changed, new_states), 1)
+        self.last_peer_events = events if np.ndim(events) else int(events)
+        return self.last_peer_events
+
+    def _step_compiled(self, campaign, tax, u):
+        from kernels import update_agents
+        p = self.params
+        n_runs = self.shape[0] if len(self.shape) > 1 else 1
+        tax = np.ascontiguousarray(np.broadcast_to(np.asarray(tax, dtype=float), (n_runs,)))
+        events = np.zeros(n_runs, dtype=np.int64)
+        state = self.state.reshape(-1)
+        n = update_agents(
+            state, self.threshold.reshape(-1), self.habit_strength.reshape(-1),
+            self.identity_strength.reshape(-1), self.campaign_sensitivity.reshape(-1),
+            self.econ_sensitivity.reshape(-1), self.neighbor_signal.values, u.reshape(3, -1),
+            campaign, 1.0, tax, self.num_agents,
+            p.backlash_gap, p.backlash_scale, p.habit_decay, events, self.state_counts.reshape(-1),
+            self._changed)
+        changed = self._changed[:n]
+        self.neighbor_signal.apply_changes(changed, state[changed])
+        self.last_peer_events = events if len(self.shape) > 1 else int(events[0])
+        return self.last_peer_events
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# the modules live flat in code/ (run as scripts from there)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+
+STATE_COLUMNS = ["ShareState0", "ShareState1", "ShareState2", "ShareState3", "PeerInfluenceEvents"]
+
+
+@pytest.fixture
+def base():
+    """Scaled-down main.base_params: small population, short runs, no network cache."""
+    return dict(num_agents=200, network_type="small_world", average_degree=4, rewiring_prob=0.1, steps=30,
+                collect_agents=False, network_cache=None)
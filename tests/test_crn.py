@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import runner
+import sharded
+from conftest import STATE_COLUMNS
+from crn import CommonDraws
+from functions_and_parameters import generate_multiplex
+from neighbors import NeighborSignal
+
+
+def test_subset_uniforms_match_population():
+    draws = CommonDraws(500, 10, seed0=123, run=2)
+    agents = np.random.default_rng(0).permutation(500)[:120]
+    shard = draws.subset(agents)
+    for t in (0, 9):
+        np.testing.assert_array_equal(shard.uniforms(t), draws.uniforms(t)[:, agents])
+    # a subset of a subset keeps the population positions
+    np.testing.assert_array_equal(shard.subset(np.arange(10)).uniforms(3), draws.uniforms(3)[:, agents[:10]])
+    assert not np.array_equal(draws.uniforms(0), CommonDraws(500, 10, seed0=123, run=3).uniforms(0))
+
+
+def test_stacked_uniforms_match_runs():
+    runs = [CommonDraws(50, 5, seed0=1, run=r) for r in range(3)]
+    stacked = CommonDraws.stack(runs)
+    np.testing.assert_array_equal(stacked.uniforms(4), np.stack([d.uniforms(4) for d in runs], axis=1))
+
+
+def test_halo_signal_matches_full_signal():
+    n, rng = 400, np.random.default_rng(1)
+    off, on, tribes = generate_multiplex(n, method="block", as_edges=True, rng=np.random.RandomState(1))
+    signal = NeighborSignal(off, on, n)
+    W = signal.W
+    order, bounds = sharded.partition(W, tribes, 3)
+    assert sorted(order) == list(range(n)) and bounds[-1] == n
+    Wp = sp.csr_matrix(W[order][:, order])
+    specs = sharded._shard_specs(Wp, signal, order, bounds, [0, 1, 2], None, "numpy")
+    report = sharded.partition_report(Wp, bounds, [spec[2] for spec in specs])
+    assert report["sizes"] == np.diff(bounds).tolist() and 0 < report["cut_links"] < report["links"]
+
+    states = rng.integers(0, 4, n).astype(float)[order]   # in shard order
+    full = signal.reset(states[np.argsort(order)])[order]
+    for lo, hi, halo, shard_signal, _, _ in specs:
+        shard_signal.halo = states[halo]
+        np.testing.assert_array_equal(shard_signal.reset(states[lo:hi]), full[lo:hi])
+    for _ in range(3):
+        changed = rng.choice(n, 15, replace=False)
+        states[changed] = rng.integers(0, 4, 15)
+        full = signal.reset(states[np.argsort(order)])[order]
+        for lo, hi, halo, shard_signal, _, _ in specs:
+            own = changed[(changed >= lo) & (changed < hi)]
+            shard_signal.apply_changes(own - lo, states[own])
+            np.testing.assert_array_equal(shard_signal.update_halo(states[halo]), full[lo:hi])
+
+
+def test_sharded_crn_matches_single_process(base):
+    bp = dict(base, num_agents=300, engine="vectorized", network="block", reference_size=300)
+    single, _ = runner.run_monte_carlo("combo", 20, n_runs=1, base_params=bp, crn=True)
+    split, _ = sharded.run_sharded("combo", 20, n_runs=1, base_params=bp, n_shards=2, crn=True)
+    pd.testing.assert_frame_equal(single[STATE_COLUMNS], split[STATE_COLUMNS])
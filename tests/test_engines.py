@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import runner
+from conftest import STATE_COLUMNS
+from functions_and_parameters import generate_multiplex
+from model import SustainableEatingModel
+from neighbors import NeighborSignal
+from network_cache import NetworkCache
+
+
+def test_vectorized_matches_agents_with_crn(base):
+    agents, _ = runner.run_monte_carlo("combo", 30, n_runs=2, base_params=base, crn=True)
+    vectorized, _ = runner.run_monte_carlo("combo", 30, n_runs=2, base_params=dict(base, engine="vectorized"),
+                                           crn=True)
+    pd.testing.assert_frame_equal(agents[STATE_COLUMNS], vectorized[STATE_COLUMNS])
+    np.testing.assert_allclose(agents[runner.MODEL_COLUMNS].to_numpy(float),
+                               vectorized[runner.MODEL_COLUMNS].to_numpy(float), atol=1e-12)
+
+
+def test_batched_does_not_depend_on_batch_size(base):
+    bp = dict(base, engine="vectorized")
+    np.random.seed(7)
+    before = np.random.get_state()[1].copy()
+    whole, _ = runner.run_monte_carlo("combo", 30, n_runs=4, base_params=bp, batched=True)
+    assert np.array_equal(before, np.random.get_state()[1]), "batched runs must not touch the global RNG"
+    pairs, _ = runner.run_monte_carlo("combo", 30, n_runs=4, base_params=bp, batched=True, batch_size=2)
+    serial, _ = runner.run_monte_carlo("combo", 30, n_runs=4, base_params=bp)
+    pd.testing.assert_frame_equal(whole, pairs)
+    pd.testing.assert_frame_equal(whole[STATE_COLUMNS], serial[STATE_COLUMNS])
+
+
+@pytest.mark.parametrize("kernel", ["numpy", "compiled"])
+def test_neighbor_signal_incremental_matches_reset(kernel):
+    if kernel == "compiled":
+        pytest.importorskip("numba")
+    rng = np.random.default_rng(0)
+    n = 300
+    off, on, _ = generate_multiplex(n, method="block", as_edges=True, rng=np.random.RandomState(0))
+    signal = NeighborSignal(off, on, n, kernel=kernel)
+    fresh = NeighborSignal(off, on, n)
+    states = rng.integers(0, 4, n)
+    signal.reset(states)
+    for size in (0, 1, 5, 20, 100):   # below and above full_refresh
+        changed = rng.choice(n, size, replace=False)
+        states[changed] = rng.integers(0, 4, size)
+        signal.apply_changes(changed, states[changed])
+        np.testing.assert_array_equal(signal.values, fresh.reset(states))
+
+
+def test_network_cache_hit_matches_build(base, tmp_path):
+    kwargs = dict(base, scenario="combo", engine="vectorized", network="block")
+    del kwargs["network_cache"]
+    models = []
+    for cache in (None, str(tmp_path), str(tmp_path)):   # no cache, miss (build + store), hit
+        model = SustainableEatingModel(**kwargs, rng=np.random.default_rng(3), network_cache=cache)
+        for _ in range(10):
+            model.step()
+        models.append(model.datacollector.get_model_vars_dataframe())
+    assert len(list(tmp_path.iterdir())) == 1
+    pd.testing.assert_frame_equal(models[0], models[1])
+    pd.testing.assert_frame_equal(models[0], models[2])
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import runner
+from aggregation import EndpointStats, StreamingSummary, run_endpoints
+
+
+@pytest.fixture
+def runs(base):
+    all_runs, _ = runner.run_monte_carlo("combo", 30, n_runs=4, base_params=dict(base, engine="vectorized"))
+    return all_runs
+
+
+def test_streaming_summary_matches_pandas(runs):
+    stream = StreamingSummary(30)
+    for _, mdf in runs.groupby("Run"):
+        stream.update(mdf.reset_index(drop=True))
+    pd.testing.assert_frame_equal(stream.summary()[runner.summarize_runs(runs, 4).columns],
+                                  runner.summarize_runs(runs, 4), check_dtype=False, rtol=1e-12)
+
+
+def test_endpoint_stats_match_pandas(runs):
+    stats = EndpointStats()
+    ends = pd.DataFrame([run_endpoints(mdf) for _, mdf in runs.groupby("Run")])
+    for _, mdf in runs.groupby("Run"):
+        stats.update(mdf)
+    report = stats.report()
+    for name in ends:
+        assert report[name] == pytest.approx(ends[name].mean(), rel=1e-12)
+        assert report[f"{name}CI95"] == pytest.approx(1.96 * ends[name].std() / np.sqrt(len(ends)), rel=1e-9)
+    assert stats.converged({"FinalAvg": np.inf}) and not EndpointStats().converged({"FinalAvg": 1.0})
+
+
+@pytest.mark.parametrize("format", ["parquet", "ipc"])
+def test_results_writer_round_trip(runs, tmp_path, format):
+    pytest.importorskip("pyarrow")
+    from results_io import ResultsWriter, compact, read_results
+    writer = ResultsWriter(str(tmp_path), format=format)
+    for _, mdf in runs.groupby("Run"):
+        writer.write_runs(mdf, "combo", sweep="taxmax", value=0.3)
+    writer.write_summary(runner.summarize_runs(runs, 4), "combo")
+    back = read_results(str(tmp_path), format=format, scenario="combo", sweep="taxmax", value=0.3, runs=[1, 2])
+    want = compact(runs[runs["Run"].isin([1, 2])]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(back[want.columns], want, check_dtype=False, check_categorical=False)
+    summary = read_results(str(tmp_path), table="summary", format=format, sweep="none")
+    assert len(summary) == 30
+
+
+def test_shm_transport_matches_pickle(base):
+    bp = dict(base, steady_state=True)
+    shm = runner.run_parallel(["social", "combo"], 30, n_runs=3, base_params=bp, workers=2, transport="shm")
+    pickled = runner.run_parallel(["social", "combo"], 30, n_runs=3, base_params=bp, workers=2, transport="pickle")
+    for scenario in shm:
+        pd.testing.assert_frame_equal(shm[scenario][0], pickled[scenario][0])
+        pd.testing.assert_frame_equal(shm[scenario][1], pickled[scenario][1], rtol=1e-12)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+import runner
+from functions_and_parameters import DEFAULT_PARAMS, exp_decay
+from model import SustainableEatingModel
+from policy import Campaign, Constant, ExpDecay, Policy, Pulse, Ramp, Steps, compile_policy, scenario_policy
+
+
+def test_steady_state_extrapolates_after_simulated_prefix(base):
+    bp = dict(base, steps=150, engine="vectorized")
+    full, _ = runner.run_monte_carlo("social", 150, n_runs=2, base_params=bp)
+    short, _ = runner.run_monte_carlo("social", 150, n_runs=2, base_params=dict(bp, steady_state=True))
+    for r in range(2):
+        ref, run = full[full["Run"] == r], short[short["Run"] == r]
+        simulated = ~run["Extrapolated"].to_numpy()
+        assert 0 < simulated.sum() < 150 and not simulated[simulated.argmin():].any()
+        np.testing.assert_array_equal(run[runner.MODEL_COLUMNS].to_numpy(float)[simulated],
+                                      ref[runner.MODEL_COLUMNS].to_numpy(float)[simulated])
+        tail = run.loc[~simulated, "AverageSustainability"]
+        assert tail.nunique() == 1
+        assert abs(tail.iloc[-1] - ref["AverageSustainability"].iloc[-1]) < 0.05
+
+
+def test_restore_continues_the_run(base):
+    kwargs = dict(base, scenario="combo", engine="vectorized")
+    del kwargs["network_cache"]
+    model = SustainableEatingModel(**kwargs, rng=np.random.default_rng(5))
+    for _ in range(10):
+        model.step()
+    checkpoint = model.checkpoint()
+    for _ in range(20):
+        model.step()
+    for _ in range(2):   # several restores fork independent, identical branches
+        branch = SustainableEatingModel.restore(checkpoint)
+        for _ in range(20):
+            branch.step()
+        pd.testing.assert_frame_equal(branch.datacollector.get_model_vars_dataframe(),
+                                      model.datacollector.get_model_vars_dataframe())
+
+
+def test_branches_match_separate_runs(base):
+    branches = {"social": ("social", None), "campaign": ("campaign", None), "combo": ("combo", None),
+                "combo_hl6": ("combo", DEFAULT_PARAMS.replace(campaign_half_life=6.0))}
+    for engine in ("agents", "vectorized"):
+        bp = dict(base, engine=engine)
+        forked = runner.run_branches(branches, 30, n_runs=2, base_params=bp)
+        for name, (scenario, params) in branches.items():
+            alone, _ = runner.run_monte_carlo(scenario, 30, n_runs=2, base_params=bp, params=params)
+            pd.testing.assert_frame_equal(forked[name][0], alone)
+
+
+def test_policy_shapes():
+    assert [Pulse(2, length=2, period=5, count=2)(t) for t in range(14)] == \
+        [0, 0, 1, 1, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0]
+    assert [Ramp(2, 6, lo=1.0, hi=0.0)(t) for t in (0, 2, 3, 6, 9)] == [1.0, 1.0, 0.75, 0.0, 0.0]
+    assert [Steps((2, 5), (0.5, 1.0))(t) for t in (0, 2, 4, 5, 8)] == [0.0, 0.5, 0.5, 1.0, 1.0]
+    schedule = compile_policy(Policy(campaigns=(Campaign(0.2, Pulse(1)), Campaign(0.1, Constant())),
+                                     tax=Ramp(0, 4)), 6)
+    assert schedule.campaign == [0.1, 0.30000000000000004, 0.1, 0.1, 0.1, 0.1]
+    assert schedule.tax == [0.0, 0.25, 0.5, 0.75, 1.0, 1.0]
+    assert schedule.settled == 6 and compile_policy(Policy(tax=Ramp(0, 4)), 6).settled == 4
+
+
+def test_default_policy_is_the_scenario_campaign(base):
+    p = DEFAULT_PARAMS
+    schedule = compile_policy(scenario_policy("combo"), 60)
+    for t in range(60):
+        on = p.campaign_start <= t <= p.campaign_end
+        assert schedule.campaign[t] == (p.campaign_base_strength * exp_decay(t, p.campaign_start, p.campaign_half_life)
+                                        if on else 0.0)
+    assert schedule.tax == [1.0] * 60
+    assert scenario_policy("social") == Policy()
+    explicit = Policy(campaigns=(Campaign(p.campaign_base_strength,
+                                          ExpDecay(p.campaign_start, p.campaign_end, p.campaign_half_life)),),
+                      tax=Constant())
+    bp = dict(base, engine="vectorized")
+    default, _ = runner.run_monte_carlo("combo", 30, n_runs=2, base_params=bp)
+    given, _ = runner.run_monte_carlo("combo", 30, n_runs=2, base_params=dict(bp, policy=explicit))
+    pd.testing.assert_frame_equal(default, given)
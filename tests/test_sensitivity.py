@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from sensitivity import morris_design, morris_indices, saltelli_design, sobol_indices
+
+# y = x1 + 2 x2 + 0 x3 on uniform factors: S1 = ST = (1, 4, 0) / 5 when all ranges are equal
+BOUNDS = {"tax_max": (0.0, 1.0), "backlash_scale": (0.0, 1.0), "habit_decay": (0.0, 1.0)}
+COEFFS = np.array([1.0, 2.0, 0.0])
+
+
+def test_sobol_indices_of_linear_function():
+    X = saltelli_design(BOUNDS, 1024, seed=1)
+    assert X.shape == (1024 * 5, 3)
+    idx = sobol_indices(X @ COEFFS, 3, n_boot=100)
+    np.testing.assert_allclose(idx["S1"], [0.2, 0.8, 0.0], atol=0.03)
+    np.testing.assert_allclose(idx["ST"], [0.2, 0.8, 0.0], atol=0.03)
+    # an inert factor has exactly zero indices in every bootstrap resample
+    for name in ("S1_CI95", "ST_CI95"):
+        assert (idx[name][:2] > 0).all() and idx[name][2] == 0
+
+
+def test_morris_indices_of_linear_function():
+    bounds = dict(BOUNDS, backlash_scale=(0.0, 2.0))
+    X = morris_design(bounds, 20, seed=2)
+    assert X.shape == (20 * 4, 3)
+    # one factor moves per step of a trajectory, staying inside its range
+    steps = np.diff(X.reshape(20, 4, 3), axis=1)
+    assert ((steps != 0).sum(axis=2) == 1).all()
+    assert (X >= 0).all() and (X[:, 1] <= 2).all()
+    idx = morris_indices(X, X @ COEFFS, bounds, n_boot=100)
+    # elementary effects in unit-scaled factors: coefficient x range
+    np.testing.assert_allclose(idx["mu_star"], [1.0, 4.0, 0.0], atol=1e-12)
+    np.testing.assert_allclose(idx["sigma"], 0.0, atol=1e-12)
+
+
+def test_bounds_are_checked():
+    with pytest.raises(ValueError):
+        saltelli_design({"no_such_field": (0, 1)}, 8)
+    with pytest.raises(ValueError):
+        morris_design({"tax_max": (1, 1)}, 4)